@@ -3,12 +3,22 @@ FastAPI Backend for Jarvis AI Assistant
 """
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
+import json
 import logging
+import os
 
 from config import settings
 from rag_engine import RAGEngine
+from llm_scheduler import AdmissionError
+from metrics import REGISTRY
+from profiling import ProfilingMiddleware
+from vector_store import collection_namespace
+from extractors import UnsupportedFormatError
+from directory_sync import SyncInProgressError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,32 +39,114 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Profile requests sent with `X-Profile: 1` or sampled by PROFILE_SAMPLE_RATE
+app.add_middleware(ProfilingMiddleware)
+
 # Initialize RAG engine
 rag_engine = RAGEngine()
 
+@app.on_event("startup")
+async def startup():
+    """Start background health checks and model preloading, and resume an interrupted migration"""
+    rag_engine.health.start()
+    rag_engine.llm.start_residency()
+    rag_engine.resume_migration()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background tasks and release pooled connections"""
+    await rag_engine.health.stop()
+    await rag_engine.llm.stop_residency()
+    await rag_engine.llm.close()
+    rag_engine.doc_processor.close()
+
 # Pydantic models
 class QueryRequest(BaseModel):
     question: str
     use_context: bool = True
     top_k: Optional[int] = None
+    timeout: Optional[float] = None
+    session_id: Optional[str] = None
+    collections: Optional[List[str]] = None
+    num_predict: Optional[int] = None
+    num_ctx: Optional[int] = None
+    stop: Optional[List[str]] = None
+    multi_query: Optional[bool] = None
+    
+    def generation_options(self) -> Dict[str, Any]:
+        """Ollama options given with the request"""
+        return {'num_predict': self.num_predict, 'num_ctx': self.num_ctx, 'stop': self.stop}
 
 class QueryResponse(BaseModel):
     question: str
     answer: str
     context: List[Dict[str, Any]]
     used_context: bool
+    timings: Optional[Dict[str, float]] = None
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    use_context: bool = True
+    top_k: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    stream: bool = False
+    collections: Optional[List[str]] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[QueryResponse]
 
 class AddKnowledgeRequest(BaseModel):
     text: str
     doc_name: Optional[str] = None
     doc_type: Optional[str] = None
+    doc_id: Optional[str] = None
+    collection: Optional[str] = None
+
+class ReplaceKnowledgeRequest(BaseModel):
+    text: str
+    doc_name: Optional[str] = None
+    doc_type: Optional[str] = None
+    collection: Optional[str] = None
+
+class MigrationRequest(BaseModel):
+    embedding_model: str
+    batch_size: Optional[int] = None
+    projection: Optional[str] = None
+    projection_dim: Optional[int] = None
 
 class AddDocumentsRequest(BaseModel):
     documents: List[Dict[str, str]]
+    collection: Optional[str] = None
+
+class SyncRequest(BaseModel):
+    directory: str
+    collection: Optional[str] = None
+    dry_run: bool = False
+    delete_removed: bool = True
 
 class HealthResponse(BaseModel):
     status: str
     components: Dict[str, bool]
+    checked_at: Optional[float] = None
+    age_seconds: Optional[float] = None
+    stale: bool = False
+
+def check_collections(*collections: Optional[str]):
+    """Reject invalid collection names with a 400"""
+    try:
+        for collection in collections:
+            collection_namespace(collection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def check_sync_directory(directory: str):
+    """Reject directories outside SYNC_ALLOWED_DIRS with a 403; syncing is off until it is set"""
+    allowed = [os.path.realpath(d.strip()) for d in settings.sync_allowed_dirs.split(",") if d.strip()]
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Directory sync is disabled; set SYNC_ALLOWED_DIRS to enable it")
+    path = os.path.realpath(directory)
+    if not any(os.path.commonpath([root, path]) == root for root in allowed):
+        raise HTTPException(status_code=403, detail=f"Directory is not under SYNC_ALLOWED_DIRS: {directory}")
 
 # API Routes
 
@@ -69,45 +161,139 @@ async def root():
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Check system health"""
-    health = await rag_engine.check_health()
+    """
+    Report system health from the background health monitor
+    
+    Probes run on an interval, so this never adds load to the backends.
+    """
+    health = rag_engine.health.snapshot()
+    if health['checked_at'] is None:
+        # First probe hasn't finished yet (just after startup)
+        await rag_engine.health.refresh()
+        health = rag_engine.health.snapshot()
     
     return {
-        "status": "healthy" if health['overall'] else "unhealthy",
-        "components": health
+        "status": "healthy" if health['components']['overall'] else "unhealthy",
+        **health
     }
 
 @app.post("/query", response_model=QueryResponse)
 async def query(request: QueryRequest):
     """
-    Process a query using RAG
+    Process a query using RAG, searching the given collections concurrently
     """
+    check_collections(*(request.collections or []))
     try:
         result = await rag_engine.query(
             question=request.question,
             use_context=request.use_context,
-            top_k=request.top_k
+            top_k=request.top_k,
+            timeout=request.timeout,
+            session_id=request.session_id,
+            collections=request.collections,
+            options=request.generation_options(),
+            multi_query=request.multi_query
         )
         
         return result
+    except AdmissionError as e:
+        logger.warning(f"Query rejected by admission control: {e}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(int(settings.llm_max_queue_wait))}
+        )
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """
+    Process a query using RAG, streaming the answer as NDJSON events
+    
+    Emits a `context` event, `token` events as the answer is generated and
+    a final `done` (with timings) or `error` event.
+    """
+    check_collections(*(request.collections or []))
+    
+    async def ndjson_lines():
+        async for event in rag_engine.query_stream(
+            question=request.question,
+            use_context=request.use_context,
+            top_k=request.top_k,
+            timeout=request.timeout,
+            session_id=request.session_id,
+            collections=request.collections,
+            options=request.generation_options(),
+            multi_query=request.multi_query
+        ):
+            yield json.dumps(event) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(request: BatchQueryRequest):
+    """
+    Process many independent questions using RAG
+    
+    With `stream` enabled, results are streamed as NDJSON in completion
+    order, each line carrying the `index` of its question.
+    """
+    if len(request.questions) > settings.max_batch_questions:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds {settings.max_batch_questions} questions"
+        )
+    if request.max_concurrency is not None and request.max_concurrency < 1:
+        raise HTTPException(status_code=400, detail="max_concurrency must be at least 1")
+    check_collections(*(request.collections or []))
+    
+    if request.stream:
+        async def ndjson_lines():
+            async for index, result in rag_engine.iter_query_batch(
+                request.questions,
+                use_context=request.use_context,
+                top_k=request.top_k,
+                max_concurrency=request.max_concurrency,
+                collections=request.collections
+            ):
+                yield json.dumps({"index": index, **result}) + "\n"
+        
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    
+    try:
+        results = await rag_engine.query_batch(
+            request.questions,
+            use_context=request.use_context,
+            top_k=request.top_k,
+            max_concurrency=request.max_concurrency,
+            collections=request.collections
+        )
+        
+        return {"results": results}
+    except Exception as e:
+        logger.error(f"Error processing batch query: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/knowledge/add")
 async def add_knowledge(request: AddKnowledgeRequest):
     """
     Add knowledge to the system
     """
+    check_collections(request.collection)
     try:
-        success = rag_engine.add_knowledge(
+        doc_id = await asyncio.to_thread(
+            rag_engine.add_knowledge,
             text=request.text,
             doc_name=request.doc_name,
-            doc_type=request.doc_type
+            doc_type=request.doc_type,
+            doc_id=request.doc_id,
+            collection=request.collection
         )
         
-        if success:
-            return {"status": "success", "message": "Knowledge added successfully"}
+        if doc_id:
+            return {"status": "success", "message": "Knowledge added successfully", "doc_id": doc_id}
         else:
             raise HTTPException(status_code=500, detail="Failed to add knowledge")
     
@@ -120,8 +306,9 @@ async def add_documents(request: AddDocumentsRequest):
     """
     Add multiple documents
     """
+    check_collections(request.collection)
     try:
-        success = rag_engine.add_multiple_documents(request.documents)
+        success = await asyncio.to_thread(rag_engine.add_multiple_documents, request.documents, request.collection)
         
         if success:
             return {
@@ -136,39 +323,66 @@ async def add_documents(request: AddDocumentsRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/knowledge/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(file: UploadFile = File(...), collection: Optional[str] = None):
     """
-    Upload a text file to add to knowledge base
+    Upload a text, Markdown, HTML or PDF file to add to knowledge base
     """
+    check_collections(collection)
     try:
         content = await file.read()
-        text = content.decode('utf-8')
         
-        success = rag_engine.add_knowledge(
-            text=text,
-            doc_name=file.filename,
-            doc_type='uploaded_file'
+        doc_id = await rag_engine.add_file(
+            data=content,
+            filename=file.filename,
+            collection=collection
         )
         
-        if success:
+        if doc_id:
             return {
                 "status": "success",
-                "message": f"File '{file.filename}' processed and added"
+                "message": f"File '{file.filename}' processed and added",
+                "doc_id": doc_id
             }
         else:
             raise HTTPException(status_code=500, detail="Failed to process file")
     
+    except UnsupportedFormatError as e:
+        raise HTTPException(status_code=415, detail=str(e))
     except Exception as e:
         logger.error(f"Error uploading file: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/knowledge/sync")
+async def sync_directory(request: SyncRequest):
+    """
+    Ingest new and changed files of a server-side directory tree and
+    delete documents of removed files; `dry_run` only reports the changes
+    """
+    check_collections(request.collection)
+    check_sync_directory(request.directory)
+    try:
+        return await asyncio.to_thread(
+            rag_engine.sync_directory,
+            request.directory,
+            request.collection,
+            request.dry_run,
+            request.delete_removed
+        )
+    except NotADirectoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except SyncInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error syncing directory: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.delete("/knowledge/clear")
 async def clear_knowledge():
     """
     Clear all knowledge from vector store
     """
     try:
-        success = rag_engine.clear_knowledge()
+        success = await asyncio.to_thread(rag_engine.clear_knowledge)
         
         if success:
             return {"status": "success", "message": "Knowledge cleared"}
@@ -179,13 +393,112 @@ async def clear_knowledge():
         logger.error(f"Error clearing knowledge: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# Declared after /knowledge/clear so that path is not taken for a doc_id
+@app.delete("/knowledge/{doc_id}")
+async def delete_knowledge(doc_id: str):
+    """
+    Remove one document from the knowledge base
+    """
+    deleted = await asyncio.to_thread(rag_engine.delete_knowledge, doc_id)
+    
+    if deleted is None:
+        raise HTTPException(status_code=500, detail="Failed to delete document")
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {doc_id}")
+    return {"status": "success", "doc_id": doc_id, "chunks_deleted": deleted}
+
+@app.put("/knowledge/{doc_id}")
+async def replace_knowledge(doc_id: str, request: ReplaceKnowledgeRequest):
+    """
+    Replace the content of one document (or add it under this id)
+    """
+    check_collections(request.collection)
+    success = await asyncio.to_thread(
+        rag_engine.replace_knowledge,
+        doc_id,
+        request.text,
+        request.doc_name,
+        request.doc_type,
+        request.collection
+    )
+    
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to replace document")
+    return {"status": "success", "doc_id": doc_id, "message": "Document replaced"}
+
+@app.get("/collections")
+async def list_collections():
+    """
+    List collections with their chunk counts
+    """
+    return {"collections": await asyncio.to_thread(rag_engine.list_collections)}
+
+@app.delete("/collections/{collection}")
+async def delete_collection(collection: str):
+    """
+    Remove a collection and all its documents
+    """
+    check_collections(collection)
+    deleted = await asyncio.to_thread(rag_engine.delete_collection, collection)
+    
+    if deleted is None:
+        raise HTTPException(status_code=500, detail="Failed to delete collection")
+    if deleted == 0:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection}")
+    return {"status": "success", "collection": collection, "chunks_deleted": deleted}
+
+@app.post("/index/migration", status_code=202)
+async def start_migration(request: MigrationRequest):
+    """
+    Re-embed the knowledge base with another model in the background,
+    then switch over to the new index
+    
+    Set `projection` to 'pca' or 'truncate' to store vectors reduced to
+    `projection_dim` dimensions; migrate to the current model to add or
+    remove a projection without changing models.
+    """
+    if request.projection not in (None, "pca", "truncate"):
+        raise HTTPException(status_code=400, detail="projection must be 'pca' or 'truncate'")
+    projection_dim = (request.projection_dim or settings.projection_dimension) if request.projection else None
+    current = rag_engine.vector_store.projection_info or {}
+    if (
+        request.embedding_model == rag_engine.vector_store.embedding_model_name
+        and request.projection == current.get('type')
+        and projection_dim == current.get('dim')
+    ):
+        raise HTTPException(status_code=400, detail="The index already uses this model and projection")
+    if not rag_engine.start_migration(
+        request.embedding_model,
+        batch_size=request.batch_size,
+        projection=request.projection,
+        projection_dim=projection_dim
+    ):
+        raise HTTPException(status_code=409, detail="A migration is already running")
+    return rag_engine.migration_status()
+
+@app.get("/index/migration")
+async def migration_status():
+    """
+    Progress of the latest embedding model migration
+    """
+    return rag_engine.migration_status()
+
+@app.delete("/index/migration")
+async def cancel_migration():
+    """
+    Cancel the running embedding model migration
+    """
+    if not rag_engine.cancel_migration():
+        raise HTTPException(status_code=404, detail="No migration is running")
+    return {"status": "success", "message": "Migration cancelling"}
+
 @app.post("/conversation/clear")
-async def clear_conversation():
+async def clear_conversation(session_id: Optional[str] = None):
     """
-    Clear conversation history
+    Clear conversation history of a session (the shared one by default)
     """
     try:
-        rag_engine.clear_conversation()
+        rag_engine.clear_conversation(session_id)
         return {"status": "success", "message": "Conversation cleared"}
     
     except Exception as e:
@@ -204,6 +517,17 @@ async def get_stats():
         logger.error(f"Error getting stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Expose metrics in Prometheus text format
+    """
+    scheduler_stats = rag_engine.llm.scheduler.get_stats()
+    REGISTRY.gauge("jarvis_llm_active", "Generations currently running").set(scheduler_stats['active'])
+    REGISTRY.gauge("jarvis_llm_queued", "Generations waiting for a slot").set(scheduler_stats['queued'])
+    
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
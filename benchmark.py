@@ -0,0 +1,307 @@
+"""
+Offline micro-benchmarks for the RAG hot paths
+
+Runs without Pinecone or Ollama: embeddings come from a deterministic
+hashing stub (or a locally cached sentence-transformer with
+--real-embeddings) and search runs against the in-process LocalIndex.
+Embedding throughput is only measured with --real-embeddings, since the
+stub's cost says nothing about the model's batching.
+
+Usage:
+    python benchmark.py --output bench.json
+    python benchmark.py --quick --compare bench.json
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import zlib
+from typing import Callable, List, Dict, Any, Optional
+import numpy as np
+
+from chunk_store import ChunkStore
+from config import settings
+from document_processor import DocumentProcessor
+from llm_interface import LLMInterface
+from local_index import LocalIndex
+from sharded_index import ShardedLocalIndex
+from vector_store import VectorStore
+
+WORDS = (
+    "jarvis assistant knowledge retrieval vector embedding model policy product "
+    "customer remote work team project python learning data search answer "
+    "context document chunk system service support network quarterly report"
+).split()
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder standing in for a SentenceTransformer"""
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        buckets = [zlib.crc32(token.encode()) % self.dimension for token in text.lower().split()]
+        vector = np.bincount(buckets, minlength=self.dimension).astype(np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def encode(self, texts, batch_size: int = 32):
+        if isinstance(texts, str):
+            return self._embed_one(texts)
+        output = []
+        for start in range(0, len(texts), batch_size):
+            output.append(np.stack([self._embed_one(t) for t in texts[start:start + batch_size]]))
+        return np.concatenate(output) if output else np.zeros((0, self.dimension), dtype=np.float32)
+
+def make_text(chars: int, seed: int = 0) -> str:
+    """Generate sentence-structured filler text of roughly `chars` characters"""
+    rng = np.random.default_rng(seed)
+    sentences = []
+    total = 0
+    while total < chars:
+        sentence = " ".join(rng.choice(WORDS, size=int(rng.integers(6, 20)))).capitalize() + ". "
+        sentences.append(sentence)
+        total += len(sentence)
+    return "".join(sentences)[:chars]
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1, inner: int = 1) -> Dict[str, float]:
+    """
+    Time `fn` over several runs and summarize per-call seconds
+
+    Each sample averages `inner` back-to-back calls, which keeps
+    microsecond-scale operations above timer noise.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        samples.append((time.perf_counter() - start) / inner)
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p95': samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        'mean': statistics.fmean(samples),
+        'min': samples[0],
+        'runs': repeat
+    }
+
+def bench_chunking(sizes: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """DocumentProcessor.chunk_text throughput across document sizes"""
+    processor = DocumentProcessor()
+    results = {}
+    for size in sizes:
+        text = make_text(size)
+        timing = measure(lambda: processor.chunk_text(text), repeat)
+        chunks = len(processor.chunk_text(text))
+        results[f"chunk_text/chars={size}"] = {
+            **timing,
+            'chunks': chunks,
+            'chars_per_second': size / timing['p50']
+        }
+    return results
+
+def bench_embedding(store: VectorStore, batch_sizes: List[int], texts: int, repeat: int) -> Dict[str, Dict[str, Any]]:
+    """VectorStore.embed_texts throughput versus embedding batch size"""
+    corpus = [make_text(settings.chunk_size, seed=i) for i in range(texts)]
+    original = settings.embedding_batch_size
+    results = {}
+    try:
+        for batch_size in batch_sizes:
+            settings.embedding_batch_size = batch_size
+            timing = measure(lambda: store.embed_texts(corpus), repeat)
+            results[f"embed_texts/batch={batch_size}"] = {
+                **timing,
+                'texts': texts,
+                'texts_per_second': texts / timing['p50']
+            }
+    finally:
+        settings.embedding_batch_size = original
+    return results
+
+def bench_search(
+    embedder,
+    corpus_sizes: List[int],
+    queries: int,
+    repeat: int,
+    shards: Optional[List[int]] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Single and batched search latency versus corpus size and shard count
+
+    Each index is compacted into one segment per shard after background
+    merges settle, so the timings don't depend on merge scheduling.
+    """
+    shards = shards or [1]
+    rng = np.random.default_rng(0)
+    dimension = embedder.get_sentence_embedding_dimension()
+    questions = [make_text(80, seed=10_000 + i) for i in range(queries)]
+    chunk_text = make_text(settings.chunk_size)
+    results = {}
+
+    for size in corpus_sizes:
+        vectors = rng.standard_normal((size, dimension), dtype=np.float32)
+        for shard_count in shards:
+            index = LocalIndex(dimension=dimension) if shard_count == 1 else ShardedLocalIndex(dimension, shards=shard_count)
+            chunk_store = ChunkStore()
+            for start in range(0, size, 10_000):
+                rows = range(start, min(size, start + 10_000))
+                index.upsert([
+                    {'id': f"chunk-{row}", 'values': vectors[row], 'metadata': {'chunk_index': row}}
+                    for row in rows
+                ])
+                chunk_store.put_many({'id': f"chunk-{row}", 'text': chunk_text} for row in rows)
+            index.wait_for_merges()
+            index.compact()
+            store = VectorStore(embedding_model=embedder, index=index, chunk_store=chunk_store)
+            suffix = "" if shard_count == 1 else f"/shards={shard_count}"
+
+            timing = measure(lambda: store.search(questions[0], top_k=settings.top_k_results), repeat)
+            results[f"search/corpus={size}{suffix}"] = {**timing, 'corpus': size, 'shards': shard_count}
+
+            timing = measure(lambda: store.search_batch(questions, top_k=settings.top_k_results), repeat)
+            results[f"search_batch/corpus={size}{suffix}"] = {
+                **timing,
+                'corpus': size,
+                'shards': shard_count,
+                'queries': queries,
+                'seconds_per_query': timing['p50'] / queries
+            }
+    return results
+
+def bench_prompt(history_lengths: List[int], repeat: int) -> Dict[str, Dict[str, Any]]:
+    """Prompt and chat-message building cost versus conversation history length"""
+    llm = LLMInterface()
+    context = [make_text(settings.chunk_size, seed=i) for i in range(settings.top_k_results)]
+    results = {}
+    original = settings.llm_history_messages
+    try:
+        for length in history_lengths:
+            settings.llm_history_messages = max(length, 1)
+            history = [
+                {'role': 'user' if i % 2 == 0 else 'assistant', 'content': make_text(200, seed=i)}
+                for i in range(length)
+            ]
+            results[f"build_messages/history={length}"] = measure(
+                lambda: llm._build_messages("What is the remote work policy?", context, None, history),
+                repeat,
+                inner=1000
+            )
+            results[f"build_prompt/history={length}"] = measure(
+                lambda: llm._build_prompt("What is the remote work policy?", context, None, history),
+                repeat,
+                inner=1000
+            )
+    finally:
+        settings.llm_history_messages = original
+    return results
+
+def git_revision() -> Optional[str]:
+    """Current commit, if run from a git checkout"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """List benchmarks whose median got slower than baseline by more than `threshold`"""
+    regressions = []
+    for name, result in current.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get('p50'):
+            continue
+        change = result['p50'] / previous['p50'] - 1
+        marker = "REGRESSION" if change > threshold else "ok"
+        print(f"  {marker:<10} {name:<40} {previous['p50'] * 1e3:10.3f} ms -> {result['p50'] * 1e3:10.3f} ms ({change:+.1%})")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks for the RAG hot paths")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer runs")
+    parser.add_argument("--real-embeddings", action="store_true",
+                        help="use the configured sentence-transformer (must be cached locally)")
+    parser.add_argument("--shards", default="1,4", help="comma-separated local index shard counts for search")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from a previous run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown of the median counted as a regression")
+    args = parser.parse_args()
+
+    # Per-call INFO logging would dominate the cheaper hot paths
+    logging.disable(logging.INFO)
+
+    repeat = 3 if args.quick else 10
+    if args.real_embeddings:
+        from sentence_transformers import SentenceTransformer
+        embedder = SentenceTransformer(settings.embedding_model)
+    else:
+        embedder = HashingEmbedder()
+    store = VectorStore(
+        embedding_model=embedder,
+        index=LocalIndex(embedder.get_sentence_embedding_dimension()),
+        chunk_store=ChunkStore()
+    )
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print("Benchmarking chunk_text...")
+    results.update(bench_chunking([10_000, 100_000] if args.quick else [10_000, 100_000, 1_000_000], repeat))
+    if args.real_embeddings:
+        print("Benchmarking embed_texts...")
+        results.update(bench_embedding(store, [1, 8, 32, 128], 128 if args.quick else 512, repeat))
+    else:
+        print("Skipping embed_texts: the hashing stub's throughput is not meaningful (use --real-embeddings)")
+    print("Benchmarking search...")
+    results.update(bench_search(
+        embedder,
+        [1_000, 10_000] if args.quick else [1_000, 10_000, 100_000],
+        32,
+        repeat,
+        shards=[int(n) for n in args.shards.split(",")]
+    ))
+    print("Benchmarking prompt building...")
+    results.update(bench_prompt([0, 10, 50, 200], repeat))
+
+    for name, result in results.items():
+        print(f"  {name:<40} p50 {result['p50'] * 1e3:10.3f} ms   p95 {result['p95'] * 1e3:10.3f} ms")
+
+    report = {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'quick': args.quick,
+            'embedder': 'sentence-transformers' if args.real_embeddings else 'hashing-stub'
+        },
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Comparing against {args.compare} ({baseline.get('meta', {}).get('revision')})")
+        regressions = compare(results, baseline.get('results', {}), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
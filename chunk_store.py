@@ -0,0 +1,214 @@
+"""
+Local chunk-text store, so the vector index only holds ids and small metadata
+"""
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Stay under SQLite's default limit on bound parameters per statement
+MAX_PARAMS = 500
+
+class ChunkStore:
+    """
+    SQLite tables of chunk texts keyed by (collection, chunk id), with the
+    document each chunk belongs to, and of parent windows keyed by
+    (doc_id, parent_index)
+
+    As in the index, where each collection is a namespace, the same chunk
+    id may be stored in several collections without one replacing another.
+
+    Texts are written next to the vector upsert and fetched for all search
+    hits in one query afterwards, so index upserts and query responses stay
+    small regardless of chunk size. With no path the store is in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        with self._lock, self._conn:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                " id TEXT NOT NULL,"
+                " doc_id TEXT,"
+                " text TEXT NOT NULL,"
+                " collection TEXT NOT NULL DEFAULT '',"
+                " PRIMARY KEY (collection, id))"
+            )
+            columns = {row[1]: row[5] for row in self._conn.execute("PRAGMA table_info(chunks)")}
+            if 'collection' not in columns:
+                self._conn.execute("ALTER TABLE chunks ADD COLUMN collection TEXT NOT NULL DEFAULT ''")
+            if not columns.get('collection'):
+                self._rekey_chunks()
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_doc_id ON chunks (doc_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_id ON chunks (id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS parents ("
+                " doc_id TEXT NOT NULL,"
+                " parent_index INTEGER NOT NULL,"
+                " text TEXT NOT NULL,"
+                " PRIMARY KEY (doc_id, parent_index))"
+            )
+
+    def _rekey_chunks(self):
+        """Rebuild a chunks table keyed by id alone to key on (collection, id); called in a transaction"""
+        logger.info("Re-keying chunk store on (collection, id)")
+        self._conn.execute("DROP INDEX IF EXISTS chunks_doc_id")
+        self._conn.execute("ALTER TABLE chunks RENAME TO chunks_by_id")
+        self._conn.execute(
+            "CREATE TABLE chunks ("
+            " id TEXT NOT NULL,"
+            " doc_id TEXT,"
+            " text TEXT NOT NULL,"
+            " collection TEXT NOT NULL DEFAULT '',"
+            " PRIMARY KEY (collection, id))"
+        )
+        self._conn.execute(
+            "INSERT INTO chunks (id, doc_id, text, collection) SELECT id, doc_id, text, collection FROM chunks_by_id"
+        )
+        self._conn.execute("DROP TABLE chunks_by_id")
+
+    def put_many(self, chunks: Iterable[Dict[str, Any]]):
+        """Insert or overwrite chunks given as dicts with 'id', 'text' and optional 'doc_id', 'collection'"""
+        rows = [(chunk['id'], chunk.get('doc_id'), chunk['text'], chunk.get('collection') or "") for chunk in chunks]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, doc_id, text, collection) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+    def get_many(self, ids: List[str], collection: Optional[str] = None) -> Dict[str, str]:
+        """
+        Look up the texts of many chunks; unknown ids are left out
+
+        Args:
+            ids: Chunk ids
+            collection: Collection namespace the chunks are in; any when None
+        """
+        texts: Dict[str, str] = {}
+        where, params = ("collection = ? AND ", [collection]) if collection is not None else ("", [])
+        with self._lock:
+            for start in range(0, len(ids), MAX_PARAMS):
+                batch = ids[start:start + MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                texts.update(self._conn.execute(
+                    f"SELECT id, text FROM chunks WHERE {where}id IN ({placeholders})", params + batch
+                ))
+        return texts
+
+    def put_parents(self, parents: Iterable[Dict[str, Any]]):
+        """Insert or overwrite parent windows given as dicts with 'doc_id', 'parent_index', 'text'"""
+        rows = [(parent['doc_id'], parent['parent_index'], parent['text']) for parent in parents]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO parents (doc_id, parent_index, text) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def get_parents(self, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        """Look up many parent windows by (doc_id, parent_index); unknown keys are left out"""
+        texts: Dict[Tuple[str, int], str] = {}
+        with self._lock:
+            for start in range(0, len(keys), MAX_PARAMS // 2):
+                batch = keys[start:start + MAX_PARAMS // 2]
+                placeholders = ", ".join("(?, ?)" for _ in batch)
+                params = [value for key in batch for value in key]
+                for doc_id, parent_index, text in self._conn.execute(
+                    f"SELECT doc_id, parent_index, text FROM parents "
+                    f"WHERE (doc_id, parent_index) IN (VALUES {placeholders})",
+                    params
+                ):
+                    texts[(doc_id, parent_index)] = text
+        return texts
+
+    def ids_for_doc(self, doc_id: str) -> Dict[str, List[str]]:
+        """Ids of all chunks of a document, by collection"""
+        ids: Dict[str, List[str]] = {}
+        with self._lock:
+            for id_, collection in self._conn.execute(
+                "SELECT id, collection FROM chunks WHERE doc_id = ?", (doc_id,)
+            ):
+                ids.setdefault(collection, []).append(id_)
+        return ids
+
+    def existing_docs(self, doc_ids: List[str]) -> set:
+        """The subset of doc_ids that have at least one chunk"""
+        found = set()
+        with self._lock:
+            for start in range(0, len(doc_ids), MAX_PARAMS):
+                batch = doc_ids[start:start + MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                found.update(row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT doc_id FROM chunks WHERE doc_id IN ({placeholders})", batch
+                ))
+        return found
+
+    def delete_collection(self, collection: str) -> int:
+        """
+        Remove every chunk of a collection and the parent windows of its
+        documents that have no chunks in other collections; returns the chunk count
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM parents WHERE doc_id IN (SELECT doc_id FROM chunks WHERE collection = ?)"
+                " AND doc_id NOT IN (SELECT doc_id FROM chunks WHERE collection != ? AND doc_id IS NOT NULL)",
+                (collection, collection)
+            )
+            return self._conn.execute("DELETE FROM chunks WHERE collection = ?", (collection,)).rowcount
+
+    def delete_chunks(self, ids: List[str], collection: Optional[str] = None):
+        """Remove chunks by id, from one collection namespace or (when None) all"""
+        where, params = ("collection = ? AND ", [collection]) if collection is not None else ("", [])
+        with self._lock, self._conn:
+            for start in range(0, len(ids), MAX_PARAMS):
+                batch = ids[start:start + MAX_PARAMS]
+                placeholders = ",".join("?" * len(batch))
+                self._conn.execute(f"DELETE FROM chunks WHERE {where}id IN ({placeholders})", params + batch)
+
+    def delete_parents(self, doc_id: str, from_index: int = 0):
+        """Remove a document's parent windows numbered `from_index` and up"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM parents WHERE doc_id = ? AND parent_index >= ?",
+                (doc_id, from_index)
+            )
+
+    def iter_parents(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Yield all parent windows in batches"""
+        last: Tuple[str, int] = ("", -1)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT doc_id, parent_index, text FROM parents "
+                    "WHERE (doc_id, parent_index) > (?, ?) ORDER BY doc_id, parent_index LIMIT ?",
+                    (*last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield [{'doc_id': doc_id, 'parent_index': index, 'text': text} for doc_id, index, text in rows]
+            last = rows[-1][:2]
+
+    def delete_all(self):
+        """Remove every chunk and parent window"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM parents")
+
+    def count(self) -> int:
+        """Number of stored chunks"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
@@ -2,6 +2,7 @@
 Configuration management for the Jarvis AI Assistant
 """
 import os
+from typing import List
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
 
@@ -16,22 +17,104 @@ class Settings(BaseSettings):
     pinecone_environment: str = os.getenv("PINECONE_ENVIRONMENT", "")
     pinecone_index_name: str = os.getenv("PINECONE_INDEX_NAME", "jarvis-knowledge-base")
     
+    # Vector Backend ("pinecone" or "local")
+    vector_backend: str = os.getenv("VECTOR_BACKEND", "pinecone")
+    local_index_path: str = os.getenv("LOCAL_INDEX_PATH", "./data/index")
+    chunk_store_path: str = os.getenv("CHUNK_STORE_PATH", "./data/chunks.db")
+    local_compact_ratio: float = float(os.getenv("LOCAL_COMPACT_RATIO", "0.2"))
+    local_index_shards: int = int(os.getenv("LOCAL_INDEX_SHARDS", "1"))
+    local_max_segments: int = int(os.getenv("LOCAL_MAX_SEGMENTS", "8"))
+    
     # LLM Configuration
     ollama_base_url: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    ollama_base_urls: str = os.getenv("OLLAMA_BASE_URLS", "")
     ollama_model: str = os.getenv("OLLAMA_MODEL", "llama2")
+    ollama_use_chat: bool = os.getenv("OLLAMA_USE_CHAT", "true").lower() == "true"
+    llm_history_messages: int = int(os.getenv("LLM_HISTORY_MESSAGES", "10"))
+    llm_max_sessions: int = int(os.getenv("LLM_MAX_SESSIONS", "1000"))
+    
+    # Model Residency and Generation Options
+    ollama_keep_alive: str = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+    ollama_preload: bool = os.getenv("OLLAMA_PRELOAD", "true").lower() == "true"
+    ollama_warm_interval: float = float(os.getenv("OLLAMA_WARM_INTERVAL", "240"))
+    ollama_warm_hours: str = os.getenv("OLLAMA_WARM_HOURS", "")
+    ollama_warm_days: str = os.getenv("OLLAMA_WARM_DAYS", "")
+    ollama_preload_timeout: float = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT", "300"))
+    llm_num_predict: int = int(os.getenv("LLM_NUM_PREDICT", "0"))
+    llm_num_ctx: int = int(os.getenv("LLM_NUM_CTX", "0"))
+    llm_stop: str = os.getenv("LLM_STOP", "")
+    
+    # LLM Admission Control
+    llm_max_concurrency: int = int(os.getenv("LLM_MAX_CONCURRENCY", "1"))
+    llm_max_queue_depth: int = int(os.getenv("LLM_MAX_QUEUE_DEPTH", "32"))
+    llm_max_queue_wait: float = float(os.getenv("LLM_MAX_QUEUE_WAIT", "30"))
+    llm_request_deadline: float = float(os.getenv("LLM_REQUEST_DEADLINE", "120"))
+    
+    # LLM Replica Routing
+    llm_failure_threshold: int = int(os.getenv("LLM_FAILURE_THRESHOLD", "3"))
+    llm_circuit_cooldown: float = float(os.getenv("LLM_CIRCUIT_COOLDOWN", "30"))
+    llm_max_retries: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
     
     # Embedding Configuration
     embedding_model: str = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    index_manifest_path: str = os.getenv("INDEX_MANIFEST_PATH", "./data/manifest.json")
+    migration_batch_size: int = int(os.getenv("MIGRATION_BATCH_SIZE", "256"))
+    migration_duty_cycle: float = float(os.getenv("MIGRATION_DUTY_CYCLE", "0.5"))
+    projection_dimension: int = int(os.getenv("PROJECTION_DIMENSION", "128"))
+    projection_sample_size: int = int(os.getenv("PROJECTION_SAMPLE_SIZE", "10000"))
+    projection_dir: str = os.getenv("PROJECTION_DIR", "./data/projections")
     
     # RAG Configuration
     chunk_size: int = int(os.getenv("CHUNK_SIZE", "500"))
     chunk_overlap: int = int(os.getenv("CHUNK_OVERLAP", "50"))
+    parent_chunk_size: int = int(os.getenv("PARENT_CHUNK_SIZE", "0"))
     top_k_results: int = int(os.getenv("TOP_K_RESULTS", "3"))
+    query_coalescing: bool = os.getenv("QUERY_COALESCING", "true").lower() == "true"
+    retrieval_gating: bool = os.getenv("RETRIEVAL_GATING", "true").lower() == "true"
+    retrieval_min_score: float = float(os.getenv("RETRIEVAL_MIN_SCORE", "0"))
+    retrieval_score_cliff: float = float(os.getenv("RETRIEVAL_SCORE_CLIFF", "0"))
+    
+    # Multi-Query Retrieval Configuration
+    multi_query: bool = os.getenv("MULTI_QUERY", "false").lower() == "true"
+    multi_query_mode: str = os.getenv("MULTI_QUERY_MODE", "rules")
+    multi_query_variants: int = int(os.getenv("MULTI_QUERY_VARIANTS", "3"))
+    multi_query_budget_ms: float = float(os.getenv("MULTI_QUERY_BUDGET_MS", "300"))
+    multi_query_cache_size: int = int(os.getenv("MULTI_QUERY_CACHE_SIZE", "1000"))
+    multi_query_num_predict: int = int(os.getenv("MULTI_QUERY_NUM_PREDICT", "96"))
+    multi_query_failure_ttl: float = float(os.getenv("MULTI_QUERY_FAILURE_TTL", "60"))
+    
+    # Document Extraction Configuration
+    extraction_workers: int = int(os.getenv("EXTRACTION_WORKERS", "2"))
+    sync_manifest_path: str = os.getenv("SYNC_MANIFEST_PATH", "./data/sync_manifest.json")
+    sync_read_workers: int = int(os.getenv("SYNC_READ_WORKERS", "8"))
+    sync_allowed_dirs: str = os.getenv("SYNC_ALLOWED_DIRS", "")
+    
+    # Batch Query Configuration
+    embedding_batch_size: int = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    batch_search_workers: int = int(os.getenv("BATCH_SEARCH_WORKERS", "8"))
+    batch_llm_concurrency: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+    max_batch_questions: int = int(os.getenv("MAX_BATCH_QUESTIONS", "5000"))
     
     # API Configuration
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
     api_port: int = int(os.getenv("API_PORT", "8000"))
     
+    # Health Check Configuration
+    health_check_interval: float = float(os.getenv("HEALTH_CHECK_INTERVAL", "15"))
+    health_check_timeout: float = float(os.getenv("HEALTH_CHECK_TIMEOUT", "5"))
+    
+    # Profiling Configuration
+    profile_header_enabled: bool = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+    profile_sample_rate: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    profile_dir: str = os.getenv("PROFILE_DIR", "./profiles")
+    profile_max_files: int = int(os.getenv("PROFILE_MAX_FILES", "200"))
+    
+    @property
+    def llm_backend_urls(self) -> List[str]:
+        """Ollama replicas to route between (OLLAMA_BASE_URLS, else OLLAMA_BASE_URL)"""
+        urls = [url.strip() for url in self.ollama_base_urls.split(",") if url.strip()]
+        return urls or [self.ollama_base_url]
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
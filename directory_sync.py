@@ -0,0 +1,395 @@
+"""
+Incremental sync of a directory tree into the knowledge base
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from config import settings
+from extractors import EXTENSIONS
+from metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SYNCED_FILES = REGISTRY.counter(
+    "jarvis_sync_files_total",
+    "Files handled by directory syncs, by action"
+)
+
+HASH_BLOCK_SIZE = 1 << 20
+
+class SyncInProgressError(RuntimeError):
+    """Raised when a sync is started while another one is running"""
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def file_doc_id(path: str) -> str:
+    """Stable document id of a synced file, so a lost manifest re-syncs in place"""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, "file://" + os.path.abspath(path)))
+
+class DirectorySync:
+    """
+    Mirrors the supported files under a directory into the knowledge base
+
+    A JSON manifest records the mtime, size, content hash and document id
+    of every synced file:
+
+    {
+        "directories": {"/abs/dir": {"collection": "docs", "synced_at": ...,
+                                     "files": {"a/b.md": {"mtime": ..., "size": ..., "sha256": ..., "doc_id": ...,
+                                                        "chunks": ...}}}}
+    }
+
+    A file whose mtime and size match its entry is skipped without being
+    read. Files whose stat changed are hashed in parallel, and only those
+    whose content changed are extracted (on the extraction worker pool)
+    and re-ingested. Files gone from the tree are deleted.
+
+    Entries are dropped when their documents are changed through the
+    knowledge API (see forget), and an unchanged file whose document is
+    no longer in the chunk store is re-ingested, so a cleared or
+    otherwise rewritten knowledge base is repaired by the next sync.
+    """
+
+    def __init__(self, vector_store, doc_processor, manifest_path: Optional[str] = None):
+        """
+        Args:
+            vector_store: VectorStore to sync into
+            doc_processor: DocumentProcessor used to extract and chunk files
+            manifest_path: JSON manifest file (defaults to SYNC_MANIFEST_PATH)
+        """
+        self.vector_store = vector_store
+        self.doc_processor = doc_processor
+        self.manifest_path = manifest_path or settings.sync_manifest_path
+        self.read_workers = settings.sync_read_workers
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self.data: Dict[str, Dict[str, Any]] = {'directories': {}}
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def save(self):
+        """Atomically write the manifest"""
+        if not self.manifest_path:
+            return
+        with self._manifest_lock:
+            self._write()
+
+    def _write(self):
+        if not self.manifest_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def forget(self, doc_id: Optional[str] = None, collection: Optional[str] = None):
+        """
+        Drop manifest entries whose documents were changed outside a sync,
+        so the next sync ingests their files again
+
+        Args:
+            doc_id: Drop the entry of this document
+            collection: Drop every directory synced into this collection
+
+        With neither argument the whole manifest is dropped.
+        """
+        with self._manifest_lock:
+            directories = self.data['directories']
+            if doc_id is None and collection is None:
+                directories.clear()
+            elif doc_id is not None:
+                for entry in directories.values():
+                    entry['files'] = {
+                        relpath: file for relpath, file in entry['files'].items() if file['doc_id'] != doc_id
+                    }
+            else:
+                collection = None if collection in ("", "default") else collection
+                for root in [root for root, entry in directories.items() if entry.get('collection') == collection]:
+                    del directories[root]
+            self._write()
+
+    @staticmethod
+    def _walk(root: str) -> Dict[str, os.stat_result]:
+        """
+        Stat every supported, non-hidden file under root, keyed by relative path
+
+        Symbolic links are skipped, so nothing outside root is read.
+        """
+        found = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(
+                d for d in dirnames if not d.startswith(".") and not os.path.islink(os.path.join(dirpath, d))
+            )
+            for filename in filenames:
+                if filename.startswith(".") or os.path.splitext(filename)[1].lower() not in EXTENSIONS:
+                    continue
+                path = os.path.join(dirpath, filename)
+                if os.path.islink(path) or os.path.commonpath([root, os.path.realpath(path)]) != root:
+                    logger.warning(f"Skipping {path}: symbolic link or outside {root}")
+                    continue
+                try:
+                    found[os.path.relpath(path, root).replace(os.sep, "/")] = os.stat(path, follow_symlinks=False)
+                except OSError as e:
+                    logger.warning(f"Skipping {path}: {e}")
+        return found
+
+    def _hash_all(self, root: str, relpaths: List[str]) -> Dict[str, Optional[str]]:
+        """Content hashes of files, read in parallel (None for unreadable files)"""
+        def hash_one(relpath: str) -> Optional[str]:
+            try:
+                return file_hash(os.path.join(root, relpath))
+            except OSError as e:
+                logger.warning(f"Cannot read {relpath}: {e}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, self.read_workers), thread_name_prefix="sync-read") as pool:
+            return dict(zip(relpaths, pool.map(hash_one, relpaths)))
+
+    def plan(self, directory: str, collection: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Compare a directory against its manifest entry
+
+        Returns:
+            Tuple of the plan ('added', 'changed', 'removed', 'touched' and
+            'unchanged' relative paths, plus 'unreadable') and the new file
+            entries of every present, readable file
+        """
+        root = os.path.realpath(directory)
+        previous = self.data['directories'].get(root, {})
+        old_files = previous.get('files', {})
+        recollect = (previous.get('collection') or None) != (collection or None)
+        current = self._walk(root)
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        to_hash = []
+        unchanged = []
+        for relpath, stat in current.items():
+            old = old_files.get(relpath)
+            if old and not recollect and old['mtime'] == stat.st_mtime and old['size'] == stat.st_size:
+                entries[relpath] = old
+                unchanged.append(relpath)
+            else:
+                to_hash.append(relpath)
+
+        added, changed, touched, unreadable = [], [], [], []
+        for relpath, digest in self._hash_all(root, to_hash).items():
+            if digest is None:
+                unreadable.append(relpath)
+                continue
+            stat = current[relpath]
+            old = old_files.get(relpath)
+            entries[relpath] = {
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha256': digest,
+                'doc_id': old['doc_id'] if old else file_doc_id(os.path.join(root, relpath))
+            }
+            if old is None:
+                added.append(relpath)
+            elif recollect or old['sha256'] != digest:
+                changed.append(relpath)
+            else:
+                touched.append(relpath)
+                entries[relpath]['chunks'] = old.get('chunks', 1)
+
+        # Files whose documents were deleted behind the manifest's back are ingested again
+        expected = {
+            entries[relpath]['doc_id']: relpath
+            for relpath in unchanged + touched
+            if entries[relpath].get('chunks', 1)
+        }
+        if expected:
+            for doc_id in set(expected) - self.vector_store.chunk_store.existing_docs(list(expected)):
+                relpath = expected[doc_id]
+                (unchanged if relpath in unchanged else touched).remove(relpath)
+                changed.append(relpath)
+
+        # An unreadable file keeps its old entry and content rather than being deleted
+        removed = [relpath for relpath in old_files if relpath not in current]
+        for relpath in unreadable:
+            if relpath in old_files:
+                entries[relpath] = old_files[relpath]
+
+        plan = {
+            'added': sorted(added),
+            'changed': sorted(changed),
+            'removed': sorted(removed),
+            'touched': sorted(touched),
+            'unchanged': sorted(unchanged),
+            'unreadable': sorted(unreadable)
+        }
+        return plan, entries
+
+    def sync(
+        self,
+        directory: str,
+        collection: Optional[str] = None,
+        dry_run: bool = False,
+        delete_removed: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Bring the knowledge base in line with a directory tree
+
+        Args:
+            directory: Directory to sync
+            collection: Collection its files belong to; the default collection when omitted
+            dry_run: Only report what would change
+            delete_removed: Delete documents of files no longer in the tree
+
+        Returns:
+            Report with the relative paths 'added', 'changed', 'removed' and
+            'failed', counts of 'unchanged' files (including 'touched' ones,
+            whose mtime changed but content did not) and timing
+
+        Raises:
+            NotADirectoryError: If directory is not a directory
+            SyncInProgressError: If another sync is running
+        """
+        if not os.path.isdir(directory):
+            raise NotADirectoryError(f"Not a directory: {directory}")
+        if not self._lock.acquire(blocking=False):
+            raise SyncInProgressError("A directory sync is already running")
+        try:
+            # The default collection is recorded as None however it was named
+            collection = None if collection in (None, "", "default") else collection
+            return self._sync(os.path.realpath(directory), collection, dry_run, delete_removed)
+        finally:
+            self._lock.release()
+
+    def _sync(self, root: str, collection: Optional[str], dry_run: bool, delete_removed: bool) -> Dict[str, Any]:
+        start = time.perf_counter()
+        plan, entries = self.plan(root, collection)
+        old_files = self.data['directories'].get(root, {}).get('files', {})
+        if not delete_removed:
+            for relpath in plan['removed']:
+                entries[relpath] = old_files[relpath]
+            plan['removed'] = []
+
+        report = {
+            'directory': root,
+            'collection': collection,
+            'dry_run': dry_run,
+            'added': plan['added'],
+            'changed': plan['changed'],
+            'removed': plan['removed'],
+            'failed': list(plan['unreadable']),
+            'unchanged': len(plan['unchanged']) + len(plan['touched']),
+            'touched': len(plan['touched'])
+        }
+        if dry_run:
+            report['seconds'] = round(time.perf_counter() - start, 3)
+            return report
+
+        # Extract new and changed files on the worker pool, ingesting each as it finishes
+        to_ingest = {os.path.join(root, relpath): relpath for relpath in plan['added'] + plan['changed']}
+        doc_ids = {path: entries[relpath]['doc_id'] for path, relpath in to_ingest.items()}
+        for path, chunks in self.doc_processor.process_files(list(to_ingest), doc_ids=doc_ids):
+            relpath = to_ingest[path]
+            doc_id = doc_ids[path]
+            if chunks is None:
+                ok = False
+            elif chunks:
+                ok = self.vector_store.replace_document(doc_id, chunks, collection)
+            else:
+                ok = self.vector_store.delete_document(doc_id) is not None
+            if ok:
+                entries[relpath] = {**entries[relpath], 'chunks': len(chunks)}
+            else:
+                report['failed'].append(relpath)
+                # Retry on the next sync: keep the old entry of a changed file, drop a new one
+                if relpath in old_files:
+                    entries[relpath] = old_files[relpath]
+                else:
+                    entries.pop(relpath, None)
+
+        for relpath in plan['removed']:
+            if self.vector_store.delete_document(old_files[relpath]['doc_id']) is None:
+                report['failed'].append(relpath)
+                entries[relpath] = old_files[relpath]
+
+        # A file is reported once: as failed, not also as added, changed or removed
+        failed = set(report['failed'])
+        for action in ('added', 'changed', 'removed'):
+            report[action] = [relpath for relpath in report[action] if relpath not in failed]
+
+        for action in ('added', 'changed', 'removed'):
+            SYNCED_FILES.inc(len(report[action]), action=action)
+        SYNCED_FILES.inc(report['unchanged'], action="unchanged")
+        SYNCED_FILES.inc(len(report['failed']), action="failed")
+
+        with self._manifest_lock:
+            self.data['directories'][root] = {
+                'collection': collection,
+                'synced_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'files': entries
+            }
+            self._write()
+        report['seconds'] = round(time.perf_counter() - start, 3)
+        logger.info(
+            f"Synced {root}: {len(report['added'])} added, {len(report['changed'])} changed, "
+            f"{len(report['removed'])} removed, {report['unchanged']} unchanged, "
+            f"{len(report['failed'])} failed in {report['seconds']}s"
+        )
+        return report
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Sync a directory tree into the knowledge base")
+    parser.add_argument("directory", help="directory to sync")
+    parser.add_argument("--collection", help="collection to sync into (default collection if omitted)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--keep-removed", action="store_true", help="do not delete documents of removed files")
+    parser.add_argument("--verbose", action="store_true", help="list every added, changed and removed file")
+    args = parser.parse_args()
+
+    from vector_store import VectorStore, collection_namespace
+    from document_processor import DocumentProcessor
+    try:
+        collection_namespace(args.collection)
+    except ValueError as e:
+        parser.error(str(e))
+
+    vector_store = VectorStore()
+    doc_processor = DocumentProcessor()
+    try:
+        report = DirectorySync(vector_store, doc_processor).sync(
+            args.directory,
+            collection=args.collection,
+            dry_run=args.dry_run,
+            delete_removed=not args.keep_removed
+        )
+    except NotADirectoryError as e:
+        parser.error(str(e))
+    finally:
+        doc_processor.close()
+
+    prefix = "Would sync" if args.dry_run else "Synced"
+    print(f"{prefix} {report['directory']} in {report['seconds']}s")
+    for action in ('added', 'changed', 'removed', 'failed'):
+        print(f"  {action:<10}{len(report[action]):>8}")
+        if args.verbose:
+            for relpath in report[action]:
+                print(f"    {relpath}")
+    print(f"  {'unchanged':<10}{report['unchanged']:>8}")
+    if report['failed'] and not args.dry_run:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
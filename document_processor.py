@@ -1,20 +1,63 @@
 """
 Document processing and chunking utilities
 """
+import asyncio
 import logging
+import multiprocessing
+import threading
+import time
 import uuid
-from typing import List, Dict, Any
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
 from config import settings
+from extractors import detect_format, extract_sections
+from metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EXTRACTED_DOCUMENTS = REGISTRY.counter(
+    "jarvis_extracted_documents_total",
+    "Files extracted and chunked, by format"
+)
+EXTRACTED_BYTES = REGISTRY.counter(
+    "jarvis_extracted_bytes_total",
+    "Bytes of files extracted and chunked, by format"
+)
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "jarvis_extraction_seconds",
+    "Time to extract and chunk one file, by format"
+)
+
+# Processor of an extraction worker process, created on its first file
+_worker_processor = None
+
+def _process_file(
+    source: Union[str, bytes],
+    filename: Optional[str],
+    doc_id: Optional[str],
+    doc_name: Optional[str],
+    doc_type: Optional[str]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Extract and chunk one file in an extraction worker"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor()
+    return _worker_processor.process_file(source, filename, doc_id, doc_name, doc_type)
+
 class DocumentProcessor:
     """Handles document processing and chunking for RAG"""
     
     def __init__(self):
         self.chunk_size = settings.chunk_size
         self.chunk_overlap = settings.chunk_overlap
+        self.parent_chunk_size = settings.parent_chunk_size
+        self.extraction_workers = settings.extraction_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._extraction_stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
     
     def chunk_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
@@ -32,11 +75,108 @@ class DocumentProcessor:
             return []
         
         chunks = []
+        for chunk_text in self._split(text, self.chunk_size, self.chunk_overlap):
+            chunk = {
+                'id': str(uuid.uuid4()),
+                'text': chunk_text,
+                'metadata': {
+                    'chunk_index': len(chunks),
+                    **(metadata or {})
+                }
+            }
+            chunks.append(chunk)
+        
+        logger.info(f"Created {len(chunks)} chunks from text")
+        return chunks
+    
+    def chunk_with_parents(
+        self,
+        text: str,
+        metadata: Dict[str, Any] = None,
+        first_parent: int = 0
+    ) -> List[Dict[str, Any]]:
+        """
+        Split text into parent windows, then each window into child chunks
+        
+        Children are what gets embedded and searched. Each one carries its
+        window's `parent_index` in metadata and the window text under
+        'parent_text', so a hit can be answered with the whole window.
+        
+        Args:
+            text: Text to chunk
+            metadata: Optional metadata to attach to chunks
+            first_parent: Index of the first parent window
+        
+        Returns:
+            List of child chunks, numbered across the whole text
+        """
+        chunks = []
+        for parent_index, parent_text in enumerate(self._split(text, self.parent_chunk_size, 0), first_parent):
+            for child in self.chunk_text(parent_text, {**(metadata or {}), 'parent_index': parent_index}):
+                child['metadata']['chunk_index'] = len(chunks)
+                child['parent_text'] = parent_text
+                chunks.append(child)
+        return chunks
+    
+    def chunk_sections(self, sections: Iterable[str], metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Chunk a document given as a stream of sections (pages, headings)
+        
+        Sections are consumed as they are produced. Consecutive short
+        sections are joined up to a full chunk (or parent window), and
+        chunks never span the end of a longer section.
+        
+        Args:
+            sections: Text of each section, in order
+            metadata: Optional metadata to attach to chunks
+        
+        Returns:
+            List of chunks, numbered across the whole document
+        """
+        use_parents = self.parent_chunk_size > self.chunk_size
+        block_size = self.parent_chunk_size if use_parents else self.chunk_size
+        
+        chunks = []
+        next_parent = 0
+        for block in self._join_sections(sections, block_size):
+            if use_parents:
+                block_chunks = self.chunk_with_parents(block, metadata, first_parent=next_parent)
+                if block_chunks:
+                    next_parent = block_chunks[-1]['metadata']['parent_index'] + 1
+            else:
+                block_chunks = self.chunk_text(block, metadata)
+            for chunk in block_chunks:
+                chunk['metadata']['chunk_index'] = len(chunks)
+                chunks.append(chunk)
+        return chunks
+    
+    @staticmethod
+    def _join_sections(sections: Iterable[str], size: int) -> Iterator[str]:
+        """Join consecutive sections until each block holds at least `size` characters"""
+        pending: List[str] = []
+        pending_length = 0
+        for section in sections:
+            section = section.strip()
+            if not section:
+                continue
+            pending.append(section)
+            pending_length += len(section)
+            if pending_length >= size:
+                yield "\n\n".join(pending)
+                pending = []
+                pending_length = 0
+        if pending:
+            yield "\n\n".join(pending)
+    
+    @staticmethod
+    def _split(text: str, size: int, overlap: int) -> List[str]:
+        """Split text into pieces of about `size` characters, preferring sentence ends"""
+        pieces = []
         start = 0
         text_length = len(text)
         
         while start < text_length:
-            end = start + self.chunk_size
+            end = start + size
             
             # Try to find a natural break point (sentence end)
             if end < text_length:
@@ -46,28 +186,18 @@ class DocumentProcessor:
                         end = i + 1
                         break
             
-            chunk_text = text[start:end].strip()
-            
-            if chunk_text:
-                chunk = {
-                    'id': str(uuid.uuid4()),
-                    'text': chunk_text,
-                    'metadata': {
-                        'chunk_index': len(chunks),
-                        **(metadata or {})
-                    }
-                }
-                chunks.append(chunk)
+            piece = text[start:end].strip()
+            if piece:
+                pieces.append(piece)
             
-            # Move to next chunk with overlap
-            start = end - self.chunk_overlap
+            # Move to next piece with overlap
+            start = end - overlap
             
             # Ensure we make progress
-            if start <= end - self.chunk_size:
+            if start <= end - size:
                 start = end
         
-        logger.info(f"Created {len(chunks)} chunks from text")
-        return chunks
+        return pieces
     
     def process_document(
         self,
@@ -97,11 +227,209 @@ class DocumentProcessor:
             'doc_type': doc_type or 'text'
         }
         
-        chunks = self.chunk_text(text, metadata)
+        if self.parent_chunk_size > self.chunk_size:
+            chunks = self.chunk_with_parents(text, metadata)
+        else:
+            chunks = self.chunk_text(text, metadata)
         logger.info(f"Processed document '{doc_name}' into {len(chunks)} chunks")
         
         return chunks
     
+    def process_file(
+        self,
+        source: Union[str, bytes],
+        filename: str = None,
+        doc_id: str = None,
+        doc_name: str = None,
+        doc_type: str = None
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Extract text from a file of any supported format and chunk it
+        
+        Pages and sections stream from the extractor straight into the
+        chunker. Runs in the calling thread; see `process_file_async` and
+        `process_files` to run it in the extraction worker pool.
+        
+        Args:
+            source: Path of the file, or its contents
+            filename: Name used to detect the format (defaults to the path)
+            doc_id: Document identifier
+            doc_name: Document name/title (defaults to the file name)
+            doc_type: Document type (defaults to the detected format)
+        
+        Returns:
+            Tuple of the chunks and extraction stats ('format', 'bytes',
+            'sections', 'chunks', 'seconds')
+        
+        Raises:
+            UnsupportedFormatError: If the format is unknown or its extractor
+                is not installed
+        """
+        start = time.perf_counter()
+        if isinstance(source, str):
+            filename = filename or source
+            with open(source, 'rb') as f:
+                data = f.read()
+        else:
+            data = source
+        name = (filename or "").replace("\\", "/").split('/')[-1] or None
+        file_format = detect_format(name, data)
+        
+        metadata = {
+            'doc_id': doc_id or str(uuid.uuid4()),
+            'doc_name': doc_name or name or 'Unknown',
+            'doc_type': doc_type or file_format
+        }
+        
+        section_count = 0
+        def counted(sections: Iterable[str]) -> Iterator[str]:
+            nonlocal section_count
+            for section in sections:
+                section_count += 1
+                yield section
+        
+        chunks = self.chunk_sections(counted(extract_sections(data, file_format)), metadata)
+        stats = {
+            'format': file_format,
+            'bytes': len(data),
+            'sections': section_count,
+            'chunks': len(chunks),
+            'seconds': time.perf_counter() - start
+        }
+        logger.info(
+            f"Extracted {file_format} file '{metadata['doc_name']}' into {section_count} sections "
+            f"and {len(chunks)} chunks in {stats['seconds']:.2f}s"
+        )
+        return chunks, stats
+    
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Extraction worker processes, started on first use (None when EXTRACTION_WORKERS is 0)"""
+        if self.extraction_workers <= 0:
+            return None
+        with self._pool_lock:
+            if self._pool is None:
+                # Forked where possible: spawned workers re-run the main module, which
+                # for `python api.py` would load a second embedding model per worker
+                methods = multiprocessing.get_all_start_methods()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.extraction_workers,
+                    mp_context=multiprocessing.get_context("fork" if "fork" in methods else None)
+                )
+            return self._pool
+    
+    def _reset_pool(self):
+        """Drop a pool whose worker died so the next file starts a new one"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+    
+    def _record_extraction(self, stats: Dict[str, Any]):
+        """Add one file's extraction stats to the per-format totals"""
+        file_format = stats['format']
+        EXTRACTED_DOCUMENTS.inc(format=file_format)
+        EXTRACTED_BYTES.inc(stats['bytes'], format=file_format)
+        EXTRACTION_SECONDS.observe(stats['seconds'], format=file_format)
+        with self._stats_lock:
+            totals = self._extraction_stats.setdefault(
+                file_format, {'documents': 0, 'bytes': 0, 'sections': 0, 'chunks': 0, 'seconds': 0.0}
+            )
+            totals['documents'] += 1
+            for key in ('bytes', 'sections', 'chunks', 'seconds'):
+                totals[key] += stats[key]
+    
+    async def process_file_async(
+        self,
+        source: Union[str, bytes],
+        filename: str = None,
+        doc_id: str = None,
+        doc_name: str = None,
+        doc_type: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        `process_file` in the extraction worker pool, off the event loop
+        
+        Returns:
+            List of chunks ready for vector store
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            chunks, stats = await loop.run_in_executor(
+                self._get_pool(), _process_file, source, filename, doc_id, doc_name, doc_type
+            )
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise
+        self._record_extraction(stats)
+        return chunks
+    
+    def process_files(
+        self,
+        paths: List[str],
+        doc_type: str = None,
+        doc_ids: Dict[str, str] = None
+    ) -> Iterator[Tuple[str, Optional[List[Dict[str, Any]]]]]:
+        """
+        Extract and chunk many files in parallel on the extraction worker pool
+        
+        Args:
+            paths: Files to process
+            doc_type: Document type of every file (defaults to each detected format)
+            doc_ids: Document identifier of each path; generated for paths not in it
+        
+        Yields:
+            (path, chunks) as each file finishes; chunks is None for a file
+            that could not be read or extracted
+        """
+        pool = self._get_pool()
+        if pool is None:
+            for path in paths:
+                yield path, self._process_one(path, doc_type, (doc_ids or {}).get(path))
+            return
+        
+        futures = {
+            pool.submit(_process_file, path, None, (doc_ids or {}).get(path), None, doc_type): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                chunks, stats = future.result()
+            except BrokenProcessPool:
+                self._reset_pool()
+                raise
+            except Exception as e:
+                logger.error(f"Error extracting {path}: {e}")
+                yield path, None
+                continue
+            self._record_extraction(stats)
+            yield path, chunks
+    
+    def _process_one(self, path: str, doc_type: str = None, doc_id: str = None) -> Optional[List[Dict[str, Any]]]:
+        try:
+            chunks, stats = self.process_file(path, doc_id=doc_id, doc_type=doc_type)
+        except Exception as e:
+            logger.error(f"Error extracting {path}: {e}")
+            return None
+        self._record_extraction(stats)
+        return chunks
+    
+    def extraction_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-format extraction totals and throughput in MB/s"""
+        with self._stats_lock:
+            stats = {file_format: dict(totals) for file_format, totals in self._extraction_stats.items()}
+        for totals in stats.values():
+            totals['mb_per_second'] = round(totals['bytes'] / 1e6 / totals['seconds'], 3) if totals['seconds'] else 0.0
+            totals['seconds'] = round(totals['seconds'], 3)
+        return stats
+    
+    def close(self):
+        """Stop the extraction worker processes"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+    
     def process_multiple_documents(
         self,
         documents: List[Dict[str, str]]
@@ -0,0 +1,193 @@
+"""
+Text extraction for common document formats
+
+Each extractor yields a document as a stream of sections (PDF pages,
+Markdown and HTML heading sections, blocks of plain text), so a large
+document is chunked as it is read and never joined into one string.
+PDF support needs the optional `pypdf` package.
+"""
+import io
+import logging
+import os
+import re
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ("text", "markdown", "html", "pdf")
+
+EXTENSIONS = {
+    '.txt': "text", '.text': "text", '.log': "text", '.csv': "text", '.tsv': "text",
+    '.json': "text", '.yaml': "text", '.yml': "text", '.rst': "text",
+    '.md': "markdown", '.markdown': "markdown",
+    '.html': "html", '.htm': "html", '.xhtml': "html",
+    '.pdf': "pdf"
+}
+
+# Plain text is yielded in sections of about this many characters
+TEXT_SECTION_CHARS = 64_000
+# HTML is fed to the parser in pieces of this many characters
+HTML_FEED_CHARS = 64_000
+
+class UnsupportedFormatError(ValueError):
+    """Raised for files no extractor can read"""
+
+def detect_format(filename: Optional[str], data: bytes) -> str:
+    """
+    Format of a file, from its extension or else its first bytes
+
+    Raises:
+        UnsupportedFormatError: If the file is neither a known format nor text
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension in EXTENSIONS:
+        return EXTENSIONS[extension]
+
+    head = data[:1024]
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    lowered = head.lower()
+    if b"<html" in lowered or b"<!doctype html" in lowered:
+        return "html"
+    if b"\x00" not in head:
+        return "text"
+    raise UnsupportedFormatError(f"Unsupported file type: {filename or 'unnamed file'}")
+
+def decode_text(data: bytes) -> str:
+    """Decode UTF-8 (with or without BOM), falling back to Latin-1"""
+    try:
+        return data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        logger.warning("File is not valid UTF-8; decoding as Latin-1")
+        return data.decode("latin-1")
+
+def _clean(text: str) -> str:
+    """Collapse runs of spaces and blank lines"""
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+def extract_text(data: bytes) -> Iterator[str]:
+    """Plain text in blocks of whole paragraphs"""
+    text = decode_text(data)
+    start = 0
+    while start < len(text):
+        end = start + TEXT_SECTION_CHARS
+        if end < len(text):
+            # End the section at a paragraph break where there is one
+            paragraph_end = text.rfind("\n\n", start, end)
+            if paragraph_end > start:
+                end = paragraph_end
+        yield text[start:end]
+        start = end
+
+_MD_HEADING = re.compile(r"^#{1,6}\s")
+_MD_IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_MD_LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+_MD_EMPHASIS = re.compile(r"(\*\*|__|\*|_|~~|`)(?=\S)(.+?)(?<=\S)\1")
+_MD_TAG = re.compile(r"</?[A-Za-z][^>]*>")
+
+def _markdown_line(line: str) -> str:
+    line = re.sub(r"^#{1,6}\s+", "", line)
+    line = re.sub(r"^\s{0,3}>\s?", "", line)
+    line = _MD_IMAGE.sub(r"\1", line)
+    line = _MD_LINK.sub(r"\1", line)
+    line = _MD_EMPHASIS.sub(r"\2", line)
+    line = _MD_TAG.sub("", line)
+    if re.fullmatch(r"\s*\|?[\s:|-]+\|?\s*", line) and "-" in line:
+        return ""  # table separator row
+    return line.replace("|", " ")
+
+def extract_markdown(data: bytes) -> Iterator[str]:
+    """Markdown as plain text, one section per heading"""
+    section: List[str] = []
+    in_code = False
+    for line in decode_text(data).splitlines():
+        if line.lstrip().startswith(("```", "~~~")):
+            in_code = not in_code
+            continue
+        if not in_code and _MD_HEADING.match(line) and section:
+            yield _clean("\n".join(section))
+            section = []
+        section.append(line if in_code else _markdown_line(line))
+    if section:
+        yield _clean("\n".join(section))
+
+class _HTMLSections(HTMLParser):
+    """Collects visible text, starting a new section at each h1-h3"""
+
+    SKIP = {"script", "style", "noscript", "template", "svg"}
+    BLOCK = {
+        "p", "div", "br", "li", "ul", "ol", "tr", "table", "section", "article", "header",
+        "footer", "nav", "aside", "pre", "blockquote", "h4", "h5", "h6", "title", "dd", "dt"
+    }
+    HEADINGS = {"h1", "h2", "h3"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections: List[str] = []
+        self._current: List[str] = []
+        self._skip_depth = 0
+
+    def _end_section(self):
+        text = _clean("".join(self._current))
+        if text:
+            self.sections.append(text)
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.HEADINGS:
+            self._end_section()
+        elif tag in self.BLOCK:
+            self._current.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.BLOCK or tag in self.HEADINGS:
+            self._current.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._end_section()
+
+def extract_html(data: bytes) -> Iterator[str]:
+    """Visible HTML text, one section per h1-h3 heading, parsed incrementally"""
+    parser = _HTMLSections()
+    text = decode_text(data)
+    for start in range(0, len(text), HTML_FEED_CHARS):
+        parser.feed(text[start:start + HTML_FEED_CHARS])
+        yield from parser.sections
+        parser.sections = []
+    parser.close()
+    yield from parser.sections
+
+def extract_pdf(data: bytes) -> Iterator[str]:
+    """Text of each PDF page"""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise UnsupportedFormatError("PDF extraction requires the optional pypdf package (pip install pypdf)")
+
+    reader = PdfReader(io.BytesIO(data))
+    for page in reader.pages:
+        yield _clean(page.extract_text() or "")
+
+EXTRACTORS = {
+    "text": extract_text,
+    "markdown": extract_markdown,
+    "html": extract_html,
+    "pdf": extract_pdf
+}
+
+def extract_sections(data: bytes, file_format: str) -> Iterator[str]:
+    """Sections of text of a document in the given format"""
+    return EXTRACTORS[file_format](data)
@@ -0,0 +1,162 @@
+"""
+Local stand-in for the Ollama API, for load testing without a real model
+
+Emulates /api/tags, /api/generate and /api/chat with configurable model
+load, prefill and decode latency, optional streaming, and a per-model
+parallelism limit like Ollama's OLLAMA_NUM_PARALLEL.
+
+Usage:
+    python fake_ollama.py --port 11435 --decode-ms 20 --output-tokens 64
+    OLLAMA_BASE_URL=http://localhost:11435 python api.py
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+app = FastAPI(title="Fake Ollama")
+
+class FakeModel:
+    """Timing model for one emulated Ollama instance"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.name = args.model
+        self.load_seconds = args.load_ms / 1000
+        self.prefill_base_seconds = args.prefill_ms / 1000
+        self.prefill_per_token_seconds = args.prefill_per_token_ms / 1000
+        self.decode_per_token_seconds = args.decode_ms / 1000
+        self.output_tokens = args.output_tokens
+        self.idle_unload_seconds = args.unload_after
+        self.semaphore = asyncio.Semaphore(args.parallel)
+        self.loaded_until = 0.0
+
+    def load_time(self) -> float:
+        """Seconds to (re)load the model, zero if still resident"""
+        return 0.0 if time.monotonic() < self.loaded_until else self.load_seconds
+
+    def touch(self, keep_alive: Any):
+        """Keep the model resident for the requested or default duration"""
+        seconds = self.idle_unload_seconds
+        if isinstance(keep_alive, (int, float)):
+            seconds = float(keep_alive)
+        elif isinstance(keep_alive, str) and keep_alive[:-1].isdigit():
+            seconds = float(keep_alive[:-1]) * {'s': 1, 'm': 60, 'h': 3600}.get(keep_alive[-1], 1)
+        self.loaded_until = float("inf") if seconds < 0 else time.monotonic() + seconds
+
+model: FakeModel = None
+
+def count_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return max(1, len(text) // 4)
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    if "messages" in body:
+        return "".join(m.get("content", "") for m in body["messages"])
+    return body.get("prompt", "")
+
+async def generate(body: Dict[str, Any], chat: bool):
+    """Yield response chunks, sleeping to emulate load, prefill and decode"""
+    async with model.semaphore:
+        started = time.monotonic()
+        load = model.load_time()
+        await asyncio.sleep(load)
+
+        if "prompt" not in body and not body.get("messages"):
+            # Like Ollama, a request without a prompt only loads the model
+            model.touch(body.get("keep_alive"))
+            yield _chunk("", chat, done=True, stats={"load_duration": int(load * 1e9)})
+            return
+
+        prompt_tokens = count_tokens(prompt_text(body))
+        prefill = model.prefill_base_seconds + prompt_tokens * model.prefill_per_token_seconds
+        await asyncio.sleep(prefill)
+
+        options = body.get("options") or {}
+        output_tokens = min(model.output_tokens, options.get("num_predict") or model.output_tokens)
+        if output_tokens < 0:
+            output_tokens = model.output_tokens
+
+        decode_started = time.monotonic()
+        for i in range(output_tokens):
+            await asyncio.sleep(model.decode_per_token_seconds)
+            yield _chunk(f"token{i} ", chat, done=False)
+        decode = time.monotonic() - decode_started
+
+        model.touch(body.get("keep_alive"))
+        yield _chunk("", chat, done=True, stats={
+            "total_duration": int((time.monotonic() - started) * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": output_tokens,
+            "eval_duration": int(decode * 1e9)
+        })
+
+def _chunk(text: str, chat: bool, done: bool, stats: Dict[str, Any] = None) -> Dict[str, Any]:
+    chunk: Dict[str, Any] = {"model": model.name, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"), "done": done}
+    if chat:
+        chunk["message"] = {"role": "assistant", "content": text}
+    else:
+        chunk["response"] = text
+    chunk.update(stats or {})
+    return chunk
+
+async def respond(request: Request, chat: bool):
+    body = await request.json()
+    if body.get("stream", True):
+        async def lines():
+            async for chunk in generate(body, chat):
+                yield json.dumps(chunk) + "\n"
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    # Non-streaming: concatenate tokens into one final object
+    parts: List[str] = []
+    final: Dict[str, Any] = {}
+    async for chunk in generate(body, chat):
+        parts.append(chunk["message"]["content"] if chat else chunk["response"])
+        final = chunk
+    text = "".join(parts).strip()
+    if chat:
+        final["message"] = {"role": "assistant", "content": text}
+    else:
+        final["response"] = text
+    return final
+
+@app.get("/api/tags")
+async def tags():
+    return {"models": [{"name": model.name, "model": model.name, "size": 0}]}
+
+@app.post("/api/generate")
+async def api_generate(request: Request):
+    return await respond(request, chat=False)
+
+@app.post("/api/chat")
+async def api_chat(request: Request):
+    return await respond(request, chat=True)
+
+def main():
+    """Main entry point"""
+    global model
+    parser = argparse.ArgumentParser(description="Fake Ollama server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default="llama2", help="model name reported by /api/tags")
+    parser.add_argument("--parallel", type=int, default=1, help="concurrent generations (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--load-ms", type=float, default=0, help="model load time after being unloaded")
+    parser.add_argument("--unload-after", type=float, default=300, help="idle seconds before the model unloads")
+    parser.add_argument("--prefill-ms", type=float, default=50, help="fixed prefill latency")
+    parser.add_argument("--prefill-per-token-ms", type=float, default=0.2, help="prefill latency per prompt token")
+    parser.add_argument("--decode-ms", type=float, default=20, help="decode latency per output token")
+    parser.add_argument("--output-tokens", type=int, default=64, help="tokens generated per response")
+    args = parser.parse_args()
+
+    model = FakeModel(args)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
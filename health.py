@@ -0,0 +1,77 @@
+"""
+Background component health monitoring
+"""
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class HealthMonitor:
+    """
+    Runs component health checks on an interval and serves the last result
+
+    Probes hit the backends once per interval no matter how often health is
+    read, so orchestrator probes and UI polling are answered from memory.
+    """
+
+    def __init__(self, checks: Dict[str, Callable[[], Awaitable[bool]]], interval: float, timeout: float):
+        self.checks = checks
+        self.interval = interval
+        self.timeout = timeout
+        self.components: Dict[str, bool] = {name: False for name in checks}
+        self.checked_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def _run_check(self, name: str) -> bool:
+        try:
+            return bool(await asyncio.wait_for(self.checks[name](), self.timeout))
+        except Exception as e:
+            logger.error(f"Health check '{name}' failed: {e!r}")
+            return False
+
+    async def refresh(self) -> Dict[str, bool]:
+        """Run every check now and store the results"""
+        async with self._refresh_lock:
+            results = await asyncio.gather(*(self._run_check(name) for name in self.checks))
+            self.components = dict(zip(self.checks, results))
+            self.checked_at = time.time()
+            return self.components
+
+    async def _loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the background refresh task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the background refresh task"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Last known component health with staleness information"""
+        age = None if self.checked_at is None else time.time() - self.checked_at
+        return {
+            'components': {**self.components, 'overall': self.checked_at is not None and all(self.components.values())},
+            'checked_at': self.checked_at,
+            'age_seconds': age,
+            # Stale when the refresher has missed a couple of intervals (or never ran)
+            'stale': age is None or age > 2 * self.interval + self.timeout
+        }
@@ -0,0 +1,88 @@
+"""
+Manifest recording which embedding model built each vector index
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional, Dict, Any
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class IndexManifest:
+    """
+    JSON file mapping each configured index name to the physical index that
+    currently serves it, with the embedding model and dimension of every
+    index and the state of any model migration
+
+    {
+        "aliases": {"jarvis-knowledge-base": "jarvis-knowledge-base-v2"},
+        "indexes": {"jarvis-knowledge-base-v2": {"embedding_model": ..., "dimension": 128,
+                                                 "projection": {"type": "pca", "dim": 128, "path": ...}}},
+        "migrations": {"jarvis-knowledge-base": {"status": "completed", ...}}
+    }
+
+    Every change is written to a temporary file and renamed into place, so
+    the file is always either the old or the new version.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.RLock()
+        self.data: Dict[str, Dict[str, Any]] = {'aliases': {}, 'indexes': {}, 'migrations': {}}
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data.update(json.load(f))
+
+    def save(self):
+        """Atomically write the manifest"""
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+    def resolve(self, name: str) -> str:
+        """Physical index currently serving a configured index name"""
+        with self._lock:
+            return self.data['aliases'].get(name, name)
+
+    def index_info(self, index_name: str) -> Optional[Dict[str, Any]]:
+        """Model, dimension and projection recorded for a physical index"""
+        with self._lock:
+            return self.data['indexes'].get(index_name)
+
+    def register(self, index_name: str, embedding_model: str, dimension: int, projection: Optional[Dict[str, Any]] = None):
+        """Record the model, dimension and any projection a physical index is built with"""
+        with self._lock:
+            self.data['indexes'][index_name] = {
+                'embedding_model': embedding_model,
+                'dimension': dimension,
+                'projection': projection,
+                'created_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+            }
+            self.save()
+
+    def switch(self, name: str, index_name: str):
+        """Point a configured index name at another physical index"""
+        with self._lock:
+            self.data['aliases'][name] = index_name
+            self.save()
+
+    def migration(self, name: str) -> Optional[Dict[str, Any]]:
+        """State of the latest model migration of a configured index name"""
+        with self._lock:
+            state = self.data['migrations'].get(name)
+            return dict(state) if state else None
+
+    def update_migration(self, name: str, **fields):
+        """Update and persist migration state"""
+        with self._lock:
+            state = self.data['migrations'].setdefault(name, {})
+            state.update(fields, updated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+            self.save()
@@ -1,29 +1,125 @@
 """
 Interface for interacting with self-hosted LLM (Ollama)
 """
+import asyncio
+import json
 import logging
+import time
 import httpx
-from typing import Optional, List, Dict, Any
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from config import settings
+from llm_scheduler import LLMScheduler, Priority, AdmissionError, DeadlineExceededError
+from llm_router import LLMRouter
+from metrics import REGISTRY, record_stage, stage_timer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+TOKENS_PER_SECOND = REGISTRY.histogram(
+    "jarvis_llm_tokens_per_second",
+    "Ollama decode throughput per generation",
+    buckets=(1, 2, 5, 10, 20, 40, 80, 160, 320)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "jarvis_llm_tokens_total",
+    "Tokens processed by Ollama, by kind (prompt or completion)"
+)
+
+MODEL_LOADS = REGISTRY.counter(
+    "jarvis_llm_model_loads_total",
+    "Times Ollama had to load the model, by cause (preload, keep_warm or request)"
+)
+
+DEFAULT_SESSION = "default"
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Ollama reports a load_duration even for a resident model; longer means it was loaded
+COLD_LOAD_SECONDS = 0.5
+
+def parse_keep_alive(value: str) -> Any:
+    """OLLAMA_KEEP_ALIVE as Ollama expects it: seconds as a number, else a duration like '30m'"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+def parse_warm_days(days: str) -> set:
+    """Weekday numbers (Monday = 0) from e.g. 'mon-fri' or 'mon,wed,fri'; every day if empty"""
+    if not days.strip():
+        return set(range(7))
+    selected = set()
+    for part in days.lower().split(","):
+        first, _, last = part.strip().partition("-")
+        start = WEEKDAYS.index(first[:3])
+        end = WEEKDAYS.index(last[:3]) if last else start
+        selected.update(day % 7 for day in range(start, end + 1 if end >= start else end + 8))
+    return selected
+
+def within_warm_hours(now: datetime, hours: str, days: str) -> bool:
+    """
+    Whether the model should be kept loaded at a local time
+    
+    Args:
+        now: Local time
+        hours: Daily window like '08:00-18:00' (may wrap past midnight); always if empty
+        days: Weekdays like 'mon-fri'; every day if empty
+    """
+    if now.weekday() not in parse_warm_days(days):
+        return False
+    if not hours.strip():
+        return True
+    start, end = (datetime.strptime(t.strip(), "%H:%M").time() for t in hours.split("-"))
+    current = now.time()
+    return start <= current < end if start <= end else current >= start or current < end
+
+DEFAULT_SYSTEM_PROMPT = """You are Jarvis, a helpful AI assistant. You answer questions based on the provided context and your knowledge. 
+If the context doesn't contain relevant information, you can use your general knowledge to help, but mention when you're doing so.
+Be concise, accurate, and helpful."""
+
 class LLMInterface:
     """Manages interactions with the self-hosted LLM"""
     
     def __init__(self):
         """Initialize LLM interface"""
-        self.base_url = settings.ollama_base_url
         self.model = settings.ollama_model
-        self.conversation_history: List[Dict[str, str]] = []
+        self.sessions: "OrderedDict[str, List[Dict[str, str]]]" = OrderedDict()
+        self.router = LLMRouter(
+            urls=settings.llm_backend_urls,
+            failure_threshold=settings.llm_failure_threshold,
+            cooldown=settings.llm_circuit_cooldown
+        )
+        # Concurrency is per replica, so capacity grows with the pool
+        self.scheduler = LLMScheduler(
+            max_concurrency=settings.llm_max_concurrency * len(self.router.backends),
+            max_queue_depth=settings.llm_max_queue_depth,
+            max_queue_wait=settings.llm_max_queue_wait
+        )
+        self.keep_alive = parse_keep_alive(settings.ollama_keep_alive)
+        self._residency_task: Optional[asyncio.Task] = None
+        self._residency: Dict[str, Any] = {'last_ping': None, 'pings': 0, 'failed_pings': 0, 'cold_loads': 0}
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """History of the default session"""
+        return self.sessions.get(DEFAULT_SESSION, [])
     
     async def generate_response(
         self,
         query: str,
         context: Optional[List[str]] = None,
         system_prompt: Optional[str] = None,
-        stream: bool = False
+        stream: bool = False,
+        use_history: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
     ) -> str:
         """
         Generate a response from the LLM
@@ -33,64 +129,363 @@ class LLMInterface:
             context: Retrieved context from vector store
             system_prompt: Custom system prompt
             stream: Whether to stream the response
+            use_history: Whether to read and record the session's conversation
+                history (disabled for independent batch questions)
+            priority: Scheduling priority while waiting for a generation slot
+            timeout: Overall deadline in seconds, covering queueing and generation
+            session_id: Conversation session; defaults to the shared session
+            options: Ollama generation options (num_predict, num_ctx, stop)
+                overriding the configured ones
         
         Returns:
             Generated response text
+        
+        Raises:
+            AdmissionError: If the scheduler rejects the request due to overload
         """
         try:
-            # Build the prompt with context
-            prompt = self._build_prompt(query, context, system_prompt)
+            session_id = session_id or DEFAULT_SESSION
+            history = self._history_window(session_id) if use_history else []
             
-            # Make request to Ollama
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False
-                    }
-                )
+            endpoint, payload = self._build_request(query, context, system_prompt, history, stream=False, options=options)
+            
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + (timeout or settings.llm_request_deadline)
+            queued_at = loop.time()
+            
+            # Wait for a generation slot, then make request to Ollama
+            async with self.scheduler.slot(priority, deadline):
+                record_stage("llm_queue", loop.time() - queued_at)
+                if deadline - loop.time() <= 0:
+                    raise DeadlineExceededError("Request deadline passed before generation")
                 
-                if response.status_code == 200:
-                    result = response.json()
-                    generated_text = result.get("response", "")
+                with stage_timer("llm_generate"):
+                    result = await self._post_with_failover(endpoint, payload, deadline)
+                
+                if result is not None:
+                    self._record_generation_stats(result)
+                    
+                    if settings.ollama_use_chat:
+                        generated_text = result.get("message", {}).get("content", "")
+                    else:
+                        generated_text = result.get("response", "")
                     
                     # Store in conversation history
-                    self.conversation_history.append({
-                        "role": "user",
-                        "content": query
-                    })
-                    self.conversation_history.append({
-                        "role": "assistant",
-                        "content": generated_text
-                    })
+                    if use_history:
+                        self._record_exchange(session_id, query, generated_text)
                     
                     return generated_text
                 else:
-                    logger.error(f"LLM API error: {response.status_code}")
                     return "I apologize, but I'm having trouble generating a response right now."
         
+        except AdmissionError:
+            raise
         except Exception as e:
             logger.error(f"Error generating response: {e}")
             return "I encountered an error while processing your request."
     
+    async def complete(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        One-off generation outside any conversation, for internal helper prompts
+        
+        Unlike generate_response, failures are not turned into an apology.
+        
+        Returns:
+            Generated text, or None if every replica failed
+        
+        Raises:
+            AdmissionError: If the scheduler rejects the request due to overload
+        """
+        endpoint, payload = self._build_request(prompt, None, system_prompt, [], stream=False, options=options)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or settings.llm_request_deadline)
+        
+        async with self.scheduler.slot(priority, deadline):
+            if deadline - loop.time() <= 0:
+                raise DeadlineExceededError("Request deadline passed before generation")
+            result = await self._post_with_failover(endpoint, payload, deadline)
+        
+        if result is None:
+            return None
+        self._record_generation_stats(result)
+        if settings.ollama_use_chat:
+            return result.get("message", {}).get("content", "")
+        return result.get("response", "")
+    
+    async def stream_response(
+        self,
+        query: str,
+        context: Optional[List[str]] = None,
+        system_prompt: Optional[str] = None,
+        use_history: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response from the LLM, yielding text as it is decoded
+        
+        Takes the same scheduling slot as generate_response. A failed replica
+        is retried on another one only until the first text has been yielded;
+        after that the partial answer is kept and the stream ends.
+        
+        Args:
+            query: User's query
+            context: Retrieved context from vector store
+            system_prompt: Custom system prompt
+            use_history: Whether to read and record the session's conversation history
+            priority: Scheduling priority while waiting for a generation slot
+            timeout: Overall deadline in seconds, covering queueing and generation
+            session_id: Conversation session; defaults to the shared session
+            options: Ollama generation options overriding the configured ones
+        
+        Yields:
+            Pieces of the generated response text
+        
+        Raises:
+            AdmissionError: If the scheduler rejects the request due to overload
+        """
+        session_id = session_id or DEFAULT_SESSION
+        history = self._history_window(session_id) if use_history else []
+        endpoint, payload = self._build_request(query, context, system_prompt, history, stream=True, options=options)
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or settings.llm_request_deadline)
+        queued_at = loop.time()
+        parts: List[str] = []
+        tried = []
+        
+        async with self.scheduler.slot(priority, deadline):
+            record_stage("llm_queue", loop.time() - queued_at)
+            started = loop.time()
+            
+            with stage_timer("llm_generate"):
+                for _ in range(settings.llm_max_retries + 1):
+                    remaining = deadline - loop.time()
+                    backend = self.router.pick(exclude=tried) if remaining > 0 else None
+                    if backend is None:
+                        break
+                    tried.append(backend)
+                    
+                    try:
+                        async with self.router.track(backend):
+                            async with backend.client.stream("POST", endpoint, json=payload, timeout=remaining) as response:
+                                if response.status_code != 200:
+                                    logger.error(f"LLM API error from {backend.url}: {response.status_code}")
+                                    if response.status_code < 500:
+                                        break
+                                    self.router.record_failure(backend)
+                                    continue
+                                
+                                async for line in response.aiter_lines():
+                                    if not line:
+                                        continue
+                                    chunk = json.loads(line)
+                                    if settings.ollama_use_chat:
+                                        text = chunk.get("message", {}).get("content", "")
+                                    else:
+                                        text = chunk.get("response", "")
+                                    if text:
+                                        if not parts:
+                                            record_stage("llm_first_token", loop.time() - started)
+                                        parts.append(text)
+                                        yield text
+                                    if chunk.get("done"):
+                                        self._record_generation_stats(chunk)
+                        self.router.record_success(backend)
+                        break
+                    except httpx.HTTPError as e:
+                        logger.error(f"LLM backend {backend.url} failed while streaming: {e!r}")
+                        self.router.record_failure(backend)
+                        if parts:
+                            break
+        
+        if not parts:
+            if not tried:
+                logger.error("No LLM backend available")
+            yield "I apologize, but I'm having trouble generating a response right now."
+        elif use_history:
+            self._record_exchange(session_id, query, "".join(parts))
+    
+    def _build_request(
+        self,
+        query: str,
+        context: Optional[List[str]],
+        system_prompt: Optional[str],
+        history: List[Dict[str, str]],
+        stream: bool,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Choose the Ollama endpoint and build its payload"""
+        with stage_timer("prompt_build"):
+            if settings.ollama_use_chat:
+                endpoint, payload = "/api/chat", {
+                    "model": self.model,
+                    "messages": self._build_messages(query, context, system_prompt, history),
+                    "stream": stream
+                }
+            else:
+                endpoint, payload = "/api/generate", {
+                    "model": self.model,
+                    "prompt": self._build_prompt(query, context, system_prompt, history),
+                    "stream": stream
+                }
+            return endpoint, self._with_residency(payload, self.generation_options(options))
+    
+    def _with_residency(self, payload: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+        """Add keep_alive and generation options to a request payload"""
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if options:
+            payload["options"] = options
+        return payload
+    
+    @staticmethod
+    def generation_options(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ollama options from LLM_NUM_PREDICT, LLM_NUM_CTX and LLM_STOP, with
+        per-request overrides (None values are ignored)
+        """
+        options: Dict[str, Any] = {}
+        if settings.llm_num_predict:
+            options["num_predict"] = settings.llm_num_predict
+        if settings.llm_num_ctx:
+            options["num_ctx"] = settings.llm_num_ctx
+        stop = [sequence for sequence in settings.llm_stop.split(",") if sequence]
+        if stop:
+            options["stop"] = stop
+        options.update({key: value for key, value in (overrides or {}).items() if value is not None})
+        return options
+    
+    async def _post_with_failover(
+        self,
+        endpoint: str,
+        payload: Dict[str, Any],
+        deadline: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        POST a generation request, retrying failed attempts on other replicas
+        
+        Returns:
+            The decoded response body, or None if every attempt failed
+        """
+        loop = asyncio.get_running_loop()
+        tried = []
+        
+        for _ in range(settings.llm_max_retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            
+            backend = self.router.pick(exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+            
+            try:
+                async with self.router.track(backend):
+                    response = await backend.client.post(endpoint, json=payload, timeout=remaining)
+            except httpx.HTTPError as e:
+                logger.error(f"LLM backend {backend.url} failed: {e!r}")
+                self.router.record_failure(backend)
+                continue
+            
+            if response.status_code == 200:
+                self.router.record_success(backend)
+                return response.json()
+            
+            logger.error(f"LLM API error from {backend.url}: {response.status_code}")
+            if response.status_code < 500:
+                # The request itself is bad; another replica won't do better
+                return None
+            self.router.record_failure(backend)
+        
+        if not tried:
+            logger.error("No LLM backend available")
+        return None
+    
+    @staticmethod
+    def _record_generation_stats(result: Dict[str, Any]):
+        """Turn Ollama's own timing fields (nanoseconds) into metrics"""
+        load = result.get("load_duration", 0) / 1e9
+        prefill = result.get("prompt_eval_duration", 0) / 1e9
+        decode = result.get("eval_duration", 0) / 1e9
+        prompt_tokens = result.get("prompt_eval_count", 0)
+        completion_tokens = result.get("eval_count", 0)
+        
+        if load:
+            record_stage("llm_load", load)
+        if prefill:
+            record_stage("llm_prefill", prefill)
+        if decode:
+            record_stage("llm_decode", decode)
+            TOKENS_PER_SECOND.observe(completion_tokens / decode)
+        # Time to first token: model load plus prompt prefill
+        if load or prefill:
+            record_stage("llm_ttft", load + prefill)
+        
+        LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+        LLM_TOKENS.inc(completion_tokens, kind="completion")
+        if load > COLD_LOAD_SECONDS:
+            MODEL_LOADS.inc(cause="request")
+    
+    def _build_messages(
+        self,
+        query: str,
+        context: Optional[List[str]] = None,
+        system_prompt: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Build chat messages for Ollama's /api/chat
+        
+        The system prompt and past turns come first and are byte-identical
+        from one turn to the next, so Ollama can reuse the KV cache for that
+        prefix and only prefill the newest exchange. Retrieved context
+        belongs to the current turn and is sent with the new user message.
+        """
+        messages = [{"role": "system", "content": system_prompt or DEFAULT_SYSTEM_PROMPT}]
+        messages.extend(history or [])
+        
+        if context:
+            context_parts = ["Context information:\n"]
+            for i, ctx in enumerate(context, 1):
+                context_parts.append(f"{i}. {ctx}\n")
+            context_parts.append(f"\nQuestion: {query}")
+            content = "".join(context_parts)
+        else:
+            content = query
+        
+        messages.append({"role": "user", "content": content})
+        return messages
+    
     def _build_prompt(
         self,
         query: str,
         context: Optional[List[str]] = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        history: Optional[List[Dict[str, str]]] = None
     ) -> str:
-        """Build the complete prompt with context"""
+        """Build the complete prompt with context for Ollama's /api/generate"""
         
-        # Default system prompt
-        if system_prompt is None:
-            system_prompt = """You are Jarvis, a helpful AI assistant. You answer questions based on the provided context and your knowledge. 
-If the context doesn't contain relevant information, you can use your general knowledge to help, but mention when you're doing so.
-Be concise, accurate, and helpful."""
+        # Build prompt, stable parts first so the prefix is shared across turns
+        prompt_parts = [system_prompt or DEFAULT_SYSTEM_PROMPT, "\n\n"]
         
-        # Build prompt
-        prompt_parts = [system_prompt, "\n\n"]
+        # Add conversation history
+        if history:
+            prompt_parts.append("Recent conversation:\n")
+            for msg in history:
+                role = msg['role'].capitalize()
+                prompt_parts.append(f"{role}: {msg['content']}\n")
+            prompt_parts.append("\n")
         
         # Add context if available
         if context:
@@ -99,43 +494,147 @@ Be concise, accurate, and helpful."""
                 prompt_parts.append(f"{i}. {ctx}\n")
             prompt_parts.append("\n")
         
-        # Add conversation history (last 5 exchanges)
-        if self.conversation_history:
-            prompt_parts.append("Recent conversation:\n")
-            for msg in self.conversation_history[-10:]:
-                role = msg['role'].capitalize()
-                prompt_parts.append(f"{role}: {msg['content']}\n")
-            prompt_parts.append("\n")
-        
         # Add current query
         prompt_parts.append(f"User: {query}\n")
         prompt_parts.append("Assistant:")
         
         return "".join(prompt_parts)
     
-    def clear_history(self):
-        """Clear conversation history"""
-        self.conversation_history = []
+    def _history_window(self, session_id: str) -> List[Dict[str, str]]:
+        """
+        Get the part of a session's history sent with the next turn
+        
+        The window start only moves in steps of half the window, so the
+        history prefix stays unchanged for several turns instead of sliding
+        (and invalidating the cached prefix) on every turn.
+        """
+        history = self.sessions.get(session_id, [])
+        max_messages = settings.llm_history_messages
+        if len(history) <= max_messages:
+            return list(history)
+        
+        # Even step keeps user/assistant pairs together
+        step = max(2, (max_messages // 2) & ~1)
+        start = -(-(len(history) - max_messages) // step) * step
+        return history[start:]
+    
+    def _record_exchange(self, session_id: str, query: str, answer: str):
+        """Append a turn to a session, dropping history that can no longer be sent"""
+        history = self.sessions.setdefault(session_id, [])
+        history.append({"role": "user", "content": query})
+        history.append({"role": "assistant", "content": answer})
+        self.sessions[session_id] = self._history_window(session_id)
+        
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > settings.llm_max_sessions:
+            self.sessions.popitem(last=False)
+    
+    def clear_history(self, session_id: Optional[str] = None):
+        """Clear conversation history of one session (the shared one by default)"""
+        self.sessions.pop(session_id or DEFAULT_SESSION, None)
         logger.info("Cleared conversation history")
     
     async def check_connection(self) -> bool:
-        """Check if Ollama is running and accessible"""
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                return response.status_code == 200
-        except Exception as e:
-            logger.error(f"Cannot connect to Ollama: {e}")
-            return False
+        """Check if at least one Ollama replica is running and accessible"""
+        backend_health = await self.router.check_health()
+        return any(backend_health.values())
     
     async def list_models(self) -> List[str]:
         """List available models"""
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(f"{self.base_url}/api/tags")
+            backend = self.router.pick()
+            if backend is not None:
+                response = await backend.client.get("/api/tags", timeout=5.0)
                 if response.status_code == 200:
                     data = response.json()
                     return [model['name'] for model in data.get('models', [])]
         except Exception as e:
             logger.error(f"Error listing models: {e}")
         return []
+    
+    async def preload(self, cause: str = "preload") -> Dict[str, bool]:
+        """
+        Load the model on every replica, or reset its idle timer if loaded
+        
+        Sends Ollama an empty generation with the configured keep_alive and
+        num_ctx (a different num_ctx would make the next query reload it).
+        
+        Returns:
+            Whether each replica answered, by URL
+        """
+        payload = self._with_residency(
+            {"model": self.model},
+            {"num_ctx": settings.llm_num_ctx} if settings.llm_num_ctx else {}
+        )
+        
+        async def ping(backend) -> bool:
+            try:
+                response = await backend.client.post(
+                    "/api/generate", json=payload, timeout=settings.ollama_preload_timeout
+                )
+                if response.status_code != 200:
+                    logger.warning(f"Preloading {self.model} on {backend.url} failed: {response.status_code}")
+                    return False
+                load = response.json().get("load_duration", 0) / 1e9
+                if load > COLD_LOAD_SECONDS:
+                    MODEL_LOADS.inc(cause=cause)
+                    self._residency['cold_loads'] += 1
+                    logger.info(f"Loaded {self.model} on {backend.url} in {load:.1f}s")
+                return True
+            except Exception as e:
+                logger.warning(f"Preloading {self.model} on {backend.url} failed: {e!r}")
+                return False
+        
+        results = await asyncio.gather(*(ping(b) for b in self.router.backends))
+        self._residency['last_ping'] = time.time()
+        self._residency['pings'] += 1
+        self._residency['failed_pings'] += results.count(False)
+        return {b.url: ok for b, ok in zip(self.router.backends, results)}
+    
+    async def _residency_loop(self):
+        if settings.ollama_preload:
+            await self.preload()
+        if settings.ollama_warm_interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(settings.ollama_warm_interval)
+            try:
+                if within_warm_hours(datetime.now(), settings.ollama_warm_hours, settings.ollama_warm_days):
+                    await self.preload(cause="keep_warm")
+            except ValueError as e:
+                logger.error(f"Invalid OLLAMA_WARM_HOURS or OLLAMA_WARM_DAYS: {e}")
+                return
+    
+    def start_residency(self):
+        """
+        Preload the model in the background, then keep it loaded with a ping
+        every OLLAMA_WARM_INTERVAL seconds during OLLAMA_WARM_HOURS/DAYS;
+        outside them Ollama unloads it after OLLAMA_KEEP_ALIVE
+        """
+        if self._residency_task is None or self._residency_task.done():
+            self._residency_task = asyncio.create_task(self._residency_loop())
+    
+    async def stop_residency(self):
+        """Stop the background preload and keep-warm task"""
+        if self._residency_task is not None:
+            self._residency_task.cancel()
+            try:
+                await self._residency_task
+            except asyncio.CancelledError:
+                pass
+            self._residency_task = None
+    
+    def residency_stats(self) -> Dict[str, Any]:
+        """Keep-alive settings and keep-warm ping counts"""
+        return {
+            'keep_alive': self.keep_alive,
+            'warm_interval': settings.ollama_warm_interval,
+            'warm_hours': settings.ollama_warm_hours or "always",
+            'warm_days': settings.ollama_warm_days or "every day",
+            'running': self._residency_task is not None and not self._residency_task.done(),
+            **self._residency
+        }
+    
+    async def close(self):
+        """Close pooled backend connections"""
+        await self.router.close()
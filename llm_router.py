@@ -0,0 +1,131 @@
+"""
+Health-aware load balancing across Ollama replicas
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Iterable
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Backend:
+    """One Ollama replica with its pooled client and circuit state"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.client = httpx.AsyncClient(base_url=self.url, timeout=60.0)
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        return {
+            'url': self.url,
+            'healthy': self.healthy,
+            'circuit_open': self.open_until > time.monotonic(),
+            'outstanding': self.outstanding,
+            'requests': self.requests,
+            'failures': self.failures
+        }
+
+class LLMRouter:
+    """
+    Routes LLM requests to the replica with the fewest outstanding requests
+
+    Replicas that fail `failure_threshold` times in a row, or fail a health
+    check, have their circuit opened for `cooldown` seconds. After the
+    cooldown a single trial request is let through; success closes the
+    circuit again, failure re-opens it.
+    """
+
+    def __init__(self, urls: List[str], failure_threshold: int, cooldown: float):
+        if not urls:
+            raise ValueError("At least one LLM backend URL is required")
+        self.backends = [Backend(url) for url in urls]
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+
+    def pick(self, exclude: Iterable[Backend] = ()) -> Optional[Backend]:
+        """
+        Choose the backend for the next request
+
+        Args:
+            exclude: Backends already tried for this request
+
+        Returns:
+            The least-loaded available backend, or None if all are unavailable
+        """
+        now = time.monotonic()
+        excluded = set(id(b) for b in exclude)
+        candidates = [b for b in self.backends if id(b) not in excluded]
+
+        available = [b for b in candidates if b.healthy and b.open_until <= now]
+        if not available:
+            # Half-open: allow one trial on a replica whose cooldown expired
+            available = [b for b in candidates if b.open_until <= now]
+            if not available:
+                return None
+            backend = min(available, key=lambda b: b.outstanding)
+            backend.open_until = now + self.cooldown
+            return backend
+
+        return min(available, key=lambda b: b.outstanding)
+
+    @asynccontextmanager
+    async def track(self, backend: Backend):
+        """Count a request as outstanding on a backend while it runs"""
+        backend.outstanding += 1
+        backend.requests += 1
+        try:
+            yield backend
+        finally:
+            backend.outstanding -= 1
+
+    def record_success(self, backend: Backend):
+        """Close the backend's circuit after a successful request"""
+        backend.consecutive_failures = 0
+        backend.open_until = 0.0
+        backend.healthy = True
+
+    def record_failure(self, backend: Backend):
+        """Count a failed request and open the circuit at the threshold"""
+        backend.failures += 1
+        backend.consecutive_failures += 1
+        if backend.consecutive_failures >= self.failure_threshold:
+            backend.healthy = False
+            backend.open_until = time.monotonic() + self.cooldown
+            logger.warning(f"Opened circuit for LLM backend {backend.url}")
+
+    async def check_health(self) -> Dict[str, bool]:
+        """Probe every backend's /api/tags and update its health"""
+        async def probe(backend: Backend) -> bool:
+            try:
+                response = await backend.client.get("/api/tags", timeout=5.0)
+                return response.status_code == 200
+            except Exception as e:
+                logger.error(f"Cannot connect to Ollama at {backend.url}: {e}")
+                return False
+
+        results = await asyncio.gather(*(probe(b) for b in self.backends))
+        for backend, ok in zip(self.backends, results):
+            if ok:
+                self.record_success(backend)
+            else:
+                backend.healthy = False
+                backend.open_until = time.monotonic() + self.cooldown
+        return {b.url: ok for b, ok in zip(self.backends, results)}
+
+    async def close(self):
+        """Close all pooled backend connections"""
+        await asyncio.gather(*(b.client.aclose() for b in self.backends))
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Get per-backend statistics"""
+        return [b.get_stats() for b in self.backends]
@@ -0,0 +1,136 @@
+"""
+Admission control and priority scheduling for LLM calls
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Optional, List, Dict, Any
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class Priority(IntEnum):
+    """Scheduling priority; lower values are served first"""
+    INTERACTIVE = 0
+    BATCH = 1
+
+class AdmissionError(Exception):
+    """Base class for requests rejected by the scheduler"""
+    status_code = 503
+
+class QueueFullError(AdmissionError):
+    """The wait queue is at its depth limit"""
+    status_code = 429
+
+class QueueTimeoutError(AdmissionError):
+    """The request waited too long for a generation slot"""
+    status_code = 503
+
+class DeadlineExceededError(AdmissionError):
+    """The request's deadline passed before it could be served"""
+    status_code = 503
+
+class LLMScheduler:
+    """
+    Bounds concurrent LLM generations and queues the overflow by priority
+
+    Requests beyond `max_concurrency` wait in a priority queue. A request is
+    rejected immediately when the queue already holds `max_queue_depth`
+    waiters, and gives up once it has waited `max_queue_wait` seconds or its
+    own deadline passes, so overload fails fast instead of timing out.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_depth: int, max_queue_wait: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max_queue_depth
+        self.max_queue_wait = max_queue_wait
+
+        self._active = 0
+        self._queued = 0
+        self._waiters: List[List[Any]] = []
+        self._sequence = itertools.count()
+        self._counters = {'admitted': 0, 'rejected': 0, 'timed_out': 0}
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE, deadline: Optional[float] = None):
+        """
+        Hold a generation slot for the duration of the block
+
+        Args:
+            priority: Queue priority for this request
+            deadline: Absolute event-loop time by which the slot must be granted
+        """
+        await self._acquire(priority, deadline)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority, deadline: Optional[float]):
+        """Take a free slot or wait in the priority queue for one"""
+        loop = asyncio.get_running_loop()
+
+        if self._active < self.max_concurrency and self._queued == 0:
+            self._active += 1
+            self._counters['admitted'] += 1
+            return
+
+        if self._queued >= self.max_queue_depth:
+            self._counters['rejected'] += 1
+            raise QueueFullError(f"LLM queue is full ({self._queued} waiting)")
+
+        wait = self.max_queue_wait
+        if deadline is not None:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self._counters['timed_out'] += 1
+                raise DeadlineExceededError("Request deadline passed before queuing")
+            wait = min(wait, remaining)
+
+        future = loop.create_future()
+        heapq.heappush(self._waiters, [priority, next(self._sequence), future])
+        self._queued += 1
+        try:
+            await asyncio.wait_for(future, wait)
+            self._counters['admitted'] += 1
+        except asyncio.TimeoutError:
+            self._counters['timed_out'] += 1
+            # A slot handed over just as the wait timed out goes to the next waiter
+            if future.done() and not future.cancelled():
+                self._release()
+            if deadline is not None and loop.time() >= deadline:
+                raise DeadlineExceededError("Request deadline passed while queued")
+            raise QueueTimeoutError(f"Waited {wait:.1f}s for a free LLM slot")
+        except asyncio.CancelledError:
+            # A slot handed over at the moment of cancellation must not leak
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+        finally:
+            self._queued -= 1
+
+    def has_free_slot(self) -> bool:
+        """Whether a request would be admitted right away, without queuing"""
+        return self._active < self.max_concurrency and self._queued == 0
+
+    def _release(self):
+        """Hand the slot to the next live waiter, or free it"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics"""
+        return {
+            'active': self._active,
+            'queued': self._queued,
+            'max_concurrency': self.max_concurrency,
+            'max_queue_depth': self.max_queue_depth,
+            **self._counters
+        }
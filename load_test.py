@@ -0,0 +1,163 @@
+"""
+Open-loop load test for the Jarvis API
+
+Requests arrive as a Poisson process at a fixed rate regardless of how fast
+the server answers, so queueing and overload show up in the latencies
+instead of silently throttling the client. Pair it with fake_ollama.py to
+test the API without a real model.
+
+Usage:
+    python fake_ollama.py --port 11435 &
+    OLLAMA_BASE_URL=http://localhost:11435 VECTOR_BACKEND=local python api.py &
+    python load_test.py --rate 50 --duration 60 --mix query=80,knowledge=10,health=10
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Tuple
+import httpx
+
+from sample_data import get_sample_documents
+
+QUESTIONS = [
+    "What products does TechCorp offer?",
+    "What is the remote work policy?",
+    "Tell me about machine learning types",
+    "How many vacation days do employees get?",
+    "What are the API rate limits?",
+    "Who do I contact for IT support?",
+]
+
+def build_request(kind: str, rng: random.Random) -> Tuple[str, str, Dict[str, Any]]:
+    """Choose method, path and JSON body for one request of a given kind"""
+    if kind == "query":
+        return "POST", "/query", {"question": rng.choice(QUESTIONS)}
+    if kind == "knowledge":
+        document = rng.choice(get_sample_documents())
+        return "POST", "/knowledge/add", {
+            "text": document["text"],
+            "doc_name": f"load-test-{document.get('name', 'doc')}"
+        }
+    if kind == "stats":
+        return "GET", "/stats", None
+    return "GET", "/health", None
+
+def parse_mix(mix: str) -> List[Tuple[str, float]]:
+    """Parse 'query=80,knowledge=10,health=10' into weighted request kinds"""
+    weights = []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        weights.append((kind.strip(), float(weight or 1)))
+    return weights
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive the API at the target arrival rate and collect per-kind results"""
+    rng = random.Random(args.seed)
+    kinds, weights = zip(*parse_mix(args.mix))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    in_flight = 0
+    peak_in_flight = 0
+    dropped = 0
+
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+
+        async def fire(kind: str):
+            nonlocal in_flight, peak_in_flight
+            method, path, body = build_request(kind, rng)
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = str(response.status_code)
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            finally:
+                in_flight -= 1
+            latencies[kind].append(time.perf_counter() - start)
+            statuses[kind][status] += 1
+
+        tasks = []
+        started = time.perf_counter()
+        next_arrival = started
+        while next_arrival - started < args.duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= args.max_in_flight:
+                # Client-side safety valve; counted so it can't hide overload
+                dropped += 1
+            else:
+                tasks.append(asyncio.create_task(fire(rng.choices(kinds, weights)[0])))
+            next_arrival += rng.expovariate(args.rate)
+
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        'target_rate': args.rate,
+        'duration': elapsed,
+        'peak_in_flight': peak_in_flight,
+        'dropped_by_client': dropped,
+        'endpoints': {}
+    }
+    for kind, values in latencies.items():
+        values.sort()
+        errors = sum(count for status, count in statuses[kind].items() if not status.startswith("2"))
+        report['endpoints'][kind] = {
+            'requests': len(values),
+            'throughput': len(values) / elapsed,
+            'error_rate': errors / len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': values[-1],
+            'statuses': dict(statuses[kind])
+        }
+    return report
+
+def print_report(report: Dict[str, Any]):
+    print(f"Target rate {report['target_rate']:.1f} req/s over {report['duration']:.1f}s, "
+          f"peak in flight {report['peak_in_flight']}, dropped by client {report['dropped_by_client']}")
+    print(f"{'endpoint':<12}{'requests':>10}{'req/s':>10}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, stats in sorted(report['endpoints'].items()):
+        print(f"{kind:<12}{stats['requests']:>10}{stats['throughput']:>10.1f}{stats['error_rate']:>9.1%}"
+              f"{stats['p50'] * 1e3:>10.0f}{stats['p95'] * 1e3:>10.0f}{stats['p99'] * 1e3:>10.0f}")
+        print(f"{'':<12}statuses: {stats['statuses']}")
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Open-loop load test for the Jarvis API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--rate", type=float, default=20, help="mean arrivals per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of arrivals")
+    parser.add_argument("--mix", default="query=80,knowledge=10,health=10",
+                        help="weighted request kinds: query, knowledge, health, stats")
+    parser.add_argument("--connections", type=int, default=500, help="client connection pool size")
+    parser.add_argument("--max-in-flight", type=int, default=5000, help="client-side cap on outstanding requests")
+    parser.add_argument("--timeout", type=float, default=180, help="per-request client timeout")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""
+In-process vector index backed by NumPy, for offline use and benchmarking
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lists the saved segments and their dead-row files
+SEGMENTS_FILE = "segments.json"
+# Single-file layout written by earlier versions, converted on the next flush
+LEGACY_FILES = ("vectors.npy", "records.json", "deleted.json")
+
+# Queries scored per matrix product, bounding the queries x rows score matrix
+QUERY_SLICE = 128
+
+class _Segment:
+    """Immutable batch of normalized vectors with their ids and metadata"""
+
+    __slots__ = ('ids', 'rows', 'vectors', 'metadata', 'name')
+
+    def __init__(self, ids: List[str], vectors: np.ndarray, metadata: List[Dict[str, Any]]):
+        self.ids = ids
+        self.rows = {id_: row for row, id_ in enumerate(ids)}
+        self.vectors = vectors
+        self.vectors.flags.writeable = False
+        self.metadata = metadata
+        # File name stem once the segment is saved
+        self.name: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+# A published segment: (segment, read-only dead-row mask, number of dead rows)
+_Entry = Tuple[_Segment, np.ndarray, int]
+
+def _frozen(mask: np.ndarray) -> np.ndarray:
+    mask.flags.writeable = False
+    return mask
+
+class LocalIndex:
+    """
+    Exact cosine-similarity index with the subset of the Pinecone Index API
+    used by VectorStore (upsert, query, fetch, delete, describe_index_stats)
+
+    Vectors are L2-normalized on insert so a query is one matrix product
+    per segment. Data lives in memory and is written to `path` on flush().
+    Every segment is saved to files of its own once, so a flush only
+    writes the segments added since the last one and the dead rows of
+    segments that lost rows; only merges write large segments.
+
+    Each upsert becomes a new immutable segment. Deletes and overwrites
+    only mark rows dead, in a copy of the segment's mask. Writers publish
+    a new tuple of segments with a single assignment. Readers take the
+    current tuple without locking. A query therefore never waits for an
+    ingest, and it always sees either all or none of an upsert batch.
+
+    A background thread merges segments. Once there are more than
+    `max_segments`, the smallest are merged. Once dead rows exceed
+    `compact_ratio` of all rows, every segment is merged without them.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: Optional[str] = None,
+        compact_ratio: float = 0.2,
+        max_segments: int = 8
+    ):
+        self.dimension = dimension
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self.max_segments = max(2, max_segments)
+        # Serializes writers and merges; readers never take it
+        self._lock = threading.RLock()
+        self._segments: Tuple[_Entry, ...] = ()
+        # Live id -> segment holding it, for writers
+        self._owner: Dict[str, _Segment] = {}
+        self._merger: Optional[threading.Thread] = None
+        # Segment name -> (dead rows, file) as last saved
+        self._saved_dead: Dict[str, Tuple[int, Optional[str]]] = {}
+        # Whether anything changed since the last flush
+        self._dirty = False
+
+        if path and LocalIndex.saved_at(path):
+            self._load()
+
+    @staticmethod
+    def saved_at(path: str) -> bool:
+        """Whether a flushed index is stored at path"""
+        return any(os.path.exists(os.path.join(path, name)) for name in (SEGMENTS_FILE, LEGACY_FILES[0]))
+
+    @staticmethod
+    def remove_saved(path: str, keep: Iterable[str] = ()):
+        """Delete the index files at path, except those named in keep"""
+        keep = set(keep)
+        for name in os.listdir(path):
+            ours = name.startswith(("segment-", SEGMENTS_FILE)) or name in LEGACY_FILES
+            if ours and name not in keep and os.path.isfile(os.path.join(path, name)):
+                os.remove(os.path.join(path, name))
+
+    def _load(self):
+        """Load a previously flushed index from disk"""
+        if not os.path.exists(os.path.join(self.path, SEGMENTS_FILE)):
+            self._load_legacy()
+            return
+
+        with open(os.path.join(self.path, SEGMENTS_FILE), "r", encoding="utf-8") as f:
+            listing = json.load(f)
+        entries = []
+        for item in listing['segments']:
+            base = os.path.join(self.path, item['name'])
+            vectors = np.load(base + ".npy")
+            if vectors.shape[1] != self.dimension:
+                raise ValueError(
+                    f"Local index at {self.path} has dimension {vectors.shape[1]}, "
+                    f"expected {self.dimension}"
+                )
+            with open(base + ".json", "r", encoding="utf-8") as f:
+                records = json.load(f)
+            segment = _Segment(records['ids'], vectors.astype(np.float32, copy=False), records['metadata'])
+            segment.name = item['name']
+            dead = np.zeros(len(segment), dtype=bool)
+            if item['dead']:
+                dead[np.load(os.path.join(self.path, item['dead']))] = True
+            dead_count = int(dead.sum())
+            self._saved_dead[segment.name] = (dead_count, item['dead'])
+            entries.append((segment, _frozen(dead), dead_count))
+            for id_, gone in zip(segment.ids, dead):
+                if not gone:
+                    self._owner[id_] = segment
+        self._segments = tuple(entries)
+        stats = self.describe_index_stats()
+        logger.info(f"Loaded {stats['total_vector_count']} vectors in {stats['segments']} segments from {self.path}")
+
+    def _load_legacy(self):
+        """Load an index saved as one vectors.npy and records.json"""
+        vectors = np.load(os.path.join(self.path, "vectors.npy"))
+        with open(os.path.join(self.path, "records.json"), "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(
+                f"Local index at {self.path} has dimension {vectors.shape[1]}, "
+                f"expected {self.dimension}"
+            )
+
+        segment = _Segment(records['ids'], vectors.astype(np.float32, copy=False), records['metadata'])
+        self._segments = ((segment, _frozen(np.zeros(len(segment), dtype=bool)), 0),)
+        self._owner = {id_: segment for id_ in segment.ids}
+
+        deletes_path = os.path.join(self.path, "deleted.json")
+        if os.path.exists(deletes_path):
+            with open(deletes_path, "r", encoding="utf-8") as f:
+                self.delete(ids=json.load(f))
+        self._dirty = True
+        stats = self.describe_index_stats()
+        logger.info(f"Loaded {stats['total_vector_count']} vectors from local index at {self.path}")
+
+    def flush(self):
+        """
+        Save changes since the last flush
+
+        New segments and changed dead-row lists are written to files of
+        their own first, then the segment listing is replaced atomically,
+        so a crash leaves the previous flush intact. Files no longer
+        listed are deleted afterwards.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            listing = []
+            saved_dead = {}
+            for segment, dead, dead_count in self._segments:
+                if segment.name is None:
+                    name = f"segment-{uuid.uuid4().hex}"
+                    np.save(os.path.join(self.path, name + ".npy"), segment.vectors)
+                    with open(os.path.join(self.path, name + ".json"), "w", encoding="utf-8") as f:
+                        json.dump({'ids': segment.ids, 'metadata': segment.metadata}, f)
+                    segment.name = name
+                # Dead rows only grow, so their count identifies a saved list
+                saved = self._saved_dead.get(segment.name, (0, None))
+                if saved[0] != dead_count:
+                    saved = (dead_count, f"{segment.name}.dead-{dead_count}.npy")
+                    np.save(os.path.join(self.path, saved[1]), np.flatnonzero(dead))
+                saved_dead[segment.name] = saved
+                listing.append({'name': segment.name, 'dead': saved[1]})
+
+            listing_path = os.path.join(self.path, SEGMENTS_FILE)
+            with open(listing_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({'dimension': self.dimension, 'segments': listing}, f)
+            os.replace(listing_path + ".tmp", listing_path)
+            self._saved_dead = saved_dead
+            self._dirty = False
+
+            keep = {SEGMENTS_FILE}
+            for item in listing:
+                keep.update((item['name'] + ".npy", item['name'] + ".json", item['dead']))
+            LocalIndex.remove_saved(self.path, keep)
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _kill(self, entries: Tuple[_Entry, ...], ids: List[str]) -> Tuple[Tuple[_Entry, ...], List[str]]:
+        """
+        Copy of `entries` with the rows of `ids` marked dead; called with the lock held
+
+        Returns:
+            The new entries and the ids that were live
+        """
+        rows_by_segment: Dict[_Segment, List[int]] = {}
+        killed = []
+        for id_ in ids:
+            segment = self._owner.pop(id_, None)
+            if segment is not None:
+                rows_by_segment.setdefault(segment, []).append(segment.rows[id_])
+                killed.append(id_)
+        if not rows_by_segment:
+            return entries, killed
+
+        updated = []
+        for segment, dead, dead_count in entries:
+            rows = rows_by_segment.get(segment)
+            if rows:
+                dead = dead.copy()
+                dead[rows] = True
+                dead_count += len(rows)
+                _frozen(dead)
+            updated.append((segment, dead, dead_count))
+        return tuple(updated), killed
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        """Insert or overwrite vectors given as dicts with 'id', 'values', 'metadata'"""
+        if not vectors:
+            return
+        # Last write of an id within the batch wins
+        latest = list({vector['id']: vector for vector in vectors}.values())
+        segment = _Segment(
+            [vector['id'] for vector in latest],
+            self._normalize(np.asarray([v['values'] for v in latest], dtype=np.float32)),
+            [vector.get('metadata', {}) for vector in latest]
+        )
+
+        with self._lock:
+            entries, _ = self._kill(self._segments, segment.ids)
+            for id_ in segment.ids:
+                self._owner[id_] = segment
+            self._segments = entries + ((segment, _frozen(np.zeros(len(segment), dtype=bool)), 0),)
+            self._dirty = True
+            self._maybe_merge()
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False
+    ) -> Dict[str, Any]:
+        """Find the `top_k` most similar vectors"""
+        return {'matches': self.query_batch([vector], top_k, include_metadata, include_values)[0]}
+
+    def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Find the `top_k` most similar vectors for many queries, one matrix
+        product per segment for each slice of QUERY_SLICE queries
+        """
+        entries = self._segments
+        results = []
+        for start in range(0, len(vectors), QUERY_SLICE):
+            results.extend(self._query_slice(
+                entries, vectors[start:start + QUERY_SLICE], top_k, include_metadata, include_values
+            ))
+        return results
+
+    def _query_slice(
+        self,
+        entries: Tuple[_Entry, ...],
+        vectors: List[List[float]],
+        top_k: int,
+        include_metadata: bool,
+        include_values: bool
+    ) -> List[List[Dict[str, Any]]]:
+        queries = self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        live_count = sum(len(segment) - dead_count for segment, _, dead_count in entries)
+        if live_count == 0 or top_k <= 0:
+            return [[] for _ in vectors]
+        k = min(top_k, live_count)
+
+        # Top k of each segment, then the top k of those candidates
+        candidate_scores, candidate_refs = [], []
+        for position, (segment, dead, dead_count) in enumerate(entries):
+            if dead_count == len(segment):
+                continue
+            scores = queries @ segment.vectors.T
+            if dead_count:
+                scores[:, dead] = -np.inf
+            segment_k = min(k, len(segment))
+            if segment_k < len(segment):
+                top = np.argpartition(-scores, segment_k - 1, axis=1)[:, :segment_k]
+            else:
+                top = np.tile(np.arange(len(segment)), (len(queries), 1))
+            candidate_scores.append(np.take_along_axis(scores, top, axis=1))
+            candidate_refs.append(top + position * (1 << 32))
+
+        scores = np.hstack(candidate_scores)
+        refs = np.hstack(candidate_refs)
+        if k < scores.shape[1]:
+            best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            best = np.tile(np.arange(scores.shape[1]), (len(queries), 1))
+
+        results = []
+        for query_scores, query_refs, columns in zip(scores, refs, best):
+            matches = []
+            for column in columns[np.argsort(-query_scores[columns])]:
+                ref = int(query_refs[column])
+                segment = entries[ref >> 32][0]
+                matches.append(self._match(segment, ref & 0xFFFFFFFF, float(query_scores[column]),
+                                           include_metadata, include_values))
+            results.append(matches)
+        return results
+
+    @staticmethod
+    def _match(segment: _Segment, row: int, score: float, include_metadata: bool, include_values: bool) -> Dict[str, Any]:
+        match = {'id': segment.ids[row], 'score': score}
+        if include_metadata:
+            match['metadata'] = dict(segment.metadata[row])
+        if include_values:
+            match['values'] = segment.vectors[row].tolist()
+        return match
+
+    def fetch(self, ids: List[str]) -> Dict[str, Any]:
+        """Get stored vectors and metadata by id"""
+        entries = self._segments
+        vectors = {}
+        for id_ in ids:
+            for segment, dead, _ in entries:
+                row = segment.rows.get(id_)
+                if row is not None and not dead[row]:
+                    vectors[id_] = {
+                        'id': id_,
+                        'values': segment.vectors[row].tolist(),
+                        'metadata': dict(segment.metadata[row])
+                    }
+                    break
+        return {'vectors': vectors}
+
+    def list(self, limit: int = 100) -> Iterator[List[str]]:
+        """Yield pages of stored ids, like Pinecone's Index.list"""
+        ids = [id_ for segment, dead, _ in self._segments
+               for id_, gone in zip(segment.ids, dead) if not gone]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False):
+        """Delete vectors by id (as dead rows), or everything"""
+        with self._lock:
+            if delete_all:
+                self._dirty = True
+                self._segments = ()
+                self._owner = {}
+                return
+
+            self._segments, killed = self._kill(self._segments, ids or [])
+            if killed:
+                self._dirty = True
+            self._maybe_merge()
+
+    def _merge_candidates(self, entries: Tuple[_Entry, ...]) -> List[_Entry]:
+        """Segments worth merging now: all if dead rows pass the ratio, else the smallest surplus"""
+        rows = sum(len(segment) for segment, _, _ in entries)
+        dead_rows = sum(dead_count for _, _, dead_count in entries)
+        if dead_rows and dead_rows > self.compact_ratio * rows:
+            return list(entries)
+        if len(entries) > self.max_segments:
+            by_size = sorted(entries, key=lambda entry: len(entry[0]) - entry[2])
+            return by_size[:len(entries) - self.max_segments // 2 + 1]
+        return []
+
+    def _maybe_merge(self):
+        """Start the background merge thread if there is work for it; called with the lock held"""
+        if self._merge_candidates(self._segments) and (self._merger is None or not self._merger.is_alive()):
+            self._merger = threading.Thread(target=self._merge_loop, name="local-index-merge", daemon=True)
+            self._merger.start()
+
+    def _merge_loop(self):
+        while self._merge():
+            pass
+
+    def _merge(self, entries_to_merge: Optional[List[_Entry]] = None) -> bool:
+        """
+        Merge segments into one without their dead rows
+
+        The merged segment is built outside the lock from the published
+        segments, which never change. Rows deleted meanwhile are carried
+        over as dead when it is swapped in.
+
+        Returns:
+            True if segments were merged
+        """
+        with self._lock:
+            chosen = entries_to_merge if entries_to_merge is not None else self._merge_candidates(self._segments)
+        if not chosen or (len(chosen) == 1 and chosen[0][2] == 0):
+            return False
+
+        keep = [~dead for _, dead, _ in chosen]
+        vectors = [segment.vectors[alive] for (segment, _, _), alive in zip(chosen, keep)]
+        merged = _Segment(
+            [id_ for (segment, _, _), alive in zip(chosen, keep) for id_, a in zip(segment.ids, alive) if a],
+            np.concatenate(vectors) if vectors else np.zeros((0, self.dimension), dtype=np.float32),
+            [m for (segment, _, _), alive in zip(chosen, keep) for m, a in zip(segment.metadata, alive) if a]
+        )
+
+        with self._lock:
+            current = {entry[0]: entry for entry in self._segments}
+            if any(segment not in current for segment, _, _ in chosen):
+                logger.info("Skipping local index merge: index changed meanwhile")
+                return False
+
+            dead = np.concatenate([current[segment][1][alive] for (segment, _, _), alive in zip(chosen, keep)])
+            for id_, gone in zip(merged.ids, dead):
+                if not gone:
+                    self._owner[id_] = merged
+            chosen_segments = {segment for segment, _, _ in chosen}
+            remaining = tuple(entry for entry in self._segments if entry[0] not in chosen_segments)
+            if len(merged):
+                remaining += ((merged, _frozen(dead), int(dead.sum())),)
+            self._segments = remaining
+            self._dirty = True
+        logger.info(f"Merged {len(chosen)} local index segments into one of {len(merged)} vectors")
+        return True
+
+    def compact(self):
+        """Merge every segment into one without dead rows"""
+        with self._lock:
+            entries = list(self._segments)
+        self._merge(entries)
+
+    def wait_for_merges(self):
+        """Block until the background merge thread has no more work"""
+        while True:
+            with self._lock:
+                merger = self._merger
+            if merger is None or not merger.is_alive():
+                return
+            merger.join()
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        """Get index statistics in the shape Pinecone returns"""
+        entries = self._segments
+        rows = sum(len(segment) for segment, _, _ in entries)
+        dead_rows = sum(dead_count for _, _, dead_count in entries)
+        return {
+            'dimension': self.dimension,
+            'total_vector_count': rows - dead_rows,
+            'tombstones': dead_rows,
+            'segments': len(entries),
+            'backend': 'local'
+        }
@@ -0,0 +1,179 @@
+"""
+Background re-embedding of the knowledge base into a new embedding model
+"""
+import logging
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+from config import settings
+from projection import Projection, ProjectedEmbedder
+from vector_store import VectorStore, load_embedding_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Batches between flushes of a local target index, bounding the work a resume repeats
+CHECKPOINT_BATCHES = 50
+
+class EmbeddingMigration:
+    """
+    Re-embeds every chunk into a new index built with another model, then
+    switches the store over to it
+
+    Runs on its own thread in batches. After each batch it sleeps long
+    enough to stay within `duty_cycle` of wall time, leaving the embedding
+    model's CPU/GPU to live queries. Writes made meanwhile are mirrored into
+    the new index. Progress is kept in the index manifest, and restarting a
+    migration with the same target model continues where it stopped,
+    because chunks already copied are skipped. Chunks deleted while it was
+    stopped are first removed from the reused target. The old index is
+    left in place for rollback.
+    
+    With a projection the target index stores reduced vectors: PCA is
+    fitted on a sample of the knowledge base before copying starts, and
+    saved next to the manifest so the store reloads it with the index.
+    Migrating to the same model with a projection (or without one) is
+    how a projection is added to, changed on, or removed from an index.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        target_model: str,
+        batch_size: Optional[int] = None,
+        duty_cycle: Optional[float] = None,
+        projection: Optional[str] = None,
+        projection_dim: Optional[int] = None
+    ):
+        self.vector_store = vector_store
+        self.manifest = vector_store.manifest
+        self.name = vector_store.base_index_name
+        self.target_model = target_model
+        self.projection = projection
+        self.projection_dim = (projection_dim or settings.projection_dimension) if projection else None
+        self.batch_size = batch_size or settings.migration_batch_size
+        self.duty_cycle = min(1.0, max(0.01, duty_cycle or settings.migration_duty_cycle))
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the migration thread"""
+        if not self.running:
+            self._cancel.clear()
+            self._thread = threading.Thread(target=self._run, name="embedding-migration", daemon=True)
+            self._thread.start()
+
+    def cancel(self):
+        """Ask the migration to stop after the current batch"""
+        self._cancel.set()
+
+    def status(self) -> Dict[str, Any]:
+        """Migration state from the manifest"""
+        return self.manifest.migration(self.name) or {}
+
+    def _target_index_name(self) -> str:
+        """Index to migrate into, reusing the one of an unfinished run with the same target"""
+        previous = self.manifest.migration(self.name)
+        if (
+            previous and previous.get('status') != 'completed'
+            and previous.get('target_model') == self.target_model
+            and previous.get('projection') == self.projection
+            and previous.get('projection_dim') == self.projection_dim
+        ):
+            return previous['target_index']
+
+        version = 2
+        while f"{self.name}-v{version}" in self.manifest.data['indexes']:
+            version += 1
+        return f"{self.name}-v{version}"
+
+    def _load_projection(self, model, target_name: str) -> Tuple[Projection, str]:
+        """Projection of the target index, reusing one fitted by an interrupted run"""
+        path = os.path.join(settings.projection_dir, f"{target_name}.npz")
+        if os.path.exists(path):
+            projection = Projection.load(path)
+            if (projection.kind, projection.dim) == (self.projection, self.projection_dim):
+                return projection, path
+        
+        if self.projection == "pca":
+            texts = []
+            for batch in self.vector_store.iter_vectors(batch_size=self.batch_size):
+                texts.extend(chunk['text'] for chunk in batch)
+                if len(texts) >= settings.projection_sample_size:
+                    break
+            sample = model.encode(texts[:settings.projection_sample_size], batch_size=settings.embedding_batch_size)
+            projection = Projection.fit_pca(sample, self.projection_dim)
+        else:
+            projection = Projection.truncate(self.projection_dim, model.get_sentence_embedding_dimension())
+        projection.save(path)
+        return projection, path
+    
+    def _run(self):
+        try:
+            target_name = self._target_index_name()
+            resumed = self.status().get('target_index') == target_name
+            model = load_embedding_model(self.target_model)
+            projection_info = None
+            if self.projection:
+                projection, path = self._load_projection(model, target_name)
+                model = ProjectedEmbedder(model, projection)
+                projection_info = {'type': projection.kind, 'dim': projection.dim, 'path': path}
+            dimension = model.get_sentence_embedding_dimension()
+            index = self.vector_store.open_index(target_name, dimension)
+            self.manifest.register(target_name, self.target_model, dimension, projection=projection_info)
+
+            total = self.vector_store.get_stats().get('total_vector_count')
+            self.manifest.update_migration(
+                self.name,
+                status='running',
+                source_index=self.vector_store.index_name,
+                target_index=target_name,
+                target_model=self.target_model,
+                projection=self.projection,
+                projection_dim=self.projection_dim,
+                scanned=0,
+                copied=0,
+                total=total,
+                error=None,
+                started_at=time.strftime("%Y-%m-%dT%H:%M:%S")
+            )
+            logger.info(f"Migrating {total} chunks of {self.name} to {target_name} ({self.target_model})")
+
+            pruned = self.vector_store.begin_migration(model, index, prune=resumed)
+            if pruned:
+                logger.info(f"Removed {pruned} chunks deleted since the last run from {target_name}")
+            scanned = copied = 0
+            for batches, batch in enumerate(self.vector_store.iter_vectors(batch_size=self.batch_size), 1):
+                if self._cancel.is_set():
+                    self.vector_store.abort_migration()
+                    self.manifest.update_migration(self.name, status='cancelled')
+                    logger.info(f"Migration of {self.name} cancelled after {scanned} chunks")
+                    return
+
+                started = time.perf_counter()
+                copied += self.vector_store.migrate_batch(batch)
+                scanned += len(batch)
+                if batches % CHECKPOINT_BATCHES == 0:
+                    self.vector_store.flush()
+                self.manifest.update_migration(self.name, scanned=scanned, copied=copied)
+
+                # Throttle to the duty cycle so live queries keep the model
+                elapsed = time.perf_counter() - started
+                time.sleep(elapsed * (1 - self.duty_cycle) / self.duty_cycle)
+
+            self.vector_store.complete_migration(target_name, self.target_model)
+            self.manifest.update_migration(
+                self.name,
+                status='completed',
+                completed_at=time.strftime("%Y-%m-%dT%H:%M:%S")
+            )
+        except Exception as e:
+            logger.error(f"Migration of {self.name} failed: {e}")
+            self.vector_store.abort_migration()
+            self.manifest.update_migration(self.name, status='failed', error=str(e))
@@ -0,0 +1,123 @@
+"""
+Local vector index partitioned into namespaces, like Pinecone's
+"""
+import logging
+import os
+import shutil
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Callable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NAMESPACES_DIR = "namespaces"
+
+class NamespacedIndex:
+    """
+    Pinecone-style `namespace` argument over one local index per namespace
+
+    The default namespace "" is stored at `path` itself, so an index saved
+    before namespaces existed keeps its data; others live under
+    `path/namespaces/<name>`. Each namespace is a separate index, so a
+    query only scans the vectors of the namespace it targets.
+    """
+
+    def __init__(self, open_index: Callable[[Optional[str]], Any], path: Optional[str] = None):
+        """
+        Args:
+            open_index: Opens the index stored at a path (None for in-memory)
+            path: Directory of the default namespace
+        """
+        self.path = path
+        self._open_index = open_index
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Any] = {"": open_index(path)}
+
+        namespaces_path = self._namespaces_path()
+        if namespaces_path and os.path.isdir(namespaces_path):
+            for name in sorted(os.listdir(namespaces_path)):
+                self._namespaces[name] = open_index(os.path.join(namespaces_path, name))
+
+    def _namespaces_path(self) -> Optional[str]:
+        return os.path.join(self.path, NAMESPACES_DIR) if self.path else None
+
+    def _get(self, namespace: str, create: bool = False):
+        index = self._namespaces.get(namespace)
+        if index is None and create:
+            with self._lock:
+                index = self._namespaces.get(namespace)
+                if index is None:
+                    namespaces_path = self._namespaces_path()
+                    index = self._open_index(os.path.join(namespaces_path, namespace) if namespaces_path else None)
+                    self._namespaces[namespace] = index
+        return index
+
+    def list_namespaces(self) -> List[str]:
+        """Names of all namespaces, including the default one"""
+        return list(self._namespaces)
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = ""):
+        self._get(namespace, create=True).upsert(vectors)
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False,
+        namespace: str = ""
+    ) -> Dict[str, Any]:
+        index = self._get(namespace)
+        if index is None:
+            return {'matches': []}
+        return index.query(vector, top_k, include_metadata, include_values)
+
+    def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False,
+        namespace: str = ""
+    ) -> List[List[Dict[str, Any]]]:
+        index = self._get(namespace)
+        if index is None:
+            return [[] for _ in vectors]
+        return index.query_batch(vectors, top_k, include_metadata, include_values)
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Dict[str, Any]:
+        index = self._get(namespace)
+        return index.fetch(ids) if index is not None else {'vectors': {}}
+
+    def list(self, limit: int = 100, namespace: str = "") -> Iterator[List[str]]:
+        index = self._get(namespace)
+        if index is not None:
+            yield from index.list(limit=limit)
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, namespace: str = ""):
+        """Delete vectors by id, or a whole namespace; a non-default namespace is then removed"""
+        index = self._get(namespace)
+        if index is None:
+            return
+        index.delete(ids=ids, delete_all=delete_all)
+        if delete_all and namespace:
+            with self._lock:
+                del self._namespaces[namespace]
+            if index.path and os.path.isdir(index.path):
+                shutil.rmtree(index.path)
+
+    def flush(self):
+        for index in list(self._namespaces.values()):
+            index.flush()
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        """Totals plus per-namespace counts, in the shape Pinecone returns"""
+        per_namespace = {name: index.describe_index_stats() for name, index in list(self._namespaces.items())}
+        return {
+            'dimension': per_namespace[""]['dimension'],
+            'total_vector_count': sum(s['total_vector_count'] for s in per_namespace.values()),
+            'tombstones': sum(s['tombstones'] for s in per_namespace.values()),
+            'segments': sum(s['segments'] for s in per_namespace.values()),
+            'namespaces': {name: {'vector_count': s['total_vector_count']} for name, s in per_namespace.items()},
+            'backend': 'local'
+        }
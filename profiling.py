@@ -0,0 +1,159 @@
+"""
+Opt-in per-request profiling for the API
+"""
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Optional, Dict, Any
+
+from config import settings
+from metrics import collect_timings
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError:
+    SamplingProfiler = None
+
+# Files written per profile
+PROFILE_SUFFIXES = (".prof", ".html", ".json")
+
+# Stages that only summarize or subdivide other stages
+AGGREGATE_STAGES = {'query', 'retrieval', 'llm_load', 'llm_prefill', 'llm_decode', 'llm_ttft', 'llm_first_token'}
+
+def dominant_stage(timings: Dict[str, float]) -> Optional[str]:
+    """Name of the pipeline stage that took the most time"""
+    stages = {stage: seconds for stage, seconds in timings.items() if stage not in AGGREGATE_STAGES}
+    return max(stages, key=stages.get) if stages else None
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles selected requests
+
+    A request is profiled when it carries `X-Profile: 1` (if allowed by
+    settings) or is picked by the `profile_sample_rate` lottery. The profile
+    is written to `profile_dir` under the request id plus a unique suffix
+    (returned in `X-Profile-Name`), next to a JSON summary with the stage
+    timings and the dominant stage; only the newest `profile_max_files`
+    profiles are kept. Unprofiled requests only pay for a header lookup and
+    a random draw.
+
+    pyinstrument is used when installed; it samples and attributes time to
+    the profiled request's own task. Otherwise cProfile is used, which traces
+    everything on the event loop while active, so only one request is
+    profiled with it at a time.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._cprofile_active = False
+
+    def _wants_profile(self, scope) -> bool:
+        if settings.profile_header_enabled:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile" and value in (b"1", b"true"):
+                    return True
+        return settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")
+        request_id = "".join(c for c in (request_id or "") if c.isalnum() or c in "-_")[:64]
+        # A client's id gets a unique suffix in the file name, so clients can't overwrite each other's profiles
+        profile_name = f"{request_id}-{uuid.uuid4().hex[:12]}" if request_id else uuid.uuid4().hex
+        request_id = request_id or profile_name
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode()),
+                    (b"x-profiled", b"1"),
+                    (b"x-profile-name", profile_name.encode())
+                ]
+            await send(message)
+
+        if SamplingProfiler is not None:
+            profiler = SamplingProfiler(async_mode="enabled")
+        elif not self._cprofile_active:
+            profiler = cProfile.Profile()
+            self._cprofile_active = True
+        else:
+            logger.info(f"Skipping profile of {request_id}: another cProfile session is active")
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with collect_timings() as timings:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.enable()
+            else:
+                profiler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                if isinstance(profiler, cProfile.Profile):
+                    profiler.disable()
+                    self._cprofile_active = False
+                else:
+                    profiler.stop()
+
+        summary = {
+            'request_id': request_id,
+            'profile': profile_name,
+            'method': scope.get("method"),
+            'path': scope.get("path"),
+            'duration': time.perf_counter() - started,
+            'timings': timings,
+            'dominant_stage': dominant_stage(timings),
+            'profiler': 'pyinstrument' if SamplingProfiler is not None else 'cProfile'
+        }
+        await asyncio.to_thread(self._write, profile_name, profiler, summary)
+        logger.info(f"Profiled {summary['method']} {summary['path']} as {profile_name} "
+                    f"(dominant stage: {summary['dominant_stage']})")
+
+    @staticmethod
+    def _write(profile_name: str, profiler, summary: Dict[str, Any]):
+        """Write the profile and its summary to the profile directory"""
+        try:
+            os.makedirs(settings.profile_dir, exist_ok=True)
+            base = os.path.join(settings.profile_dir, profile_name)
+            if isinstance(profiler, cProfile.Profile):
+                profiler.dump_stats(base + ".prof")
+            else:
+                with open(base + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            with open(base + ".json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            ProfilingMiddleware._prune()
+        except Exception as e:
+            logger.error(f"Error writing profile {profile_name}: {e}")
+
+    @staticmethod
+    def _prune():
+        """Delete the oldest profiles beyond profile_max_files"""
+        if settings.profile_max_files <= 0:
+            return
+        newest: Dict[str, float] = {}
+        for entry in os.scandir(settings.profile_dir):
+            base, suffix = os.path.splitext(entry.name)
+            if suffix in PROFILE_SUFFIXES and entry.is_file():
+                newest[base] = max(newest.get(base, 0.0), entry.stat().st_mtime)
+        for base in sorted(newest, key=newest.get)[:-settings.profile_max_files]:
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.remove(os.path.join(settings.profile_dir, base + suffix))
+                except FileNotFoundError:
+                    pass
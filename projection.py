@@ -0,0 +1,209 @@
+"""
+Dimensionality reduction of embeddings for faster search and smaller indexes
+
+Two kinds of projection are supported:
+    pca       PCA fitted on a sample of the corpus
+    truncate  keep the first dimensions, for Matryoshka-trained models
+
+Usage:
+    python projection.py --dims 32,64,128,256 --sample 5000
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+KINDS = ("pca", "truncate")
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class Projection:
+    """Linear map from model embeddings to a smaller, L2-normalized space"""
+
+    def __init__(self, kind: str, dim: int, mean: Optional[np.ndarray] = None, components: Optional[np.ndarray] = None):
+        if kind not in KINDS:
+            raise ValueError(f"Projection kind must be one of {KINDS}")
+        self.kind = kind
+        self.dim = dim
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dim: int) -> "Projection":
+        """Fit a PCA projection on sample embeddings"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dim >= vectors.shape[1]:
+            raise ValueError(f"Projection dimension {dim} must be below the model's {vectors.shape[1]}")
+        if len(vectors) < dim:
+            raise ValueError(f"Need at least {dim} sample vectors to fit a {dim}-dimensional PCA")
+        mean = vectors.mean(axis=0)
+        _, singular_values, components = np.linalg.svd(vectors - mean, full_matrices=False)
+        explained = float((singular_values[:dim] ** 2).sum() / (singular_values ** 2).sum())
+        logger.info(f"Fitted {dim}-dimensional PCA on {len(vectors)} vectors ({explained:.1%} of variance)")
+        return cls("pca", dim, mean=mean, components=components[:dim].astype(np.float32))
+
+    @classmethod
+    def truncate(cls, dim: int, model_dim: int) -> "Projection":
+        """Matryoshka-style projection keeping the first `dim` dimensions"""
+        if dim >= model_dim:
+            raise ValueError(f"Projection dimension {dim} must be below the model's {model_dim}")
+        return cls("truncate", dim)
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project one vector or a matrix of row vectors"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.kind == "pca":
+            projected = (vectors - self.mean) @ self.components.T
+        else:
+            projected = vectors[..., :self.dim]
+        return _normalize(projected)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        arrays = {'mean': self.mean, 'components': self.components} if self.kind == "pca" else {}
+        with open(path, "wb") as f:
+            np.savez(f, kind=self.kind, dim=self.dim, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path) as data:
+            kind = str(data['kind'])
+            if kind == "pca":
+                return cls(kind, int(data['dim']), mean=data['mean'], components=data['components'])
+            return cls(kind, int(data['dim']))
+
+class ProjectedEmbedder:
+    """Wraps an embedding model so `encode` returns projected vectors"""
+
+    def __init__(self, model, projection: Projection):
+        self.model = model
+        self.projection = projection
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.projection.dim
+
+    def encode(self, texts, **kwargs):
+        return self.projection.apply(self.model.encode(texts, **kwargs))
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, rows: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    scores[np.arange(len(rows)), rows] = -np.inf  # a chunk is not its own neighbour
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+def recall_report(
+    vectors: np.ndarray,
+    dims: List[int],
+    kinds=KINDS,
+    top_k: int = 10,
+    queries: int = 200,
+    seed: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Measure how well projected search reproduces full-dimension search
+
+    Each of `queries` sampled corpus vectors is searched against the rest
+    of the corpus, and recall@k is the share of its exact top-k neighbours
+    that projected search also returns.
+
+    Args:
+        vectors: Model embeddings of a corpus sample
+        dims: Projection dimensions to evaluate
+        kinds: Projection kinds to evaluate
+        top_k: Neighbours compared per query
+        queries: Number of sampled query vectors
+
+    Returns:
+        One row per (kind, dimension) with recall, bytes per vector and
+        search time relative to full dimension
+    """
+    vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)
+
+    started = time.perf_counter()
+    exact = _top_k(vectors[rows], vectors, rows, top_k)
+    full_seconds = time.perf_counter() - started
+
+    report = [{
+        'kind': 'none',
+        'dim': vectors.shape[1],
+        'recall': 1.0,
+        'bytes_per_vector': vectors.shape[1] * 4,
+        'relative_search_time': 1.0
+    }]
+    for kind in kinds:
+        for dim in dims:
+            if dim >= vectors.shape[1]:
+                continue
+            if kind == "pca":
+                projection = Projection.fit_pca(vectors, dim)
+            else:
+                projection = Projection.truncate(dim, vectors.shape[1])
+            projected = projection.apply(vectors)
+
+            started = time.perf_counter()
+            approx = _top_k(projected[rows], projected, rows, top_k)
+            seconds = time.perf_counter() - started
+
+            recall = np.mean([len(set(a) & set(e)) / top_k for a, e in zip(approx, exact)])
+            report.append({
+                'kind': kind,
+                'dim': dim,
+                'recall': float(recall),
+                'bytes_per_vector': dim * 4,
+                'relative_search_time': seconds / full_seconds
+            })
+    return report
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Recall versus dimension report for embedding projections")
+    parser.add_argument("--dims", default="32,64,128,256", help="comma-separated projection dimensions")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="projection kinds to evaluate")
+    parser.add_argument("--sample", type=int, default=5000, help="corpus chunks to sample")
+    parser.add_argument("--queries", type=int, default=200, help="query vectors drawn from the sample")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    from vector_store import VectorStore, load_embedding_model
+    store = VectorStore()
+    texts = []
+    for batch in store.iter_vectors(batch_size=500):
+        texts.extend(chunk['text'] for chunk in batch)
+        if len(texts) >= args.sample:
+            break
+    texts = texts[:args.sample]
+    if len(texts) <= args.top_k:
+        parser.error("Not enough chunks in the knowledge base for a report")
+
+    # Re-embed with the plain model, in case the active index is itself projected
+    model = load_embedding_model(store.embedding_model_name)
+    vectors = model.encode(texts, batch_size=64)
+    report = recall_report(
+        vectors,
+        dims=[int(d) for d in args.dims.split(",")],
+        kinds=[k.strip() for k in args.kinds.split(",")],
+        top_k=args.top_k,
+        queries=args.queries
+    )
+
+    print(f"Recall@{args.top_k} over {len(texts)} chunks of {store.embedding_model_name}")
+    print(f"{'kind':<10}{'dim':>6}{'recall':>9}{'bytes':>8}{'search time':>13}")
+    for row in report:
+        print(f"{row['kind']:<10}{row['dim']:>6}{row['recall']:>9.3f}{row['bytes_per_vector']:>8}"
+              f"{row['relative_search_time']:>12.2f}x")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
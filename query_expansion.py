@@ -0,0 +1,233 @@
+"""
+Query variants for multi-query retrieval, and fusion of their results
+"""
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any
+
+from llm_scheduler import Priority
+from metrics import REGISTRY
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODES = ("rules", "llm")
+
+EXPANSIONS = REGISTRY.counter(
+    "jarvis_query_expansions_total",
+    "Multi-query expansions by source of the variants (rules, llm, cache, or rules_fallback)"
+)
+
+EXPANSION_PROMPT = """You rewrite search queries for a document search engine.
+Write {count} alternative phrasings of the user's query that use different words (synonyms, related terms, a statement instead of a question) but keep its meaning.
+Output one phrasing per line with no numbering or commentary."""
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "been", "am", "do", "does", "did",
+    "i", "we", "you", "me", "my", "our", "your", "it", "its", "this", "that", "these", "those",
+    "what", "which", "who", "whom", "where", "when", "why", "how", "can", "could", "should",
+    "would", "will", "shall", "may", "might", "must", "to", "of", "in", "on", "at", "for", "from",
+    "with", "about", "into", "by", "and", "or", "if", "there", "any", "some", "please", "tell", "know"
+}
+
+SYNONYMS = {
+    "buy": "purchase", "purchase": "buy", "cost": "price", "price": "cost", "fix": "repair",
+    "repair": "fix", "start": "begin", "begin": "start", "error": "problem", "problem": "issue",
+    "issue": "problem", "help": "support", "support": "help", "rule": "policy", "rules": "policy",
+    "policy": "guidelines", "employee": "staff", "employees": "staff", "staff": "employees",
+    "leave": "time off", "vacation": "time off", "salary": "pay", "pay": "salary", "boss": "manager",
+    "manager": "supervisor", "car": "vehicle", "phone": "mobile", "password": "credentials",
+    "login": "sign in", "setup": "configure", "install": "set up", "delete": "remove", "remove": "delete",
+    "create": "make", "cancel": "terminate", "refund": "reimbursement", "meeting": "appointment",
+    "deadline": "due date", "fast": "quick", "big": "large", "small": "little", "show": "display"
+}
+
+_QUESTION_FORMS = [
+    (re.compile(r"^how (?:do|does|can|should|would) (?:i|we|you|one|someone) (.+)$"), r"how to \1"),
+    (re.compile(r"^(?:what|who) (?:is|are|was|were) (?:the |a |an )?(.+)$"), r"\1"),
+    (re.compile(r"^(?:where|when) (?:is|are|do|does|can|should) (.+)$"), r"\1 location time"),
+    (re.compile(r"^why (?:is|are|do|does|did|was|were) (.+)$"), r"reason \1"),
+    (re.compile(r"^(?:can|could|may) (?:i|we|you) (.+)$"), r"\1 allowed")
+]
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[\w'-]+", text.lower())
+
+def rule_variants(question: str, count: int) -> List[str]:
+    """
+    Rephrasings of a query without calling a model: its keywords, the
+    question turned into a statement, and its words swapped for synonyms
+    """
+    normalized = " ".join(_words(question))
+    variants = []
+
+    for pattern, replacement in _QUESTION_FORMS:
+        if pattern.match(normalized):
+            variants.append(pattern.sub(replacement, normalized))
+            break
+
+    keywords = [word for word in _words(question) if word not in STOPWORDS]
+    if keywords:
+        variants.append(" ".join(keywords))
+        swapped = [SYNONYMS.get(word, word) for word in keywords]
+        if swapped != keywords:
+            variants.append(" ".join(swapped))
+
+    unique = []
+    for variant in variants:
+        if variant and variant != normalized and variant not in unique:
+            unique.append(variant)
+    return unique[:count]
+
+def parse_llm_variants(question: str, text: str, count: int) -> List[str]:
+    """Variants from an LLM answer with one phrasing per line"""
+    seen = {" ".join(_words(question))}
+    variants = []
+    for line in text.splitlines():
+        line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip().strip('"')
+        key = " ".join(_words(line))
+        if key and key not in seen and len(line) < 4 * len(question) + 50:
+            seen.add(key)
+            variants.append(line)
+    return variants[:count]
+
+def fuse(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+    """
+    Reciprocal rank fusion of the hits of several queries
+
+    Chunks are ranked by the sum of 1 / (k + rank) over the lists they
+    appear in. The `top_k` best are returned ordered by their highest
+    similarity score, which each hit keeps as 'score', so similarity
+    thresholds still apply; the fused score is under 'fusion_score'.
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for hits in result_lists:
+        for rank, hit in enumerate(hits):
+            entry = fused.get(hit['id'])
+            if entry is None:
+                entry = fused[hit['id']] = {**hit, 'fusion_score': 0.0}
+            elif hit['score'] > entry['score']:
+                entry['score'] = hit['score']
+            entry['fusion_score'] += 1.0 / (k + rank + 1)
+    best = sorted(fused.values(), key=lambda hit: hit['fusion_score'], reverse=True)[:top_k]
+    return sorted(best, key=lambda hit: hit['score'], reverse=True)
+
+class QueryExpander:
+    """
+    Produces query variants by rules or with a short LLM generation
+
+    LLM variants are cached per normalized query in an LRU cache. The
+    generation runs at batch priority and only when a scheduler slot is
+    free, so it never queues ahead of or alongside answers. When the slot
+    is taken, or the LLM is slow or fails, the rule-based variants are
+    used; a failed query keeps using them for `failure_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        llm,
+        mode: str = "rules",
+        count: int = 3,
+        cache_size: int = 1000,
+        num_predict: int = 96,
+        failure_ttl: float = 60.0
+    ):
+        """
+        Args:
+            llm: LLMInterface used in 'llm' mode
+            mode: 'rules' or 'llm'
+            count: Number of variants per query
+            cache_size: LLM variant lists kept in the cache
+            num_predict: Token limit of the LLM generation
+            failure_ttl: Seconds a query whose LLM generation failed skips the LLM
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown query expansion mode {mode!r}; expected one of {MODES}")
+        self.llm = llm
+        self.mode = mode
+        self.count = count
+        self.cache_size = cache_size
+        self.num_predict = num_predict
+        self.failure_ttl = failure_ttl
+        self._cache: "OrderedDict[str, List[str]]" = OrderedDict()
+        # Normalized query -> monotonic time until which the LLM is not retried
+        self._failures: "OrderedDict[str, float]" = OrderedDict()
+
+    async def variants(self, question: str, timeout: float) -> List[str]:
+        """
+        Variants of a query (not including the query itself)
+
+        Args:
+            question: The user's query
+            timeout: Seconds the LLM may take before falling back to rules
+        """
+        if self.mode == "rules" or self.count <= 0:
+            EXPANSIONS.inc(source="rules")
+            return rule_variants(question, self.count)
+
+        key = " ".join(_words(question))
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            EXPANSIONS.inc(source="cache")
+            return cached
+
+        now = time.monotonic()
+        if self._failures.get(key, 0.0) > now:
+            EXPANSIONS.inc(source="rules_fallback")
+            return rule_variants(question, self.count)
+        if not self.llm.scheduler.has_free_slot():
+            # Not a failure of this query, so it is not remembered
+            EXPANSIONS.inc(source="rules_fallback")
+            return rule_variants(question, self.count)
+
+        try:
+            text = await asyncio.wait_for(
+                self.llm.complete(
+                    question,
+                    system_prompt=EXPANSION_PROMPT.format(count=self.count),
+                    options={'num_predict': self.num_predict},
+                    priority=Priority.BATCH,
+                    timeout=timeout
+                ),
+                timeout
+            )
+            variants = parse_llm_variants(question, text or "", self.count)
+        except Exception as e:
+            logger.warning(f"LLM query expansion failed, using rules: {e!r}")
+            variants = []
+
+        if not variants:
+            self._remember_failure(key, now)
+            EXPANSIONS.inc(source="rules_fallback")
+            return rule_variants(question, self.count)
+
+        EXPANSIONS.inc(source="llm")
+        self._cache[key] = variants
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return variants
+
+    def _remember_failure(self, key: str, now: float):
+        """Skip the LLM for a query for failure_ttl seconds"""
+        if self.failure_ttl <= 0:
+            return
+        self._failures[key] = now + self.failure_ttl
+        self._failures.move_to_end(key)
+        while self._failures and (
+            len(self._failures) > self.cache_size or next(iter(self._failures.values())) <= now
+        ):
+            self._failures.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Expansion mode and how variants were produced"""
+        return {
+            'mode': self.mode,
+            'variants': self.count,
+            'cached': len(self._cache),
+            'failures_cached': len(self._failures),
+            **{source: int(EXPANSIONS.value(source=source)) for source in ("rules", "llm", "cache", "rules_fallback")}
+        }
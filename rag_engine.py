@@ -2,15 +2,42 @@
 RAG (Retrieval-Augmented Generation) Engine
 Orchestrates the entire RAG pipeline
 """
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
+from config import settings
 from vector_store import VectorStore
 from llm_interface import LLMInterface
+from llm_scheduler import Priority, AdmissionError, DeadlineExceededError
 from document_processor import DocumentProcessor
+from directory_sync import DirectorySync
+from health import HealthMonitor
+from migration import EmbeddingMigration
+from metrics import REGISTRY, collect_timings, stage_timer
+from snapshot import export_snapshot, import_snapshot
+from retrieval_gate import needs_retrieval, adaptive_cut
+from query_expansion import QueryExpander, fuse
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+QUERY_CACHE_HITS = REGISTRY.counter(
+    "jarvis_query_cache_hits_total",
+    "Queries answered without their own computation, by cache"
+)
+
+RETRIEVAL_PATHS = REGISTRY.counter(
+    "jarvis_retrieval_paths_total",
+    "Context retrievals by outcome: skipped as trivial, all top_k kept, or cut short by a threshold"
+)
+
+RETRIEVAL_PATH_NAMES = ("skipped_trivial", "full", "score_cliff", "min_score", "no_match")
+
+MULTI_QUERY_OUTCOMES = REGISTRY.counter(
+    "jarvis_multi_query_total",
+    "Multi-query retrievals by outcome: fused, or single-query results when variants missed the latency budget"
+)
+
 class RAGEngine:
     """Main RAG engine that orchestrates retrieval and generation"""
     
@@ -19,59 +46,472 @@ class RAGEngine:
         self.vector_store = VectorStore()
         self.llm = LLMInterface()
         self.doc_processor = DocumentProcessor()
+        self.query_expander = QueryExpander(
+            self.llm,
+            mode=settings.multi_query_mode,
+            count=settings.multi_query_variants,
+            cache_size=settings.multi_query_cache_size,
+            num_predict=settings.multi_query_num_predict,
+            failure_ttl=settings.multi_query_failure_ttl
+        )
+        self.directory_sync = DirectorySync(self.vector_store, self.doc_processor)
+        self._inflight_queries: Dict[Tuple, asyncio.Task] = {}
+        self._coalesced_queries = 0
+        self.migration: Optional[EmbeddingMigration] = None
+        self.health = HealthMonitor(
+            checks={
+                'llm': self.llm.check_connection,
+                'vector_store': self._check_vector_store
+            },
+            interval=settings.health_check_interval,
+            timeout=settings.health_check_timeout
+        )
         logger.info("RAG Engine initialized")
     
     async def query(
         self,
         question: str,
         use_context: bool = True,
-        top_k: int = None
+        top_k: int = None,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+        collections: Optional[List[str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        multi_query: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Process a query using RAG
         
+        Concurrent calls in the same session with the same normalized
+        question, `top_k`, `use_context`, collections and options share one
+        retrieval and generation; each caller still gives up after its own
+        `timeout`.
+        
         Args:
             question: User's question
             use_context: Whether to retrieve and use context
             top_k: Number of context documents to retrieve
+            timeout: Deadline in seconds for queueing and generation
+            session_id: Conversation session the question belongs to
+            collections: Collections to search concurrently; the default
+                collection when omitted
+            options: Ollama generation options (num_predict, num_ctx, stop)
+                overriding the configured ones
+            multi_query: Also search with rephrasings of the question and fuse
+                the results; MULTI_QUERY when omitted
         
         Returns:
             Dict with answer, context, and metadata
+        
+        Raises:
+            AdmissionError: If the LLM scheduler is overloaded, or a coalesced
+                query outlives this caller's timeout
         """
+        if not settings.query_coalescing:
+            return await self._run_query(
+                question, use_context, top_k, timeout, session_id, collections, options, multi_query
+            )
+        
+        key = self._coalesce_key(question, use_context, top_k, session_id, collections, options, multi_query)
+        task = self._inflight_queries.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._run_query(question, use_context, top_k, timeout, session_id, collections, options, multi_query)
+            )
+            self._inflight_queries[key] = task
+            task.add_done_callback(lambda done: self._finish_inflight(key, done))
+        else:
+            self._coalesced_queries += 1
+            QUERY_CACHE_HITS.inc(cache="coalesced")
+            logger.info("Coalesced query with an identical in-flight request")
+        
+        # Shielded so one caller disconnecting or timing out doesn't cancel the shared work
         try:
-            context_docs = []
-            context_texts = []
+            result = await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(f"Coalesced query did not finish within {timeout}s")
+        return {**result, 'question': question}
+    
+    async def _run_query(
+        self,
+        question: str,
+        use_context: bool,
+        top_k: Optional[int],
+        timeout: Optional[float],
+        session_id: Optional[str] = None,
+        collections: Optional[List[str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        multi_query: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Retrieve context and generate an answer for a single question"""
+        try:
+            with collect_timings() as timings, stage_timer("query"):
+                context_docs = []
+                
+                # Retrieve relevant context if enabled
+                if use_context:
+                    with stage_timer("retrieval"):
+                        context_docs = await self._retrieve_context(question, top_k, collections, multi_query)
+                    logger.info(f"Retrieved {len(context_docs)} context documents")
+                
+                result = await self._answer(
+                    question,
+                    context_docs,
+                    use_context,
+                    timeout=timeout,
+                    session_id=session_id,
+                    options=options
+                )
             
-            # Retrieve relevant context if enabled
-            if use_context:
-                context_docs = self.vector_store.search(question, top_k)
-                context_texts = [doc['text'] for doc in context_docs]
-                logger.info(f"Retrieved {len(context_docs)} context documents")
+            return {**result, 'timings': timings}
+        
+        except AdmissionError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing query: {e}")
+            return self._error_result(question, e)
+    
+    async def query_stream(
+        self,
+        question: str,
+        use_context: bool = True,
+        top_k: int = None,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+        collections: Optional[List[str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        multi_query: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a query using RAG, yielding the answer as it is generated
+        
+        Streamed queries are not coalesced. Overload and other errors are
+        reported as a final event since the response has already started.
+        
+        Yields:
+            A 'context' event with the retrieved documents, 'token' events
+            with pieces of the answer, then a 'done' event with stage timings
+            (or an 'error' event)
+        """
+        try:
+            with collect_timings() as timings:
+                with stage_timer("query"):
+                    context_docs = []
+                    if use_context:
+                        with stage_timer("retrieval"):
+                            context_docs = await self._retrieve_context(question, top_k, collections, multi_query)
+                        logger.info(f"Retrieved {len(context_docs)} context documents")
+                    
+                    yield {
+                        'type': 'context',
+                        'question': question,
+                        'context': context_docs,
+                        'used_context': use_context and len(context_docs) > 0
+                    }
+                    
+                    context_texts = [doc['text'] for doc in context_docs]
+                    async for text in self.llm.stream_response(
+                        query=question,
+                        context=context_texts if context_texts else None,
+                        timeout=timeout,
+                        session_id=session_id,
+                        options=options
+                    ):
+                        yield {'type': 'token', 'text': text}
             
-            # Generate response using LLM
-            answer = await self.llm.generate_response(
-                query=question,
-                context=context_texts if context_texts else None
+            yield {'type': 'done', 'timings': timings}
+        
+        except AdmissionError as e:
+            yield {'type': 'error', 'status_code': e.status_code, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"Error processing streamed query: {e}")
+            yield {'type': 'error', 'status_code': 500, 'error': str(e)}
+    
+    async def _retrieve_context(
+        self,
+        question: str,
+        top_k: Optional[int],
+        collections: Optional[List[str]] = None,
+        multi_query: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """Retrieve context off the event loop, with query variants when multi-query is on"""
+        if multi_query is None:
+            multi_query = settings.multi_query
+        if not multi_query or (settings.retrieval_gating and not needs_retrieval(question)):
+            return await asyncio.to_thread(self._retrieve, question, top_k, collections)
+        hits = await self._multi_query_search(question, top_k or settings.top_k_results, collections)
+        return await asyncio.to_thread(self._trim_and_expand, hits)
+    
+    async def _multi_query_search(
+        self,
+        question: str,
+        top_k: int,
+        collections: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search with the question and its variants, fusing the results
+        
+        The question is searched right away while variants are produced;
+        the variants are then embedded in one batch and searched
+        concurrently. Their results are fused in only if they arrive
+        within MULTI_QUERY_BUDGET_MS of the start of the search; variant
+        generation and the variant searches share that one deadline, so
+        expansion adds at most that much latency.
+        """
+        loop = asyncio.get_running_loop()
+        budget = settings.multi_query_budget_ms / 1000
+        deadline = loop.time() + budget
+        original = asyncio.create_task(
+            asyncio.to_thread(self.vector_store.search, question, top_k, collections)
+        )
+        variant_search = None
+        try:
+            with stage_timer("query_expansion"):
+                variants = await self.query_expander.variants(question, timeout=budget)
+            variant_search = (
+                asyncio.create_task(asyncio.to_thread(self.vector_store.search_batch, variants, top_k, collections))
+                if variants else None
             )
             
-            return {
-                'question': question,
-                'answer': answer,
-                'context': context_docs,
-                'used_context': use_context and len(context_docs) > 0
-            }
+            hits = await original
+            if variant_search is None:
+                MULTI_QUERY_OUTCOMES.inc(outcome="no_variants")
+                return hits
+            done, _ = await asyncio.wait({variant_search}, timeout=max(0.0, deadline - loop.time()))
+            if not done:
+                # The search thread cannot be interrupted; its late result is dropped
+                MULTI_QUERY_OUTCOMES.inc(outcome="over_budget")
+                logger.info("Query variants missed the latency budget; using the question's results")
+                return hits
+            
+            MULTI_QUERY_OUTCOMES.inc(outcome="fused")
+            return fuse([hits] + variant_search.result(), top_k)
+        finally:
+            # Don't leave a search task behind when returning early, failing or being cancelled
+            for task in (original, variant_search):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    def _retrieve(
+        self,
+        question: str,
+        top_k: Optional[int],
+        collections: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for context, trim it adaptively and expand hits to their parent windows"""
+        if settings.retrieval_gating and not needs_retrieval(question):
+            RETRIEVAL_PATHS.inc(path="skipped_trivial")
+            logger.info("Skipped retrieval for a trivial message")
+            return []
+        return self._trim_and_expand(self.vector_store.search(question, top_k, collections))
+    
+    def _retrieve_batch(
+        self,
+        questions: List[str],
+        top_k: Optional[int],
+        collections: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for context for many questions, trim it adaptively and expand hits to their parent windows"""
+        searched = [
+            i for i, question in enumerate(questions)
+            if not settings.retrieval_gating or needs_retrieval(question)
+        ]
+        if len(searched) < len(questions):
+            RETRIEVAL_PATHS.inc(len(questions) - len(searched), path="skipped_trivial")
         
-        except Exception as e:
-            logger.error(f"Error processing query: {e}")
-            return {
-                'question': question,
-                'answer': "I encountered an error processing your question.",
-                'context': [],
-                'used_context': False,
-                'error': str(e)
-            }
+        results: List[List[Dict[str, Any]]] = [[] for _ in questions]
+        if searched:
+            hits = self.vector_store.search_batch([questions[i] for i in searched], top_k, collections)
+            for i, docs in zip(searched, hits):
+                results[i] = self._trim_and_expand(docs)
+        return results
+    
+    def _trim_and_expand(self, hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Cut search hits at the similarity thresholds, then expand to parents
+        
+        `top_k` is the most hits kept; fewer are used when the scores fall
+        below RETRIEVAL_MIN_SCORE or drop by more than RETRIEVAL_SCORE_CLIFF.
+        """
+        kept, path = adaptive_cut(hits, settings.retrieval_min_score, settings.retrieval_score_cliff)
+        RETRIEVAL_PATHS.inc(path=path)
+        if len(kept) < len(hits):
+            logger.info(f"Kept {len(kept)} of {len(hits)} hits ({path})")
+        return self.vector_store.expand_to_parents(kept)
+    
+    def retrieval_stats(self) -> Dict[str, int]:
+        """How often each retrieval path was taken"""
+        return {path: int(RETRIEVAL_PATHS.value(path=path)) for path in RETRIEVAL_PATH_NAMES}
+    
+    @staticmethod
+    def _coalesce_key(
+        question: str,
+        use_context: bool,
+        top_k: Optional[int],
+        session_id: Optional[str],
+        collections: Optional[List[str]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        multi_query: Optional[bool] = None
+    ) -> Tuple:
+        """Key under which identical concurrent queries are deduplicated"""
+        normalized = " ".join(question.lower().split())
+        return (
+            normalized,
+            use_context,
+            top_k or settings.top_k_results,
+            session_id,
+            tuple(sorted(set(collections))) if collections else (),
+            tuple(sorted((name, repr(value)) for name, value in (options or {}).items() if value is not None)),
+            settings.multi_query if multi_query is None else multi_query
+        )
+    
+    def _finish_inflight(self, key: Tuple, task: asyncio.Task):
+        """Forget a completed shared query"""
+        if self._inflight_queries.get(key) is task:
+            del self._inflight_queries[key]
+        # Mark the exception retrieved even if every waiter has gone away
+        if not task.cancelled():
+            task.exception()
     
-    def add_knowledge(self, text: str, doc_name: str = None, doc_type: str = None) -> bool:
+    async def query_batch(
+        self,
+        questions: List[str],
+        use_context: bool = True,
+        top_k: int = None,
+        max_concurrency: int = None,
+        collections: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process many independent questions using RAG
+        
+        Args:
+            questions: Questions to answer
+            use_context: Whether to retrieve and use context
+            top_k: Number of context documents to retrieve per question
+            max_concurrency: Maximum concurrent LLM generations
+            collections: Collections to search; the default collection when omitted
+        
+        Returns:
+            One result dict per question, in input order
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        async for index, result in self.iter_query_batch(
+            questions,
+            use_context=use_context,
+            top_k=top_k,
+            max_concurrency=max_concurrency,
+            collections=collections
+        ):
+            results[index] = result
+        return results
+    
+    async def iter_query_batch(
+        self,
+        questions: List[str],
+        use_context: bool = True,
+        top_k: int = None,
+        max_concurrency: int = None,
+        collections: Optional[List[str]] = None
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Process many independent questions, yielding results as they complete
+        
+        Questions are embedded in one batch and searched concurrently, then
+        answered with at most `max_concurrency` LLM generations in flight.
+        That is capped at half of LLM_MAX_QUEUE_DEPTH, so a batch cannot
+        fill the scheduler queue and get interactive queries rejected.
+        Batch questions neither read nor extend the conversation history.
+        
+        Yields:
+            (index, result) tuples in completion order
+        """
+        if not questions:
+            return
+        
+        if use_context:
+            context_batches = await asyncio.to_thread(self._retrieve_batch, questions, top_k, collections)
+            logger.info(f"Retrieved context for {len(questions)} batch questions")
+        else:
+            context_batches = [[] for _ in questions]
+        
+        concurrency = min(max_concurrency or settings.batch_llm_concurrency, max(1, settings.llm_max_queue_depth // 2))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def answer(index: int) -> Tuple[int, Dict[str, Any]]:
+            question = questions[index]
+            async with semaphore:
+                try:
+                    result = await self._answer(
+                        question,
+                        context_batches[index],
+                        use_context,
+                        use_history=False,
+                        priority=Priority.BATCH
+                    )
+                except Exception as e:
+                    logger.error(f"Error processing batch question {index}: {e}")
+                    result = self._error_result(question, e)
+            return index, result
+        
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(questions))]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _answer(
+        self,
+        question: str,
+        context_docs: List[Dict[str, Any]],
+        use_context: bool,
+        use_history: bool = True,
+        priority: Priority = Priority.INTERACTIVE,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None,
+        options: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Generate an answer for a question from already retrieved context"""
+        context_texts = [doc['text'] for doc in context_docs]
+        
+        # Generate response using LLM
+        answer = await self.llm.generate_response(
+            query=question,
+            context=context_texts if context_texts else None,
+            use_history=use_history,
+            priority=priority,
+            timeout=timeout,
+            session_id=session_id,
+            options=options
+        )
+        
+        return {
+            'question': question,
+            'answer': answer,
+            'context': context_docs,
+            'used_context': use_context and len(context_docs) > 0
+        }
+    
+    @staticmethod
+    def _error_result(question: str, error: Exception) -> Dict[str, Any]:
+        """Build the result returned when a question fails"""
+        return {
+            'question': question,
+            'answer': "I encountered an error processing your question.",
+            'context': [],
+            'used_context': False,
+            'error': str(error)
+        }
+    
+    def add_knowledge(
+        self,
+        text: str,
+        doc_name: str = None,
+        doc_type: str = None,
+        doc_id: str = None,
+        collection: str = None
+    ) -> Optional[str]:
         """
         Add knowledge to the system
         
@@ -79,85 +519,352 @@ class RAGEngine:
             text: Text content to add
             doc_name: Name of the document
             doc_type: Type of document
+            doc_id: Document identifier; generated when omitted
+            collection: Collection to add to; the default collection when omitted
         
         Returns:
-            Success status
+            The document id on success, None otherwise
         """
         try:
             # Process document into chunks
             chunks = self.doc_processor.process_document(
                 text=text,
+                doc_id=doc_id,
                 doc_name=doc_name,
                 doc_type=doc_type
             )
             
             if not chunks:
                 logger.warning("No chunks created from document")
-                return False
+                return None
             
             # Add to vector store
-            success = self.vector_store.add_documents(chunks)
+            success = self.vector_store.add_documents(chunks, collection)
             
             if success:
                 logger.info(f"Successfully added knowledge: {doc_name}")
+                return chunks[0]['metadata']['doc_id']
             
-            return success
+            return None
         
         except Exception as e:
             logger.error(f"Error adding knowledge: {e}")
+            return None
+    
+    def replace_knowledge(
+        self,
+        doc_id: str,
+        text: str,
+        doc_name: str = None,
+        doc_type: str = None,
+        collection: str = None
+    ) -> bool:
+        """
+        Replace the content of a document, or add it if it is new
+        
+        Args:
+            doc_id: Document identifier
+            text: New text content
+            doc_name: Name of the document
+            doc_type: Type of document
+            collection: Collection the document belongs to
+        
+        Returns:
+            Success status
+        """
+        try:
+            chunks = self.doc_processor.process_document(
+                text=text,
+                doc_id=doc_id,
+                doc_name=doc_name,
+                doc_type=doc_type
+            )
+            
+            if not chunks:
+                logger.warning("No chunks created from document")
+                return False
+            
+            replaced = self.vector_store.replace_document(doc_id, chunks, collection)
+            if replaced:
+                self.directory_sync.forget(doc_id=doc_id)
+            return replaced
+        
+        except Exception as e:
+            logger.error(f"Error replacing knowledge: {e}")
             return False
     
+    def delete_knowledge(self, doc_id: str) -> Optional[int]:
+        """
+        Remove one document from the knowledge base
+        
+        Returns:
+            Number of chunks removed (0 if the document is unknown), or None on failure
+        """
+        deleted = self.vector_store.delete_document(doc_id)
+        if deleted:
+            self.directory_sync.forget(doc_id=doc_id)
+        return deleted
+    
+    async def add_file(
+        self,
+        data: bytes,
+        filename: str,
+        doc_id: str = None,
+        doc_type: str = None,
+        collection: str = None
+    ) -> Optional[str]:
+        """
+        Extract a file of any supported format and add it to the knowledge base
+        
+        Extraction and chunking run in the extraction worker pool and
+        embedding in a thread, so neither blocks the event loop.
+        
+        Args:
+            data: File contents
+            filename: File name, used to detect the format
+            doc_id: Document identifier; generated when omitted
+            doc_type: Type of document; the detected format when omitted
+            collection: Collection to add to; the default collection when omitted
+        
+        Returns:
+            The document id on success, None otherwise
+        
+        Raises:
+            UnsupportedFormatError: If the file format cannot be extracted
+        """
+        chunks = await self.doc_processor.process_file_async(data, filename, doc_id=doc_id, doc_type=doc_type)
+        if not chunks:
+            logger.warning(f"No chunks created from file {filename}")
+            return None
+        
+        success = await asyncio.to_thread(self.vector_store.add_documents, chunks, collection)
+        if success:
+            logger.info(f"Successfully added file: {filename}")
+            return chunks[0]['metadata']['doc_id']
+        return None
+    
+    def add_files(self, paths: List[str], collection: str = None) -> Dict[str, Optional[str]]:
+        """
+        Extract many files in parallel and add them to the knowledge base
+        
+        Each file is embedded as soon as its extraction finishes, while
+        the worker pool keeps extracting the rest.
+        
+        Args:
+            paths: Files to add
+            collection: Collection to add to; the default collection when omitted
+        
+        Returns:
+            Document id of each path, or None for files that failed
+        """
+        results: Dict[str, Optional[str]] = {}
+        for path, chunks in self.doc_processor.process_files(paths):
+            if chunks and self.vector_store.add_documents(chunks, collection):
+                results[path] = chunks[0]['metadata']['doc_id']
+            else:
+                results[path] = None
+        logger.info(f"Added {sum(1 for doc_id in results.values() if doc_id)} of {len(paths)} files")
+        return results
+    
     def add_knowledge_from_file(self, file_path: str) -> bool:
-        """Add knowledge from a text file"""
+        """Add knowledge from a file of any supported format"""
         try:
-            text = self.doc_processor.load_text_file(file_path)
-            if text:
-                return self.add_knowledge(
-                    text=text,
-                    doc_name=file_path.split('/')[-1],
-                    doc_type='text_file'
-                )
-            return False
+            return self.add_files([file_path])[file_path] is not None
         except Exception as e:
             logger.error(f"Error loading file: {e}")
             return False
     
-    def add_multiple_documents(self, documents: List[Dict[str, str]]) -> bool:
+    def sync_directory(
+        self,
+        directory: str,
+        collection: str = None,
+        dry_run: bool = False,
+        delete_removed: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Ingest new and changed files of a directory tree and delete removed ones
+        
+        Args:
+            directory: Directory to sync
+            collection: Collection to sync into; the default collection when omitted
+            dry_run: Only report what would change
+            delete_removed: Delete documents of files no longer in the tree
+        
+        Returns:
+            Sync report (see DirectorySync.sync)
+        
+        Raises:
+            NotADirectoryError: If directory is not a directory
+            SyncInProgressError: If another sync is running
+        """
+        return self.directory_sync.sync(directory, collection, dry_run, delete_removed)
+    
+    def add_multiple_documents(self, documents: List[Dict[str, str]], collection: str = None) -> bool:
         """
         Add multiple documents at once
         
         Args:
             documents: List of dicts with 'text' and optional 'name', 'type'
+            collection: Collection to add to; the default collection when omitted
         """
         try:
             chunks = self.doc_processor.process_multiple_documents(documents)
-            return self.vector_store.add_documents(chunks)
+            return self.vector_store.add_documents(chunks, collection)
         except Exception as e:
             logger.error(f"Error adding multiple documents: {e}")
             return False
     
     def clear_knowledge(self) -> bool:
         """Clear all knowledge from vector store"""
-        return self.vector_store.delete_all()
+        cleared = self.vector_store.delete_all()
+        if cleared:
+            self.directory_sync.forget()
+        return cleared
+    
+    def list_collections(self) -> Dict[str, int]:
+        """Chunk counts per collection"""
+        return self.vector_store.list_collections()
     
-    def clear_conversation(self):
-        """Clear conversation history"""
-        self.llm.clear_history()
+    def delete_collection(self, collection: str) -> Optional[int]:
+        """
+        Remove a collection and everything in it
+        
+        Returns:
+            Number of chunks removed, or None on failure
+        """
+        deleted = self.vector_store.delete_collection(collection)
+        if deleted is not None:
+            self.directory_sync.forget(collection=collection)
+        return deleted
+    
+    def export_snapshot(self, path: str, dtype: str = "float32") -> Dict[str, Any]:
+        """
+        Write the knowledge base to a snapshot file
+        
+        Args:
+            path: Snapshot file to write
+            dtype: Embedding storage type, float32 or float16
+        
+        Returns:
+            Export totals, or an empty dict on failure
+        """
+        try:
+            return export_snapshot(self.vector_store, path, dtype=dtype)
+        except Exception as e:
+            logger.error(f"Error exporting snapshot: {e}")
+            return {}
+    
+    def import_snapshot(self, path: str) -> Dict[str, Any]:
+        """
+        Load a snapshot file into the knowledge base without re-embedding
+        
+        Returns:
+            Import totals, or an empty dict on failure
+        """
+        try:
+            totals = import_snapshot(self.vector_store, path)
+            self.directory_sync.forget()
+            return totals
+        except Exception as e:
+            logger.error(f"Error importing snapshot: {e}")
+            return {}
+    
+    def start_migration(
+        self,
+        embedding_model: str,
+        batch_size: int = None,
+        projection: Optional[str] = None,
+        projection_dim: Optional[int] = None
+    ) -> bool:
+        """
+        Start re-embedding the knowledge base with another model in the background
+        
+        Queries keep using the current index until the new one is complete.
+        
+        Args:
+            embedding_model: Sentence-transformer model to migrate to
+            batch_size: Chunks re-embedded per batch
+            projection: Optional dimensionality reduction, 'pca' or 'truncate'
+            projection_dim: Dimension to reduce to
+        
+        Returns:
+            False if a migration is already running
+        """
+        if self.migration is not None and self.migration.running:
+            return False
+        self.migration = EmbeddingMigration(
+            self.vector_store,
+            embedding_model,
+            batch_size=batch_size,
+            projection=projection,
+            projection_dim=projection_dim
+        )
+        self.migration.start()
+        return True
+    
+    def resume_migration(self) -> bool:
+        """Restart a migration that was interrupted by a shutdown or crash"""
+        state = self.vector_store.manifest.migration(self.vector_store.base_index_name)
+        if not state or state.get('status') != 'running':
+            return False
+        logger.info(f"Resuming migration to {state['target_model']}")
+        return self.start_migration(
+            state['target_model'],
+            projection=state.get('projection'),
+            projection_dim=state.get('projection_dim')
+        )
+    
+    def cancel_migration(self) -> bool:
+        """Stop a running migration; returns False if none is running"""
+        if self.migration is None or not self.migration.running:
+            return False
+        self.migration.cancel()
+        return True
+    
+    def migration_status(self) -> Dict[str, Any]:
+        """State of the latest model migration and the index in use"""
+        return {
+            'running': self.migration is not None and self.migration.running,
+            'active_index': self.vector_store.index_name,
+            'embedding_model': self.vector_store.embedding_model_name,
+            'projection': self.vector_store.projection_info,
+            'migration': self.vector_store.manifest.migration(self.vector_store.base_index_name)
+        }
+    
+    def clear_conversation(self, session_id: Optional[str] = None):
+        """Clear conversation history of a session"""
+        self.llm.clear_history(session_id)
         logger.info("Cleared conversation history")
     
     def get_stats(self) -> Dict[str, Any]:
         """Get system statistics"""
         return {
             'vector_store': self.vector_store.get_stats(),
-            'conversation_length': len(self.llm.conversation_history)
+            'embedding_model': self.vector_store.embedding_model_name,
+            'projection': self.vector_store.projection_info,
+            'active_index': self.vector_store.index_name,
+            'conversation_length': len(self.llm.conversation_history),
+            'sessions': len(self.llm.sessions),
+            'llm_scheduler': self.llm.scheduler.get_stats(),
+            'llm_backends': self.llm.router.get_stats(),
+            'llm_residency': self.llm.residency_stats(),
+            'coalesced_queries': self._coalesced_queries,
+            'retrieval_paths': self.retrieval_stats(),
+            'query_expansion': self.query_expander.get_stats(),
+            'extraction': self.doc_processor.extraction_stats()
         }
     
     async def check_health(self) -> Dict[str, bool]:
-        """Check health of all components"""
-        llm_connected = await self.llm.check_connection()
+        """
+        Check health of all components
         
-        return {
-            'llm': llm_connected,
-            'vector_store': True,  # If initialized, it's working
-            'overall': llm_connected
-        }
+        Served from the background health monitor while it is running and
+        fresh; otherwise the components are probed now.
+        """
+        if not self.health.running or self.health.snapshot()['stale']:
+            await self.health.refresh()
+        return self.health.snapshot()['components']
+    
+    async def _check_vector_store(self) -> bool:
+        """Probe the vector store without blocking the event loop"""
+        return await asyncio.to_thread(self.vector_store.check_connection)
@@ -0,0 +1,58 @@
+"""
+Deciding whether a query needs retrieval, and how many hits to keep
+"""
+import re
+from typing import List, Dict, Any, Tuple
+
+# Whole messages that are small talk rather than questions about the knowledge base
+TRIVIAL_MESSAGES = {
+    "hi", "hello", "hey", "hiya", "yo", "howdy", "greetings", "sup", "whats up",
+    "good morning", "good afternoon", "good evening", "good night", "morning", "evening",
+    "thanks", "thank you", "thanks a lot", "thank you very much", "thx", "ty", "cheers", "much appreciated",
+    "ok", "okay", "k", "kk", "cool", "great", "nice", "awesome", "perfect", "got it", "understood",
+    "sounds good", "makes sense", "sure", "yes", "yeah", "yep", "no", "nope", "lol", "haha",
+    "bye", "goodbye", "see you", "see ya", "later", "good bye",
+    "how are you", "how are you doing", "hows it going", "who are you", "what are you"
+}
+
+# Words that may surround a trivial message ("hi there", "thanks jarvis")
+_FILLER = re.compile(r"^(?:(?:oh|well|um|uh)\s+)?(.*?)(?:\s+(?:there|jarvis|again|so much|all|everyone))*$")
+_NON_WORD = re.compile(r"[^\w\s]+")
+
+def needs_retrieval(question: str) -> bool:
+    """
+    Whether a message should be answered with retrieved context
+
+    Greetings, thanks, acknowledgements and messages without any words
+    are answered by the LLM alone.
+    """
+    normalized = " ".join(_NON_WORD.sub("", question.lower().replace("'", "")).split())
+    if not normalized:
+        return False
+    core = _FILLER.match(normalized).group(1)
+    return normalized not in TRIVIAL_MESSAGES and core not in TRIVIAL_MESSAGES
+
+def adaptive_cut(
+    hits: List[Dict[str, Any]],
+    min_score: float = 0.0,
+    score_cliff: float = 0.0
+) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Keep the leading hits until the similarity falls too low or drops sharply
+
+    Args:
+        hits: Search hits sorted by descending 'score'
+        min_score: Drop hits scoring below this similarity (0 disables)
+        score_cliff: Stop at the first hit scoring this much below the one
+            before it (0 disables)
+
+    Returns:
+        Tuple of the kept hits and which rule fired: 'full' (all kept),
+        'min_score', 'score_cliff', or 'no_match' (none were similar enough)
+    """
+    for position, hit in enumerate(hits):
+        if min_score and hit['score'] < min_score:
+            return hits[:position], 'min_score' if position else 'no_match'
+        if score_cliff and position and hits[position - 1]['score'] - hit['score'] > score_cliff:
+            return hits[:position], 'score_cliff'
+    return hits, 'full'
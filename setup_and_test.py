@@ -2,7 +2,9 @@
 Setup and test script for Jarvis AI Assistant
 """
 import asyncio
+import os
 import sys
+import tempfile
 from rag_engine import RAGEngine
 from sample_data import get_sample_documents
 
@@ -98,10 +100,74 @@ async def quick_test():
         print(f"✗ Error: {e}")
         return False
 
+def migration_test():
+    """
+    Offline regression test: a migration restarted after a cancel must not
+    bring back chunks deleted while it was stopped
+    """
+    import migration
+    from benchmark import HashingEmbedder, make_text
+    from chunk_store import ChunkStore
+    from config import settings
+    from vector_store import VectorStore
+
+    print("\nRunning migration cancel/delete/restart test...")
+    with tempfile.TemporaryDirectory() as data_dir:
+        settings.vector_backend = "local"
+        settings.local_index_shards = 1
+        settings.local_index_path = os.path.join(data_dir, "index")
+        settings.index_manifest_path = os.path.join(data_dir, "manifest.json")
+        settings.projection_dir = os.path.join(data_dir, "projections")
+        migration.load_embedding_model = lambda name: HashingEmbedder(256)
+        # Checkpoint often, so the cancelled run leaves a populated target on disk
+        migration.CHECKPOINT_BATCHES = 2
+
+        store = VectorStore(
+            embedding_model=HashingEmbedder(384),
+            chunk_store=ChunkStore(os.path.join(data_dir, "chunks.db"))
+        )
+        store.add_documents([
+            {'id': f"doc{i}-0", 'text': make_text(300, seed=i), 'metadata': {'doc_id': f"doc{i}"}}
+            for i in range(120)
+        ])
+
+        # Cancel once part of the knowledge base has been copied
+        first = migration.EmbeddingMigration(store, "hashing-256", batch_size=10, duty_cycle=1.0)
+        migrate_batch = store.migrate_batch
+        def migrate_then_cancel(batch):
+            copied = migrate_batch(batch)
+            if first.status().get('copied', 0) + copied >= 100:
+                first.cancel()
+            return copied
+        store.migrate_batch = migrate_then_cancel
+        first._run()
+        store.migrate_batch = migrate_batch
+        assert first.status()['status'] == 'cancelled', first.status()
+
+        # Deletes while no migration is mirroring them
+        for i in range(60):
+            store.delete_document(f"doc{i}")
+
+        second = migration.EmbeddingMigration(store, "hashing-256", batch_size=10, duty_cycle=1.0)
+        second._run()
+        assert second.status()['status'] == 'completed', second.status()
+
+        vectors = store.get_stats()['total_vector_count']
+        chunks = store.chunk_store.count()
+        hits = store.search(make_text(300, seed=100), top_k=20)
+        print(f"   Active index: {vectors} vectors for {chunks} chunks, {len(hits)} of 20 hits")
+        if vectors != chunks or len(hits) != 20:
+            print("✗ Deleted chunks came back after the migration")
+            return False
+    print("✓ Migration test passed")
+    return True
+
 def main():
     """Main entry point"""
     if len(sys.argv) > 1 and sys.argv[1] == "quick":
         asyncio.run(quick_test())
+    elif len(sys.argv) > 1 and sys.argv[1] == "migration":
+        sys.exit(0 if migration_test() else 1)
     else:
         asyncio.run(test_system())
 
@@ -0,0 +1,191 @@
+"""
+Local vector index split into shards that are searched in parallel
+"""
+import heapq
+import logging
+import os
+import re
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import List, Dict, Any, Optional, Iterator
+
+from local_index import LocalIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SHARD_DIR = re.compile(r"^shard-(\d+)-of-(\d+)$")
+
+class ShardedLocalIndex:
+    """
+    LocalIndex API over `shards` LocalIndex partitions
+
+    Each chunk id is assigned to a shard by a stable hash. A query is
+    scattered to all shards on a thread pool (NumPy releases the GIL for
+    the matrix products), and each shard's sorted top-k is merged with a
+    heap, so search latency on a large corpus falls with the number of
+    cores. Writes, deletes and compaction are per shard, and each shard
+    has its own writer lock and lock-free readers.
+
+    Shards are stored as `shard-<i>-of-<n>` under `path`. An index saved
+    with another shard count, or an unsharded LocalIndex saved at `path`,
+    is redistributed on open.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: Optional[str] = None,
+        shards: int = 4,
+        compact_ratio: float = 0.2,
+        max_segments: int = 8,
+        workers: Optional[int] = None
+    ):
+        self.dimension = dimension
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self._shards = [
+            LocalIndex(
+                dimension,
+                path=self._shard_path(i, shards),
+                compact_ratio=compact_ratio,
+                max_segments=max_segments
+            )
+            for i in range(shards)
+        ]
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers or min(shards, os.cpu_count() or 1),
+            thread_name_prefix="index-shard"
+        )
+        if path:
+            self._reshard_existing()
+
+    def _shard_path(self, shard: int, shards: int) -> Optional[str]:
+        return os.path.join(self.path, f"shard-{shard}-of-{shards}") if self.path else None
+
+    def _reshard_existing(self):
+        """Move vectors saved under another layout into the current shards"""
+        old_paths = []
+        if LocalIndex.saved_at(self.path):
+            old_paths.append(self.path)
+        if os.path.isdir(self.path):
+            for name in sorted(os.listdir(self.path)):
+                match = SHARD_DIR.match(name)
+                if match and int(match.group(2)) != len(self._shards):
+                    old_paths.append(os.path.join(self.path, name))
+        if not old_paths:
+            return
+
+        moved = 0
+        for old_path in old_paths:
+            old = LocalIndex(self.dimension, path=old_path)
+            for ids in old.list(limit=1000):
+                vectors = old.fetch(ids)['vectors']
+                self.upsert([vectors[id_] for id_ in ids])
+                moved += len(ids)
+        self.flush()
+
+        for old_path in old_paths:
+            if old_path == self.path:
+                LocalIndex.remove_saved(old_path)
+            else:
+                shutil.rmtree(old_path)
+        logger.info(f"Redistributed {moved} vectors into {len(self._shards)} shards at {self.path}")
+
+    def _shard_of(self, id_: str) -> int:
+        return zlib.crc32(id_.encode("utf-8")) % len(self._shards)
+
+    def _group(self, ids: List[str]) -> Dict[int, List[str]]:
+        groups: Dict[int, List[str]] = {}
+        for id_ in ids:
+            groups.setdefault(self._shard_of(id_), []).append(id_)
+        return groups
+
+    def upsert(self, vectors: List[Dict[str, Any]]):
+        """Insert or overwrite vectors given as dicts with 'id', 'values', 'metadata'"""
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for vector in vectors:
+            groups.setdefault(self._shard_of(vector['id']), []).append(vector)
+        list(self._pool.map(lambda item: self._shards[item[0]].upsert(item[1]), groups.items()))
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False
+    ) -> Dict[str, Any]:
+        """Find the `top_k` most similar vectors"""
+        return {'matches': self.query_batch([vector], top_k, include_metadata, include_values)[0]}
+
+    def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        include_metadata: bool = True,
+        include_values: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """Search every shard in parallel and merge their top-k per query"""
+        partials = list(self._pool.map(
+            lambda shard: shard.query_batch(vectors, top_k, include_metadata, include_values),
+            self._shards
+        ))
+        return [
+            list(islice(heapq.merge(*shard_matches, key=lambda match: -match['score']), top_k))
+            for shard_matches in zip(*partials)
+        ]
+
+    def fetch(self, ids: List[str]) -> Dict[str, Any]:
+        """Get stored vectors and metadata by id"""
+        vectors = {}
+        for shard, shard_ids in self._group(ids).items():
+            vectors.update(self._shards[shard].fetch(shard_ids)['vectors'])
+        return {'vectors': vectors}
+
+    def list(self, limit: int = 100) -> Iterator[List[str]]:
+        """Yield pages of stored ids, like Pinecone's Index.list"""
+        page: List[str] = []
+        for shard in self._shards:
+            for ids in shard.list(limit=limit):
+                page.extend(ids)
+                while len(page) >= limit:
+                    yield page[:limit]
+                    page = page[limit:]
+        if page:
+            yield page
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False):
+        """Delete vectors by id (as tombstones), or everything"""
+        if delete_all:
+            for shard in self._shards:
+                shard.delete(delete_all=True)
+            return
+        for shard, shard_ids in self._group(ids or []).items():
+            self._shards[shard].delete(ids=shard_ids)
+
+    def compact(self):
+        """Rebuild every shard without its tombstoned rows"""
+        list(self._pool.map(lambda shard: shard.compact(), self._shards))
+
+    def wait_for_merges(self):
+        """Block until no shard has a background merge running"""
+        for shard in self._shards:
+            shard.wait_for_merges()
+
+    def flush(self):
+        """Write all shards to disk"""
+        list(self._pool.map(lambda shard: shard.flush(), self._shards))
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        """Get index statistics in the shape Pinecone returns, with per-shard counts"""
+        shard_stats = [shard.describe_index_stats() for shard in self._shards]
+        return {
+            'dimension': self.dimension,
+            'total_vector_count': sum(s['total_vector_count'] for s in shard_stats),
+            'tombstones': sum(s['tombstones'] for s in shard_stats),
+            'segments': sum(s['segments'] for s in shard_stats),
+            'shards': [s['total_vector_count'] for s in shard_stats],
+            'backend': 'local'
+        }
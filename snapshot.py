@@ -0,0 +1,211 @@
+"""
+Binary snapshot export/import of the knowledge base
+
+A snapshot holds ids, embeddings, chunk texts, metadata, collections and parent windows,
+so a knowledge base can be restored or cloned without the embedding model.
+
+File layout (little-endian):
+    magic   b"JRVSNAP1"
+    uint32  header length, then the header as JSON
+    blocks  each: type (1 byte), uint32 count, uint32 vector bytes,
+            uint32 record bytes, uint32 CRC-32 of the payload, then the
+            payload: `count` embeddings as a raw array followed by the
+            zlib-compressed JSON records
+    end     an 'E' block whose records are the totals
+
+Blocks are written and read one at a time, so memory stays bounded by the
+batch size however large the knowledge base is.
+
+Usage:
+    python snapshot.py export kb.snap
+    python snapshot.py import kb.snap
+"""
+import argparse
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Any, BinaryIO, Iterator, Optional, Tuple
+import numpy as np
+
+from vector_store import VectorStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAGIC = b"JRVSNAP1"
+FORMAT_VERSION = 1
+BLOCK = struct.Struct("<cIIII")
+VECTORS, PARENTS, END = b"V", b"P", b"E"
+DTYPES = ("float32", "float16")
+
+def _write_block(f: BinaryIO, kind: bytes, count: int, vectors: bytes, records: Any):
+    payload = zlib.compress(json.dumps(records).encode("utf-8"))
+    crc = zlib.crc32(payload, zlib.crc32(vectors))
+    f.write(BLOCK.pack(kind, count, len(vectors), len(payload), crc))
+    f.write(vectors)
+    f.write(payload)
+
+def _read_blocks(f: BinaryIO) -> Iterator[Tuple[bytes, int, bytes, Any]]:
+    while True:
+        head = f.read(BLOCK.size)
+        if len(head) < BLOCK.size:
+            raise ValueError("Snapshot is truncated")
+        kind, count, vector_bytes, record_bytes, crc = BLOCK.unpack(head)
+        vectors = f.read(vector_bytes)
+        payload = f.read(record_bytes)
+        if len(vectors) != vector_bytes or len(payload) != record_bytes:
+            raise ValueError("Snapshot is truncated")
+        if zlib.crc32(payload, zlib.crc32(vectors)) != crc:
+            raise ValueError("Snapshot block failed its checksum")
+        yield kind, count, vectors, json.loads(zlib.decompress(payload))
+        if kind == END:
+            return
+
+def _projection(vector_store: VectorStore) -> Optional[Dict[str, Any]]:
+    info = vector_store.projection_info
+    return {'type': info['type'], 'dim': info['dim']} if info else None
+
+def export_snapshot(vector_store: VectorStore, path: str, batch_size: int = 1000, dtype: str = "float32") -> Dict[str, Any]:
+    """
+    Write the knowledge base of a VectorStore to a snapshot file
+
+    The file is written under a temporary name and moved into place when
+    complete.
+
+    Args:
+        vector_store: Store to export
+        path: Snapshot file to write
+        batch_size: Chunks per block
+        dtype: Embedding storage type, float32 or float16 (half the size)
+
+    Returns:
+        Totals of the exported vectors and parent windows
+    """
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}")
+
+    started = time.perf_counter()
+    totals = {'vectors': 0, 'parents': 0}
+    header = {
+        'format_version': FORMAT_VERSION,
+        'dimension': vector_store.dimension,
+        'dtype': dtype,
+        'embedding_model': vector_store.embedding_model_name,
+        'projection': _projection(vector_store),
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    header_bytes = json.dumps(header).encode("utf-8")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+
+        for batch in vector_store.iter_vectors(batch_size=batch_size):
+            if not batch:
+                continue
+            values = np.asarray([v['values'] for v in batch], dtype=dtype)
+            records = [
+                {'id': v['id'], 'text': v['text'], 'metadata': v['metadata'], 'collection': v['collection']}
+                for v in batch
+            ]
+            _write_block(f, VECTORS, len(batch), values.tobytes(), records)
+            totals['vectors'] += len(batch)
+            if totals['vectors'] % (batch_size * 100) < len(batch):
+                logger.info(f"Exported {totals['vectors']} vectors")
+
+        for parents in vector_store.chunk_store.iter_parents(batch_size=batch_size):
+            _write_block(f, PARENTS, len(parents), b"", parents)
+            totals['parents'] += len(parents)
+
+        _write_block(f, END, 0, b"", totals)
+    os.replace(tmp_path, path)
+
+    totals['seconds'] = time.perf_counter() - started
+    totals['bytes'] = os.path.getsize(path)
+    logger.info(f"Exported {totals['vectors']} vectors and {totals['parents']} parent windows to {path}")
+    return totals
+
+def import_snapshot(vector_store: VectorStore, path: str, allow_model_mismatch: bool = False) -> Dict[str, Any]:
+    """
+    Load a snapshot file into a VectorStore
+
+    Existing chunks with the same ids are overwritten; nothing is deleted.
+
+    Args:
+        vector_store: Store to import into
+        path: Snapshot file to read
+        allow_model_mismatch: Import even if the snapshot was embedded with
+            a different model or projection than the index
+
+    Returns:
+        Totals of the imported vectors and parent windows
+    """
+    started = time.perf_counter()
+    totals = {'vectors': 0, 'parents': 0}
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a Jarvis snapshot")
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length))
+
+        if header['format_version'] > FORMAT_VERSION:
+            raise ValueError(f"Snapshot format {header['format_version']} is newer than supported")
+        if header['dimension'] != vector_store.dimension:
+            raise ValueError(
+                f"Snapshot has dimension {header['dimension']}, index expects {vector_store.dimension}"
+            )
+        if header['embedding_model'] != vector_store.embedding_model_name and not allow_model_mismatch:
+            raise ValueError(
+                f"Snapshot was embedded with {header['embedding_model']}, "
+                f"but the index uses {vector_store.embedding_model_name}"
+            )
+        if header.get('projection') != _projection(vector_store) and not allow_model_mismatch:
+            raise ValueError(
+                f"Snapshot has projection {header.get('projection')}, "
+                f"but the index uses {_projection(vector_store)}"
+            )
+
+        for kind, count, vectors, records in _read_blocks(f):
+            if kind == VECTORS:
+                values = np.frombuffer(vectors, dtype=header['dtype']).reshape(count, header['dimension'])
+                vector_store.upsert_vectors([
+                    {**record, 'values': row.astype(np.float32).tolist()}
+                    for record, row in zip(records, values)
+                ])
+                totals['vectors'] += count
+            elif kind == PARENTS:
+                vector_store.chunk_store.put_parents(records)
+                totals['parents'] += count
+            elif kind == END and records != {k: totals[k] for k in records}:
+                raise ValueError(f"Snapshot totals {records} do not match what was read {totals}")
+
+    vector_store.flush()
+    totals['seconds'] = time.perf_counter() - started
+    logger.info(f"Imported {totals['vectors']} vectors and {totals['parents']} parent windows from {path}")
+    return totals
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Export or import a knowledge base snapshot")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="snapshot file")
+    parser.add_argument("--batch-size", type=int, default=1000, help="chunks per block (export)")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32", help="embedding storage type (export)")
+    parser.add_argument("--force", action="store_true", help="import despite an embedding model mismatch")
+    args = parser.parse_args()
+
+    store = VectorStore()
+    if args.action == "export":
+        totals = export_snapshot(store, args.path, batch_size=args.batch_size, dtype=args.dtype)
+    else:
+        totals = import_snapshot(store, args.path, allow_model_mismatch=args.force)
+    print(json.dumps(totals, indent=2))
+
+if __name__ == "__main__":
+    main()
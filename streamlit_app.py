@@ -1,8 +1,11 @@
 """
 Streamlit UI for Jarvis AI Assistant
 """
+import json
+import uuid
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 from config import settings
 
 # Page configuration
@@ -199,22 +202,41 @@ st.markdown("""
 # API endpoint
 API_URL = f"http://localhost:{settings.api_port}"
 
-def query_api(question: str) -> dict:
-    """Send question to the API"""
+# Status and stats are re-fetched at most this often, not on every rerun
+STATUS_TTL = 10
+# Older messages are dropped so reruns stay fast in long chats
+MAX_MESSAGES = 200
+# Messages rendered per page; earlier ones are loaded on demand
+PAGE_SIZE = 20
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Pooled HTTP session shared by all reruns and browser sessions"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def stream_query(question: str, session_id: str):
+    """Send question to the API and yield answer events as they arrive"""
     try:
-        response = requests.post(
-            f"{API_URL}/query",
-            json={"question": question},
-            timeout=60
-        )
-        if response.status_code == 200:
-            return response.json()
-        else:
-            return {"error": f"API error: {response.status_code}"}
+        with get_http_session().post(
+            f"{API_URL}/query/stream",
+            json={"question": question, "session_id": session_id},
+            stream=True,
+            timeout=(5, 120)
+        ) as response:
+            if response.status_code != 200:
+                yield {"type": "error", "error": f"API error: {response.status_code}"}
+                return
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
     except requests.exceptions.ConnectionError:
-        return {"error": "Cannot connect to API. Make sure to run 'python api.py' first."}
+        yield {"type": "error", "error": "Cannot connect to API. Make sure to run 'python api.py' first."}
     except Exception as e:
-        return {"error": str(e)}
+        yield {"type": "error", "error": str(e)}
 
 def add_document(text: str, doc_name: str = None) -> dict:
     """Add document to knowledge base"""
@@ -222,7 +244,7 @@ def add_document(text: str, doc_name: str = None) -> dict:
         payload = {"text": text}
         if doc_name:
             payload["doc_name"] = doc_name
-        response = requests.post(
+        response = get_http_session().post(
             f"{API_URL}/knowledge/add",
             json=payload,
             timeout=30
@@ -231,14 +253,67 @@ def add_document(text: str, doc_name: str = None) -> dict:
     except Exception as e:
         return {"error": str(e)}
 
+def clear_conversation(session_id: str):
+    """Clear this browser session's conversation on the server"""
+    try:
+        get_http_session().post(
+            f"{API_URL}/conversation/clear",
+            params={"session_id": session_id},
+            timeout=5
+        )
+    except Exception:
+        pass
+
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
 def check_api_status() -> bool:
     """Check if API is running"""
     try:
-        response = requests.get(f"{API_URL}/health", timeout=5)
+        response = get_http_session().get(f"{API_URL}/health", timeout=5)
         return response.status_code == 200
-    except:
+    except Exception:
         return False
 
+@st.cache_data(ttl=STATUS_TTL, show_spinner=False)
+def get_stats() -> dict:
+    """Get system statistics"""
+    try:
+        response = get_http_session().get(f"{API_URL}/stats", timeout=5)
+        if response.status_code == 200:
+            return response.json()
+    except Exception:
+        pass
+    return {}
+
+def render_message(message: dict):
+    """Render one chat message"""
+    if message["role"] == "user":
+        st.markdown(f"""
+            <div style="display: flex; justify-content: flex-end; margin: 1rem 0;">
+                <div class="user-message">{message["content"]}</div>
+            </div>
+        """, unsafe_allow_html=True)
+    else:
+        st.markdown(f"""
+            <div style="display: flex; justify-content: flex-start; margin: 1rem 0;">
+                <div class="assistant-message">
+                    <strong>🤖 Jarvis:</strong><br>{message["content"]}
+                </div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        if "sources" in message and message["sources"]:
+            with st.expander("📄 View Sources"):
+                for source in message["sources"]:
+                    st.markdown(f"- {source}")
+
+# Per-browser state
+if "messages" not in st.session_state:
+    st.session_state.messages = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+if "visible_messages" not in st.session_state:
+    st.session_state.visible_messages = PAGE_SIZE
+
 # Sidebar
 with st.sidebar:
     st.markdown("""
@@ -288,6 +363,7 @@ with st.sidebar:
                     if "error" in result:
                         st.error(f"❌ {result['error']}")
                     else:
+                        get_stats.clear()
                         st.success("✅ Knowledge added successfully!")
             else:
                 st.warning("⚠️ Please enter some text.")
@@ -300,10 +376,14 @@ with st.sidebar:
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔄 Refresh", use_container_width=True):
+            check_api_status.clear()
+            get_stats.clear()
             st.rerun()
     with col2:
         if st.button("🗑️ Clear Chat", use_container_width=True):
+            clear_conversation(st.session_state.session_id)
             st.session_state.messages = []
+            st.session_state.visible_messages = PAGE_SIZE
             st.rerun()
 
     st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
@@ -338,40 +418,25 @@ if check_api_status():
             </div>
         """, unsafe_allow_html=True)
     with col3:
-        st.markdown("""
+        total_chunks = get_stats().get("vector_store", {}).get("total_vector_count")
+        st.markdown(f"""
             <div class="metric-card">
-                <div class="metric-value">∞</div>
-                <div class="metric-label">Knowledge Capacity</div>
+                <div class="metric-value">{"∞" if total_chunks is None else f"{total_chunks:,}"}</div>
+                <div class="metric-label">Knowledge Chunks</div>
             </div>
         """, unsafe_allow_html=True)
 
 st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
 
-# Initialize chat history
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
-# Display chat messages
-for message in st.session_state.messages:
-    if message["role"] == "user":
-        st.markdown(f"""
-            <div style="display: flex; justify-content: flex-end; margin: 1rem 0;">
-                <div class="user-message">{message["content"]}</div>
-            </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
-            <div style="display: flex; justify-content: flex-start; margin: 1rem 0;">
-                <div class="assistant-message">
-                    <strong>🤖 Jarvis:</strong><br>{message["content"]}
-                </div>
-            </div>
-        """, unsafe_allow_html=True)
-
-        if "sources" in message and message["sources"]:
-            with st.expander("📄 View Sources"):
-                for source in message["sources"]:
-                    st.markdown(f"- {source}")
+# Display chat messages, newest page only
+messages = st.session_state.messages
+hidden = max(0, len(messages) - st.session_state.visible_messages)
+if hidden:
+    if st.button(f"⬆️ Show earlier messages ({hidden} hidden)"):
+        st.session_state.visible_messages += PAGE_SIZE
+        st.rerun()
+for message in messages[hidden:]:
+    render_message(message)
 
 # Chat input
 st.markdown('<div class="custom-divider"></div>', unsafe_allow_html=True)
@@ -382,31 +447,36 @@ prompt = st.chat_input("💬 Ask Jarvis anything...")
 if prompt:
     # Add user message
     st.session_state.messages.append({"role": "user", "content": prompt})
-
-    # Display user message immediately
-    st.markdown(f"""
-        <div style="display: flex; justify-content: flex-end; margin: 1rem 0;">
-            <div class="user-message">{prompt}</div>
-        </div>
-    """, unsafe_allow_html=True)
-
-    # Get response
-    with st.spinner("🤔 Jarvis is thinking..."):
-        result = query_api(prompt)
-
-        if "error" in result:
-            response = f"❌ {result['error']}"
+    render_message({"role": "user", "content": prompt})
+
+    # Render the answer as it streams in
+    placeholder = st.empty()
+    placeholder.markdown('<p class="thinking" style="color: #a0aec0;">🤔 Jarvis is thinking...</p>', unsafe_allow_html=True)
+    parts = []
+    sources = []
+    for event in stream_query(prompt, st.session_state.session_id):
+        if event["type"] == "context":
+            sources = [doc.get("text", "")[:100] + "..." for doc in event.get("context", []) if doc.get("text")]
+        elif event["type"] == "token":
+            parts.append(event["text"])
+            placeholder.markdown(f"""
+                <div style="display: flex; justify-content: flex-start; margin: 1rem 0;">
+                    <div class="assistant-message">
+                        <strong>🤖 Jarvis:</strong><br>{"".join(parts)}
+                    </div>
+                </div>
+            """, unsafe_allow_html=True)
+        elif event["type"] == "error":
+            parts = [f"❌ {event['error']}"]
             sources = []
-        else:
-            response = result.get("answer", "I couldn't generate a response.")
-            sources = [doc.get("text", "")[:100] + "..." for doc in result.get("context", []) if doc.get("text")]
 
-    # Add assistant response
+    # Add assistant response, keeping the history bounded
     st.session_state.messages.append({
         "role": "assistant",
-        "content": response,
+        "content": "".join(parts).strip() or "I couldn't generate a response.",
         "sources": sources
     })
+    del st.session_state.messages[:-MAX_MESSAGES]
 
     # Rerun to display the new messages
     st.rerun()
@@ -1,94 +1,322 @@
 """
-Vector store management using Pinecone
+Vector store management using Pinecone or a local NumPy index
 """
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from pinecone import Pinecone, ServerlessSpec
 from sentence_transformers import SentenceTransformer
+from chunk_store import ChunkStore
 from config import settings
+from index_manifest import IndexManifest
+from local_index import LocalIndex
+from metrics import REGISTRY, stage_timer
+from namespaced_index import NamespacedIndex
+from projection import Projection, ProjectedEmbedder
+from sharded_index import ShardedLocalIndex, SHARD_DIR
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Index types searched in-process, with query_batch and flush
+LOCAL_INDEX_TYPES = (LocalIndex, ShardedLocalIndex, NamespacedIndex)
+
+# Collections are index namespaces; the default one is the unnamed namespace
+DEFAULT_COLLECTION = "default"
+COLLECTION_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+CHUNKS_INGESTED = REGISTRY.counter(
+    "jarvis_chunks_ingested_total",
+    "Chunks embedded and upserted into the vector store"
+)
+
+def load_embedding_model(name: str):
+    """Load a sentence-transformer embedding model by name"""
+    return SentenceTransformer(name)
+
+def collection_namespace(collection: Optional[str]) -> str:
+    """
+    Index namespace holding a collection
+    
+    Raises:
+        ValueError: If the collection name is not 1-64 letters, digits, '-' or '_'
+    """
+    if collection is None or collection == DEFAULT_COLLECTION:
+        return ""
+    if not COLLECTION_NAME.match(collection):
+        raise ValueError(f"Invalid collection name: {collection!r}")
+    return collection
+
+def collection_name(namespace: str) -> str:
+    """Collection stored in an index namespace"""
+    return namespace or DEFAULT_COLLECTION
+
 class VectorStore:
-    """Manages vector storage and retrieval using Pinecone"""
+    """Manages vector storage and retrieval using Pinecone or a local index"""
     
-    def __init__(self):
-        """Initialize Pinecone and embedding model"""
-        self.pc = Pinecone(api_key=settings.pinecone_api_key)
-        self.index_name = settings.pinecone_index_name
-        self.embedding_model = SentenceTransformer(settings.embedding_model)
-        self.dimension = self.embedding_model.get_sentence_embedding_dimension()
+    def __init__(self, embedding_model=None, index=None, chunk_store=None):
+        """
+        Initialize the vector index, chunk store and embedding model
+        
+        The index manifest decides which physical index serves the
+        configured index name and which embedding model it was built with;
+        that model is used even if EMBEDDING_MODEL has since changed, so
+        queries always match the stored vectors. If the index was built
+        with a dimensionality-reducing projection, the model is wrapped so
+        ingest and queries are both projected.
+        
+        Args:
+            embedding_model: Model with a SentenceTransformer-style `encode`;
+                loaded from the manifest or settings when omitted
+            index: Index with the Pinecone Index API; created from settings
+                when omitted (the manifest is then not used)
+            chunk_store: ChunkStore holding chunk texts; opened from settings
+                when omitted
+        """
+        self.backend = settings.vector_backend
+        self.base_index_name = settings.pinecone_index_name
+        self.manifest = IndexManifest(settings.index_manifest_path if index is None else None)
+        self.index_name = self.manifest.resolve(self.base_index_name)
+        self.pc = None
+        
+        info = self.manifest.index_info(self.index_name)
+        self.embedding_model_name = info['embedding_model'] if info else settings.embedding_model
+        if info and self.embedding_model_name != settings.embedding_model:
+            logger.warning(
+                f"Index {self.index_name} was built with {self.embedding_model_name}; using it instead of "
+                f"EMBEDDING_MODEL={settings.embedding_model}. Start a migration to change models."
+            )
+        
+        if embedding_model is None:
+            embedding_model = load_embedding_model(self.embedding_model_name)
+            if info and info.get('projection'):
+                projection = Projection.load(info['projection']['path'])
+                embedding_model = ProjectedEmbedder(embedding_model, projection)
+        dimension = embedding_model.get_sentence_embedding_dimension()
+        if info and info['dimension'] != dimension:
+            raise ValueError(
+                f"Index {self.index_name} has dimension {info['dimension']}, "
+                f"but {self.embedding_model_name} produces {dimension}"
+            )
+        
+        self.chunk_store = chunk_store or ChunkStore(settings.chunk_store_path)
+        self._search_pool = ThreadPoolExecutor(
+            max_workers=settings.batch_search_workers,
+            thread_name_prefix="vector-search"
+        )
+        # Serializes index writes with migration batches and the switch-over
+        self._write_lock = threading.RLock()
+        self._migration_target = None
         
         # Initialize or connect to index
-        self._initialize_index()
+        if index is None:
+            index = self.open_index(self.index_name, dimension)
+            if info is None:
+                self.manifest.register(self.index_name, self.embedding_model_name, dimension)
+        
+        # Model and index are swapped together as one tuple, so every
+        # operation that reads it once sees a matching pair
+        self._active = (embedding_model, index)
+    
+    @property
+    def embedding_model(self):
+        return self._active[0]
+    
+    @property
+    def index(self):
+        return self._active[1]
+    
+    @property
+    def dimension(self) -> int:
+        return self._active[0].get_sentence_embedding_dimension()
     
-    def _initialize_index(self):
-        """Create index if it doesn't exist"""
+    @property
+    def projection_info(self) -> Optional[Dict[str, Any]]:
+        """Projection of the active index ('type', 'dim', 'path'), or None"""
+        return (self.manifest.index_info(self.index_name) or {}).get('projection')
+    
+    def open_index(self, name: str, dimension: int):
+        """Open a physical index, creating it if it doesn't exist"""
+        if self.backend == "local":
+            def open_namespace(path: str):
+                sharded = os.path.isdir(path) and any(SHARD_DIR.match(entry) for entry in os.listdir(path))
+                if settings.local_index_shards > 1 or sharded:
+                    return ShardedLocalIndex(
+                        dimension=dimension,
+                        path=path,
+                        shards=max(1, settings.local_index_shards),
+                        compact_ratio=settings.local_compact_ratio,
+                        max_segments=settings.local_max_segments
+                    )
+                return LocalIndex(
+                    dimension=dimension,
+                    path=path,
+                    compact_ratio=settings.local_compact_ratio,
+                    max_segments=settings.local_max_segments
+                )
+            
+            index = NamespacedIndex(open_namespace, path=os.path.join(settings.local_index_path, name))
+            logger.info(f"Using local index: {name}")
+            return index
+        
         try:
+            if self.pc is None:
+                self.pc = Pinecone(api_key=settings.pinecone_api_key)
+            
             # Check if index exists
-            if self.index_name not in self.pc.list_indexes().names():
-                logger.info(f"Creating new index: {self.index_name}")
+            if name not in self.pc.list_indexes().names():
+                logger.info(f"Creating new index: {name}")
                 self.pc.create_index(
-                    name=self.index_name,
-                    dimension=self.dimension,
+                    name=name,
+                    dimension=dimension,
                     metric='cosine',
                     spec=ServerlessSpec(
                         cloud='aws',
                         region='us-east-1'
                     )
                 )
+            else:
+                existing = self.pc.describe_index(name).dimension
+                if existing != dimension:
+                    raise ValueError(f"Index {name} has dimension {existing}, expected {dimension}")
             
-            self.index = self.pc.Index(self.index_name)
-            logger.info(f"Connected to index: {self.index_name}")
+            index = self.pc.Index(name)
+            logger.info(f"Connected to index: {name}")
+            return index
         except Exception as e:
             logger.error(f"Error initializing index: {e}")
             raise
     
-    def embed_text(self, text: str) -> List[float]:
-        """Generate embedding for text"""
-        return self.embedding_model.encode(text).tolist()
+    def embed_text(self, text: str, embedding_model=None) -> List[float]:
+        """Generate embedding for text (with the active model unless one is given)"""
+        with stage_timer("embed"):
+            return (embedding_model or self.embedding_model).encode(text).tolist()
+    
+    def embed_texts(self, texts: List[str], embedding_model=None) -> List[List[float]]:
+        """Generate embeddings for many texts in a single batched encode"""
+        if not texts:
+            return []
+        with stage_timer("embed"):
+            return (embedding_model or self.embedding_model).encode(
+                texts,
+                batch_size=settings.embedding_batch_size
+            ).tolist()
     
-    def add_documents(self, documents: List[Dict[str, Any]]) -> bool:
+    def add_documents(self, documents: List[Dict[str, Any]], collection: Optional[str] = None) -> bool:
         """
         Add documents to the vector store
         
+        Chunk texts go to the chunk store; the index only gets the vectors
+        and the small metadata fields.
+        
         Args:
             documents: List of dicts with 'id', 'text', and optional 'metadata'
+            collection: Collection to add to; the default collection when omitted
         """
         try:
-            vectors = []
-            for doc in documents:
-                embedding = self.embed_text(doc['text'])
-                vector = {
-                    'id': doc['id'],
-                    'values': embedding,
-                    'metadata': {
-                        'text': doc['text'],
-                        **(doc.get('metadata', {}))
-                    }
-                }
-                vectors.append(vector)
-            
-            # Upsert in batches of 100
-            batch_size = 100
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
+            namespace = collection_namespace(collection)
+            with self._write_lock:
+                self._add_documents([{**doc, 'collection': namespace} for doc in documents])
             
+            CHUNKS_INGESTED.inc(len(documents))
             logger.info(f"Added {len(documents)} documents to vector store")
             return True
         except Exception as e:
             logger.error(f"Error adding documents: {e}")
             return False
     
-    def search(self, query: str, top_k: int = None) -> List[Dict[str, Any]]:
+    def _add_documents(self, documents: List[Dict[str, Any]]):
+        """Embed and store documents tagged with their 'collection' namespace; called with the write lock held"""
+        embedding_model, index = self._active
+        vectors = []
+        embeddings = self.embed_texts([doc['text'] for doc in documents], embedding_model)
+        for doc, embedding in zip(documents, embeddings):
+            vector = {
+                'id': doc['id'],
+                'values': embedding,
+                'metadata': doc.get('metadata', {}),
+                'collection': doc['collection']
+            }
+            vectors.append(vector)
+        
+        # Store texts first so every id the index can return is resolvable
+        with stage_timer("chunk_store_write"):
+            self.chunk_store.put_many(
+                {
+                    'id': doc['id'],
+                    'doc_id': doc.get('metadata', {}).get('doc_id'),
+                    'text': doc['text'],
+                    'collection': doc['collection']
+                }
+                for doc in documents
+            )
+            parents = {
+                (doc['metadata']['doc_id'], doc['metadata']['parent_index']): doc['parent_text']
+                for doc in documents if 'parent_text' in doc
+            }
+            if parents:
+                self.chunk_store.put_parents(
+                    {'doc_id': doc_id, 'parent_index': parent_index, 'text': text}
+                    for (doc_id, parent_index), text in parents.items()
+                )
+        
+        self._upsert(index, vectors)
+        self._write_migration_target(documents)
+        self.flush()
+    
+    @staticmethod
+    def _namespace_args(namespace: str) -> Dict[str, str]:
+        """Keyword arguments selecting a namespace; none for the default one"""
+        return {'namespace': namespace} if namespace else {}
+    
+    def _upsert(self, index, vectors: List[Dict[str, Any]]):
+        """Upsert vectors with an optional 'collection' namespace, per namespace in batches of 100"""
+        by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+        for vector in vectors:
+            by_namespace.setdefault(vector.get('collection') or "", []).append(
+                {'id': vector['id'], 'values': vector['values'], 'metadata': vector.get('metadata', {})}
+            )
+        for namespace, batch in by_namespace.items():
+            for i in range(0, len(batch), 100):
+                with stage_timer("vector_upsert"):
+                    index.upsert(vectors=batch[i:i + 100], **self._namespace_args(namespace))
+    
+    def _namespaces(self, index) -> List[str]:
+        """Namespaces of an index that hold vectors, always including the default one"""
+        namespaces = (index.describe_index_stats().get('namespaces') or {}).keys()
+        return [""] + [namespace for namespace in namespaces if namespace]
+    
+    def list_collections(self) -> Dict[str, int]:
+        """Vector counts per collection"""
+        try:
+            stats = self.index.describe_index_stats()
+            namespaces = stats.get('namespaces')
+            if not namespaces:
+                return {DEFAULT_COLLECTION: stats.get('total_vector_count', 0)}
+            return {
+                collection_name(ns): info['vector_count']
+                for ns, info in namespaces.items() if info['vector_count'] or not ns
+            }
+        except Exception as e:
+            logger.error(f"Error listing collections: {e}")
+            return {}
+    
+    def search(self, query: str, top_k: int = None, collections: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """
         Search for similar documents
         
+        With several collections the query is embedded once and the
+        collections are searched concurrently, keeping the best `top_k`.
+        
         Args:
             query: Search query text
             top_k: Number of results to return
+            collections: Collections to search; the default collection when omitted
         
         Returns:
             List of matching documents with scores
@@ -96,39 +324,485 @@ class VectorStore:
         try:
             if top_k is None:
                 top_k = settings.top_k_results
+            namespaces = self._search_namespaces(collections)
             
-            query_embedding = self.embed_text(query)
+            embedding_model, index = self._active
+            query_embedding = self.embed_text(query, embedding_model)
+            if len(namespaces) == 1:
+                matches = self._query_index(query_embedding, top_k, index, namespaces[0])
+            else:
+                matches = self._merge(list(self._search_pool.map(
+                    lambda namespace: self._query_index(query_embedding, top_k, index, namespace),
+                    namespaces
+                )), top_k)
+            return self._to_documents([matches])[0]
+        except Exception as e:
+            logger.error(f"Error searching documents: {e}")
+            return []
+    
+    @staticmethod
+    def _search_namespaces(collections: Optional[List[str]]) -> List[str]:
+        """Distinct namespaces of the collections to search"""
+        return list(dict.fromkeys(collection_namespace(c) for c in collections)) if collections else [""]
+    
+    @staticmethod
+    def _merge(match_lists: List[List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        """Best `top_k` matches of several result lists"""
+        return heapq.nlargest(top_k, chain(*match_lists), key=lambda match: match['score'])
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = None,
+        collections: Optional[List[str]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for many queries at once
+        
+        All queries are embedded in one batched encode, then the index
+        queries run concurrently on the search thread pool.
+        
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            collections: Collections to search; the default collection when omitted
+        
+        Returns:
+            One list of matching documents per query, in input order
+        """
+        if not queries:
+            return []
+        
+        try:
+            if top_k is None:
+                top_k = settings.top_k_results
             
-            results = self.index.query(
+            namespaces = self._search_namespaces(collections)
+            embedding_model, index = self._active
+            query_embeddings = self.embed_texts(queries, embedding_model)
+            
+            # A local index scores the queries in a few matrix products per namespace
+            if isinstance(index, LOCAL_INDEX_TYPES):
+                per_namespace = []
+                for namespace in namespaces:
+                    with stage_timer("vector_query"):
+                        matches = index.query_batch(query_embeddings, top_k, **self._namespace_args(namespace))
+                    for query_matches in matches:
+                        for match in query_matches:
+                            match['collection'] = namespace
+                    per_namespace.append(matches)
+            else:
+                def run_query(embedding: List[float], namespace: str) -> List[Dict[str, Any]]:
+                    try:
+                        return self._query_index(embedding, top_k, index, namespace)
+                    except Exception as e:
+                        logger.error(f"Error searching documents: {e}")
+                        return []
+                
+                per_namespace = [
+                    list(self._search_pool.map(run_query, query_embeddings, [namespace] * len(queries)))
+                    for namespace in namespaces
+                ]
+            
+            if len(namespaces) == 1:
+                batches = per_namespace[0]
+            else:
+                batches = [self._merge(list(lists), top_k) for lists in zip(*per_namespace)]
+            return self._to_documents(batches)
+        except Exception as e:
+            logger.error(f"Error searching batch queries: {e}")
+            return [[] for _ in queries]
+    
+    def _query_index(self, query_embedding: List[float], top_k: int, index, namespace: str = "") -> List[Dict[str, Any]]:
+        """Run a single similarity query against an index namespace, returning its matches"""
+        with stage_timer("vector_query"):
+            results = index.query(
                 vector=query_embedding,
                 top_k=top_k,
-                include_metadata=True
+                include_metadata=True,
+                **self._namespace_args(namespace)
             )
-            
-            documents = []
-            for match in results['matches']:
-                documents.append({
+        return [
+            {'id': match['id'], 'score': match['score'], 'metadata': match.get('metadata'), 'collection': namespace}
+            for match in results['matches']
+        ]
+    
+    def _to_documents(self, batches: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Convert index matches into search result documents
+        
+        Texts for all matches are read from the chunk store in one lookup
+        per collection. Vectors upserted before the chunk store existed
+        still carry their text in metadata, which is used as a fallback.
+        Matches with no text in either place (the chunk store was lost or
+        is out of sync with the index) are dropped with a warning.
+        """
+        ids_by_namespace: Dict[str, set] = {}
+        for match in (m for matches in batches for m in matches):
+            ids_by_namespace.setdefault(match.get('collection', ""), set()).add(match['id'])
+        texts: Dict[Tuple[str, str], str] = {}
+        with stage_timer("chunk_hydrate"):
+            for namespace, ids in ids_by_namespace.items():
+                for id_, text in self.chunk_store.get_many(list(ids), namespace).items():
+                    texts[(namespace, id_)] = text
+        for match in (m for matches in batches for m in matches):
+            key = (match.get('collection', ""), match['id'])
+            if not texts.get(key) and (match.get('metadata') or {}).get('text'):
+                texts[key] = match['metadata']['text']
+        
+        missing = [
+            id_ for namespace, ids in ids_by_namespace.items() for id_ in ids if not texts.get((namespace, id_))
+        ]
+        if missing:
+            logger.warning(
+                f"Search result has no text in the chunk store for {len(missing)} chunk(s), "
+                f"e.g. {missing[0]}; is {self.chunk_store.path or 'the chunk store'} missing or out of sync with the index?"
+            )
+        
+        return [
+            [
+                {
                     'id': match['id'],
                     'score': match['score'],
-                    'text': match['metadata'].get('text', ''),
-                    'metadata': {k: v for k, v in match['metadata'].items() if k != 'text'}
-                })
+                    'text': texts[(match.get('collection', ""), match['id'])],
+                    'metadata': {k: v for k, v in (match.get('metadata') or {}).items() if k != 'text'},
+                    'collection': collection_name(match.get('collection', ""))
+                }
+                for match in matches
+                if texts.get((match.get('collection', ""), match['id']))
+            ]
+            for matches in batches
+        ]
+    
+    def upsert_vectors(self, vectors: List[Dict[str, Any]]):
+        """
+        Store already embedded chunks without running the embedding model
+        
+        Does not flush a local index; call flush() when done.
+        
+        Args:
+            vectors: List of dicts with 'id', 'values', 'text', 'metadata'
+                and optional 'collection' namespace, as yielded by iter_vectors
+        """
+        with self._write_lock:
+            self.chunk_store.put_many(
+                {
+                    'id': v['id'],
+                    'doc_id': v['metadata'].get('doc_id'),
+                    'text': v['text'],
+                    'collection': v.get('collection') or ""
+                }
+                for v in vectors
+            )
+            self._upsert(self.index, vectors)
+            self._write_migration_target(vectors)
+    
+    def iter_vectors(self, batch_size: int = 100) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Yield every stored chunk with its embedding, text and metadata
+        
+        Args:
+            batch_size: Chunks fetched from the index per batch
+        
+        Yields:
+            Lists of dicts with 'id', 'values', 'text', 'metadata' and the
+            'collection' namespace, one namespace at a time
+        """
+        index = self.index
+        for namespace in self._namespaces(index):
+            namespace_args = self._namespace_args(namespace)
+            for ids in index.list(limit=batch_size, **namespace_args):
+                ids = list(ids)
+                if not ids:
+                    continue
+                fetched = index.fetch(ids=ids, **namespace_args)['vectors']
+                texts = self.chunk_store.get_many(ids, namespace)
+                
+                batch = []
+                for id_ in ids:
+                    vector = fetched.get(id_)
+                    if vector is None:
+                        continue
+                    metadata = dict(vector['metadata'] or {})
+                    legacy_text = metadata.pop('text', '')
+                    batch.append({
+                        'id': id_,
+                        'values': vector['values'],
+                        'text': texts.get(id_) or legacy_text,
+                        'metadata': metadata,
+                        'collection': namespace
+                    })
+                yield batch
+    
+    def replace_document(
+        self,
+        doc_id: str,
+        documents: List[Dict[str, Any]],
+        collection: Optional[str] = None
+    ) -> bool:
+        """
+        Replace all chunks of a document with new ones
+        
+        The new chunks are added before the old ones are removed, so the
+        document stays searchable throughout. A document moved to another
+        collection is removed from its old one.
+        
+        Args:
+            doc_id: Document whose chunks are replaced
+            documents: New chunks of the document, as for add_documents
+            collection: Collection the document belongs to
+        """
+        try:
+            namespace = collection_namespace(collection)
+            new_ids = {doc['id'] for doc in documents}
+            old_ids = {
+                old_namespace: [id_ for id_ in ids if old_namespace != namespace or id_ not in new_ids]
+                for old_namespace, ids in self.chunk_store.ids_for_doc(doc_id).items()
+            }
+            if not self.add_documents(documents, collection):
+                return False
             
+            for old_namespace, ids in old_ids.items():
+                self._delete_chunks(ids, old_namespace)
+            parent_count = len({doc['metadata']['parent_index'] for doc in documents if 'parent_text' in doc})
+            self.chunk_store.delete_parents(doc_id, from_index=parent_count)
+            removed = sum(len(ids) for ids in old_ids.values())
+            logger.info(f"Replaced document {doc_id}: {len(documents)} new, {removed} old chunks")
+            return True
+        except Exception as e:
+            logger.error(f"Error replacing document {doc_id}: {e}")
+            return False
+    
+    def delete_document(self, doc_id: str) -> Optional[int]:
+        """
+        Delete all chunks of a document
+        
+        Chunks are found through the chunk store, so vectors added before
+        it existed cannot be deleted this way.
+        
+        Args:
+            doc_id: Document to delete
+        
+        Returns:
+            Number of chunks deleted (0 if the document is unknown), or None on failure
+        """
+        try:
+            deleted = 0
+            for namespace, ids in self.chunk_store.ids_for_doc(doc_id).items():
+                self._delete_chunks(ids, namespace)
+                deleted += len(ids)
+            self.chunk_store.delete_parents(doc_id)
+            logger.info(f"Deleted document {doc_id} ({deleted} chunks)")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting document {doc_id}: {e}")
+            return None
+    
+    def _delete_chunks(self, ids: List[str], namespace: str = ""):
+        """Remove chunks from an index namespace, then from the chunk store"""
+        if not ids:
+            return
+        with self._write_lock:
+            indexes = [self.index] + ([self._migration_target[1]] if self._migration_target else [])
+            # Pinecone accepts at most 1000 ids per delete
+            for index in indexes:
+                for i in range(0, len(ids), 1000):
+                    with stage_timer("vector_delete"):
+                        index.delete(ids=ids[i:i + 1000], **self._namespace_args(namespace))
+            self.flush()
+            self.chunk_store.delete_chunks(ids, namespace)
+    
+    def expand_to_parents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Replace search hits with their parent windows
+        
+        Hits sharing a window are merged into the best-scoring one, so the
+        result may be shorter than the input. Hits without a stored window
+        are kept as they are.
+        
+        Args:
+            documents: Search results, best first
+        
+        Returns:
+            Search results whose 'text' is the parent window where available
+        """
+        keys = [
+            (doc['metadata']['doc_id'], doc['metadata']['parent_index'])
+            for doc in documents
+            if 'parent_index' in doc['metadata'] and 'doc_id' in doc['metadata']
+        ]
+        if not keys:
             return documents
+        
+        try:
+            with stage_timer("parent_expand"):
+                windows = self.chunk_store.get_parents(list(dict.fromkeys(keys)))
         except Exception as e:
-            logger.error(f"Error searching documents: {e}")
-            return []
+            logger.error(f"Error expanding parent windows: {e}")
+            return documents
+        
+        expanded = []
+        seen = set()
+        for doc in documents:
+            metadata = doc['metadata']
+            key = (metadata.get('doc_id'), metadata.get('parent_index'))
+            if key not in windows:
+                expanded.append(doc)
+            elif key not in seen:
+                seen.add(key)
+                expanded.append({**doc, 'text': windows[key]})
+        return expanded
+    
+    def delete_collection(self, collection: str) -> Optional[int]:
+        """
+        Delete every chunk of a collection
+        
+        Returns:
+            Number of chunks deleted, or None on failure
+        """
+        try:
+            namespace = collection_namespace(collection)
+            with self._write_lock:
+                indexes = [self.index] + ([self._migration_target[1]] if self._migration_target else [])
+                for index in indexes:
+                    index.delete(delete_all=True, **self._namespace_args(namespace))
+                self.flush()
+                deleted = self.chunk_store.delete_collection(namespace)
+            logger.info(f"Deleted collection {collection_name(namespace)} ({deleted} chunks)")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting collection {collection}: {e}")
+            return None
     
     def delete_all(self) -> bool:
-        """Delete all vectors from the index"""
+        """Delete all vectors from every collection of the index"""
         try:
-            self.index.delete(delete_all=True)
+            with self._write_lock:
+                indexes = [self.index] + ([self._migration_target[1]] if self._migration_target else [])
+                for index in indexes:
+                    for namespace in self._namespaces(index):
+                        index.delete(delete_all=True, **self._namespace_args(namespace))
+                self.flush()
+                self.chunk_store.delete_all()
             logger.info("Deleted all documents from vector store")
             return True
         except Exception as e:
             logger.error(f"Error deleting documents: {e}")
             return False
     
+    def flush(self):
+        """Persist a local index after writes"""
+        for index in [self.index] + ([self._migration_target[1]] if self._migration_target else []):
+            if isinstance(index, LOCAL_INDEX_TYPES):
+                index.flush()
+    
+    def begin_migration(self, embedding_model, index, prune: bool = False) -> int:
+        """
+        Start mirroring writes into a new index built with another model
+        
+        While a migration runs, added chunks are also embedded with the
+        target model and deletes are applied to both indexes.
+        
+        Args:
+            embedding_model: Model of the target index
+            index: Target index
+            prune: Remove chunks from the target that are no longer in the
+                active index, for a target left behind by an interrupted run
+                whose deletes were not mirrored while it was stopped
+        
+        Returns:
+            Number of chunks pruned from the target
+        """
+        with self._write_lock:
+            self._migration_target = (embedding_model, index)
+        if not prune:
+            return 0
+        
+        pruned = 0
+        for namespace in self._namespaces(index):
+            namespace_args = self._namespace_args(namespace)
+            for ids in index.list(**namespace_args):
+                # Under the lock, so a chunk written to both indexes meanwhile is not taken for stale
+                with self._write_lock:
+                    present = self.index.fetch(ids=ids, **namespace_args)['vectors']
+                    stale = [id_ for id_ in ids if id_ not in present]
+                    if stale:
+                        index.delete(ids=stale, **namespace_args)
+                        pruned += len(stale)
+        return pruned
+    
+    def migrate_batch(self, chunks: List[Dict[str, Any]]) -> int:
+        """
+        Re-embed a batch of existing chunks into the migration target
+        
+        Chunks already in the target (from an earlier, interrupted run or a
+        mirrored write) and chunks deleted since the batch was read are
+        skipped, which makes a migration resumable.
+        
+        Args:
+            chunks: Chunks as yielded by iter_vectors
+        
+        Returns:
+            Number of chunks written to the target
+        """
+        with self._write_lock:
+            if not chunks or self._migration_target is None:
+                return 0
+            target_index = self._migration_target[1]
+            by_namespace: Dict[str, List[Dict[str, Any]]] = {}
+            for chunk in chunks:
+                by_namespace.setdefault(chunk.get('collection') or "", []).append(chunk)
+            
+            todo = []
+            for namespace, namespace_chunks in by_namespace.items():
+                ids = [chunk['id'] for chunk in namespace_chunks]
+                namespace_args = self._namespace_args(namespace)
+                still_present = self.index.fetch(ids=ids, **namespace_args)['vectors']
+                already_copied = target_index.fetch(ids=ids, **namespace_args)['vectors']
+                todo.extend(c for c in namespace_chunks if c['id'] in still_present and c['id'] not in already_copied)
+            self._write_migration_target(todo)
+            return len(todo)
+    
+    def _write_migration_target(self, chunks: List[Dict[str, Any]]):
+        """Embed chunks with the migration target's model and upsert them there"""
+        if self._migration_target is None or not chunks:
+            return
+        embedding_model, index = self._migration_target
+        embeddings = self.embed_texts([chunk['text'] for chunk in chunks], embedding_model)
+        self._upsert(index, [
+            {**chunk, 'values': embedding}
+            for chunk, embedding in zip(chunks, embeddings)
+        ])
+    
+    def complete_migration(self, index_name: str, embedding_model_name: str):
+        """Atomically switch queries and writes over to the migration target"""
+        with self._write_lock:
+            if self._migration_target is None:
+                raise RuntimeError("No migration in progress")
+            target = self._migration_target
+            if isinstance(target[1], LOCAL_INDEX_TYPES):
+                target[1].flush()
+            self.manifest.switch(self.base_index_name, index_name)
+            self._active = target
+            self._migration_target = None
+            self.index_name = index_name
+            self.embedding_model_name = embedding_model_name
+        logger.info(f"Switched {self.base_index_name} to index {index_name} ({embedding_model_name})")
+    
+    def abort_migration(self):
+        """Stop mirroring writes into the migration target"""
+        with self._write_lock:
+            self._migration_target = None
+    
+    def check_connection(self) -> bool:
+        """Check that the index answers a lightweight stats request"""
+        try:
+            self.index.describe_index_stats()
+            return True
+        except Exception as e:
+            logger.error(f"Cannot reach vector index: {e}")
+            return False
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get index statistics"""
         try: